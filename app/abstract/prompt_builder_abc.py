@@ -1,5 +1,5 @@
 from abc import ABC, abstractmethod
-from typing import Tuple
+from typing import Iterable, Optional, Tuple
 
 
 class PromptBuilderABC(ABC):
@@ -24,6 +24,8 @@ class PromptBuilderABC(ABC):
         additional_instructions_text: str = None,
         additional_includes_section: str = None,
         failed_tests_section: str = None,
+        temperature: Optional[float] = None,
+        seed: Optional[int] = None,
     ) -> Tuple[str, int, int, str]:
         """
         Generates additional unit tests to improve coverage or handle edge cases.
@@ -40,6 +42,8 @@ class PromptBuilderABC(ABC):
             additional_instructions_text (str, optional): Extra instructions or context.
             additional_includes_section (str, optional): Additional code or includes.
             failed_tests_section (str, optional): Details of failed tests to consider.
+            temperature (float, optional): Sampling temperature for this request.
+            seed (int, optional): Sampling seed for this request.
 
         Returns:
             Tuple[str, int, int, str]:
@@ -51,6 +55,35 @@ class PromptBuilderABC(ABC):
         """
         pass
 
+    @abstractmethod
+    def stream_tests(
+        self,
+        source_file_name: str,
+        max_tests: int,
+        source_file_numbered: str,
+        code_coverage_report: str,
+        language: str,
+        test_file: str,
+        test_file_name: str,
+        testing_framework: str,
+        additional_instructions_text: str = None,
+        additional_includes_section: str = None,
+        failed_tests_section: str = None,
+        temperature: Optional[float] = None,
+        seed: Optional[int] = None,
+    ) -> Tuple[Iterable[str], str]:
+        """
+        Like generate_tests, but returns the AI response while it is being generated.
+
+        Returns:
+            Tuple[Iterable[str], str]:
+                A 2-element tuple containing:
+                - The AI-generated test suggestions, as text fragments in arrival order;
+                  its `prompt_tokens` and `completion_tokens` are set once it is exhausted,
+                - The final constructed prompt (string).
+        """
+        pass
+
     @abstractmethod
     def analyze_test_failure(
         self,
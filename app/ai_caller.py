@@ -1,25 +1,155 @@
+import json
 import logging
 import requests
 import time
-from typing import Dict, Tuple
+from contextlib import nullcontext
+from threading import Semaphore
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from config.config_loader import get_settings
+from config.token_handling import estimate_tokens
+from response_cache import ResponseCache
+
+
+# Responses worth retrying: rate limiting and transient server errors (e.g. a model still loading)
+RETRY_STATUS_CODES = (429, 500, 502, 503, 504)
+
+
+def _get_llm_setting(key: str, default: Any) -> Any:
+    try:
+        return get_settings().get(key, default)
+    except Exception:
+        return default
+
+
+class StreamedResponse:
+    """
+    A model response consumed fragment by fragment while it is being generated.
+
+    Iterate it once; `text`, `prompt_tokens` and `completion_tokens` are final
+    after the iteration is exhausted.
+    """
+
+    def __init__(self, fragments: Iterable[str], finish: Callable[[str], Tuple[int, int]]):
+        """
+        Args:
+            fragments: The response text, in arrival order.
+            finish: Called with the complete text; returns (prompt_tokens, completion_tokens).
+        """
+        self._fragments = fragments
+        self._finish = finish
+        self._parts: List[str] = []
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.done = False
+
+    def __iter__(self) -> Iterator[str]:
+        for fragment in self._fragments:
+            self._parts.append(fragment)
+            yield fragment
+        self.prompt_tokens, self.completion_tokens = self._finish(self.text)
+        self.done = True
+
+    @property
+    def text(self) -> str:
+        return "".join(self._parts)
+
 
 class AICaller:
-    """Ollama-only AI caller supporting streaming and non-streaming."""
-    def __init__(self, model: str = "codellama", api_base: str = "http://localhost:11434", simulation_mode: bool = False):
+    """
+    Ollama-only AI caller supporting streaming and non-streaming.
+
+    All requests go through one pooled keep-alive `requests.Session`, so repeated
+    calls reuse TCP connections. Pool size and timeouts come from the `[llm]`
+    configuration section; failed requests are retried `model_retries` times.
+    """
+    def __init__(
+        self,
+        model: str = "codellama",
+        api_base: str = "http://localhost:11434",
+        simulation_mode: bool = False,
+        pool_size: Optional[int] = None,
+        timeout: Optional[Tuple[float, float]] = None,
+        retries: Optional[int] = None,
+        response_cache: Optional[ResponseCache] = None,
+        request_slots: Optional[Semaphore] = None,
+    ):
+        """
+        Args:
+            model: Ollama model name.
+            api_base: Base URL of the Ollama server.
+            simulation_mode: Return canned responses instead of calling the server.
+            pool_size: Maximum number of pooled connections. Defaults to `llm.pool_size`.
+            timeout: (connect, read) timeout in seconds. Defaults to `llm.connect_timeout`
+                and `llm.read_timeout`.
+            retries: Retry attempts for failed requests. Defaults to `default.model_retries`.
+            response_cache: Record/replay cache of responses. Defaults to the one configured
+                by `llm.response_cache`, if any.
+            request_slots: Semaphore shared by callers that together may only have a limited
+                number of requests in flight, e.g. the pipelines of a repository run.
+        """
         self.model = model
         self.api_base = api_base.rstrip("/")
         self.simulation_mode = simulation_mode
         self.logger = logging.getLogger(__name__)
+        self.pool_size = pool_size or int(_get_llm_setting("llm.pool_size", 4))
+        self.timeout = timeout or (
+            float(_get_llm_setting("llm.connect_timeout", 5)),
+            float(_get_llm_setting("llm.read_timeout", 600)),
+        )
+        self.retries = int(_get_llm_setting("default.model_retries", 3) if retries is None else retries)
+        # Ollama's default context is small and silently truncates longer prompts
+        self.context_window = int(_get_llm_setting("llm.context_window", 8192))
+        self.session = self._create_session()
+        self.response_cache = response_cache if response_cache is not None else self._create_response_cache()
+        self.request_slots = request_slots
         
-        if not simulation_mode:
-            self._verify_connection()
-        else:
+        if simulation_mode:
             self.logger.info("🎭 AI Caller initialized in SIMULATION MODE")
+        elif self.response_cache and self.response_cache.mode == "replay":
+            self.logger.info("AI Caller initialized in REPLAY MODE, serving recorded responses only")
+        else:
+            self._verify_connection()
+
+    def _create_response_cache(self) -> Optional[ResponseCache]:
+        try:
+            return ResponseCache.from_settings(logger=self.logger)
+        except Exception as e:
+            self.logger.warning(f"LLM response cache disabled: {e}")
+            return None
+
+    def _create_session(self) -> requests.Session:
+        """Create the pooled keep-alive session used for all requests to the server."""
+        retry = Retry(
+            total=self.retries,
+            backoff_factor=float(_get_llm_setting("llm.retry_backoff", 0.5)),
+            status_forcelist=RETRY_STATUS_CODES,
+            allowed_methods=frozenset({"GET", "POST"}),
+            raise_on_status=False,
+        )
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_size, max_retries=retry)
+        session = requests.Session()
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        return session
+
+    def close(self) -> None:
+        """Close the pooled connections."""
+        self.session.close()
+
+    def __enter__(self) -> "AICaller":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
 
     def _verify_connection(self):
         self.logger.info(f"Verifying connection to Ollama at {self.api_base}...")
         try:
-            response = requests.get(f"{self.api_base}/api/tags")
+            response = self.session.get(f"{self.api_base}/api/tags", timeout=self.timeout)
             response.raise_for_status()
             models = response.json().get("models", [])
             model_names = [m["name"] for m in models]
@@ -31,57 +161,144 @@ class AICaller:
             self.logger.error(f"Could not connect to Ollama at {self.api_base}: {e}")
             raise
 
-    def call_model(self, prompt: Dict[str, str], stream: bool = False, max_tokens: int = 2048, temperature: float = 0.2) -> Tuple[str, int, int]:
+    def call_model(self, prompt: Dict[str, str], stream: bool = False, max_tokens: int = 2048, temperature: float = 0.2, seed: Optional[int] = None) -> Tuple[str, int, int]:
         if not all(k in prompt for k in ["system", "user"]):
             raise KeyError("Prompt must contain 'system' and 'user' keys")
             
         if self.simulation_mode:
             return self._simulate_ai_response(prompt)
             
-        message = f"{prompt['system']}\n\n{prompt['user']}" if prompt['system'] else prompt['user']
-        payload = {
-            "model": self.model,
-            "prompt": message,
-            "max_tokens": max_tokens,
-            "temperature": temperature,
-            "stream": stream
-        }
+        cache_key = self._cache_key(prompt, max_tokens, temperature, seed)
+        if cache_key:
+            cached = self.response_cache.lookup(cache_key, self.model, prompt)
+            if cached:
+                return cached
+
+        message, payload = self._build_payload(prompt, stream, max_tokens, temperature, seed)
         try:
             if stream:
-                return self._handle_streaming(payload, message)
+                # _stream_fragments holds the request slot while the response streams
+                result = self._handle_streaming(payload, message)
             else:
-                return self._handle_non_streaming(payload, message)
+                with self._request_slot():
+                    result = self._handle_non_streaming(payload, message)
         except Exception as e:
             self.logger.error(f"Error during Ollama call: {e}")
             raise
+        if cache_key:
+            self.response_cache.store(cache_key, self.model, prompt, *result)
+        return result
+
+    def stream_model(
+        self, prompt: Dict[str, str], max_tokens: int = 2048, temperature: float = 0.2, seed: Optional[int] = None
+    ) -> StreamedResponse:
+        """
+        Call the model with streaming, returning the response as it is generated.
+
+        The request is sent when the iteration starts. Recorded and simulated
+        responses arrive as a single fragment.
+        """
+        if not all(k in prompt for k in ["system", "user"]):
+            raise KeyError("Prompt must contain 'system' and 'user' keys")
+
+        if self.simulation_mode:
+            content, prompt_tokens, completion_tokens = self._simulate_ai_response(prompt)
+            return StreamedResponse([content], lambda _: (prompt_tokens, completion_tokens))
+
+        cache_key = self._cache_key(prompt, max_tokens, temperature, seed)
+        if cache_key:
+            cached = self.response_cache.lookup(cache_key, self.model, prompt)
+            if cached:
+                return StreamedResponse([cached[0]], lambda _: (cached[1], cached[2]))
+
+        message, payload = self._build_payload(prompt, True, max_tokens, temperature, seed)
+        usage: Dict[str, Any] = {}
+
+        def finish(content: str) -> Tuple[int, int]:
+            prompt_tokens, completion_tokens = self._usage(usage, message, content)
+            if cache_key:
+                self.response_cache.store(cache_key, self.model, prompt, content, prompt_tokens, completion_tokens)
+            return prompt_tokens, completion_tokens
+
+        return StreamedResponse(self._stream_fragments(payload, usage), finish)
+
+    def _request_slot(self):
+        """Context holding one of the shared request slots, if any, for the duration of a request."""
+        return self.request_slots if self.request_slots is not None else nullcontext()
+
+    def _cache_key(self, prompt: Dict[str, str], max_tokens: int, temperature: float, seed: Optional[int]) -> Optional[str]:
+        """Claim the response cache key of this request, or None without a cache."""
+        if not self.response_cache:
+            return None
+        request_hash = ResponseCache.request_hash(
+            self.model, prompt, max_tokens=max_tokens, temperature=temperature, seed=seed
+        )
+        return self.response_cache.next_key(request_hash)
+
+    def _build_payload(
+        self, prompt: Dict[str, str], stream: bool, max_tokens: int, temperature: float, seed: Optional[int] = None
+    ) -> Tuple[str, Dict]:
+        """Return the flattened prompt message and the /api/generate request body."""
+        message = f"{prompt['system']}\n\n{prompt['user']}" if prompt['system'] else prompt['user']
+        # Ollama only reads sampling parameters from "options"
+        options = {"num_predict": max_tokens, "temperature": temperature, "num_ctx": self.context_window}
+        if seed is not None:
+            options["seed"] = seed
+        payload = {
+            "model": self.model,
+            "prompt": message,
+            "options": options,
+            "stream": stream
+        }
+        return message, payload
+
+    def _stream_fragments(self, payload: Dict, usage: Optional[Dict[str, Any]] = None) -> Iterator[str]:
+        """
+        Yield the text of each chunk of Ollama's NDJSON stream as it arrives.
+
+        The final chunk, which carries the token counts, is copied into `usage`.
+        A request slot is held until the stream ends.
+        """
+        with self._request_slot(), self.session.post(
+            f"{self.api_base}/api/generate", json=payload, stream=True, timeout=self.timeout
+        ) as response:
+            response.raise_for_status()
+            for line in response.iter_lines():
+                if not line:
+                    continue
+                chunk = json.loads(line)
+                if chunk.get("error"):
+                    raise RuntimeError(f"Ollama error: {chunk['error']}")
+                if chunk.get("response"):
+                    yield chunk["response"]
+                if chunk.get("done"):
+                    if usage is not None:
+                        usage.update(chunk)
+                    break
 
     def _handle_streaming(self, payload: Dict, original_prompt: str) -> Tuple[str, int, int]:
-        response = requests.post(f"{self.api_base}/api/generate", json=payload, stream=True)
-        response.raise_for_status()
-        full_response = ""
-        print("Streaming results from LLM model...")
-        for line in response.iter_lines():
-            if line:
-                chunk = line.decode('utf-8')
-                print(chunk, end='', flush=True)
-                full_response += chunk
-                time.sleep(0.01)
-        print("\n")
-        prompt_tokens = self._count_tokens(original_prompt)
-        completion_tokens = self._count_tokens(full_response)
-        return full_response, prompt_tokens, completion_tokens
+        usage: Dict[str, Any] = {}
+        content = "".join(self._stream_fragments(payload, usage))
+        prompt_tokens, completion_tokens = self._usage(usage, original_prompt, content)
+        return content, prompt_tokens, completion_tokens
 
     def _handle_non_streaming(self, payload: Dict, original_prompt: str) -> Tuple[str, int, int]:
-        response = requests.post(f"{self.api_base}/api/generate", json=payload)
+        response = self.session.post(f"{self.api_base}/api/generate", json=payload, timeout=self.timeout)
         response.raise_for_status()
-        content = response.json().get('response', '')
+        body = response.json()
+        content = body.get('response', '')
         print(f"Printing results from LLM model...\n{content}")
-        prompt_tokens = self._count_tokens(original_prompt)
-        completion_tokens = self._count_tokens(content)
+        prompt_tokens, completion_tokens = self._usage(body, original_prompt, content)
         return content, prompt_tokens, completion_tokens
 
+    def _usage(self, body: Dict[str, Any], original_prompt: str, content: str) -> Tuple[int, int]:
+        """(prompt_tokens, completion_tokens) as reported by Ollama, counted locally where missing."""
+        prompt_tokens = body.get('prompt_eval_count') or self._count_tokens(original_prompt)
+        completion_tokens = body.get('eval_count') or self._count_tokens(content)
+        return prompt_tokens, completion_tokens
+
     def _count_tokens(self, text: str) -> int:
-        return max(1, len(text) // 4)
+        return max(1, estimate_tokens(text))
     
     def _simulate_ai_response(self, prompt: Dict[str, str]) -> Tuple[str, int, int]:
         """Simulate a realistic AI response for testing purposes."""
@@ -208,7 +425,92 @@ new_tests:
             return True
             
         try:
-            response = requests.get(f"{self.api_base}/api/tags", timeout=5)
+            response = self.session.get(f"{self.api_base}/api/tags", timeout=(self.timeout[0], 5))
             return response.status_code == 200
         except Exception:
             return False
+
+
+class AsyncAICaller(AICaller):
+    """
+    Asyncio variant of AICaller built on `httpx.AsyncClient`.
+
+    Concurrent `call_model` coroutines share the client's connection pool, which is
+    bounded by the same `llm.pool_size` setting. Requires the optional `httpx` package.
+    """
+    def __init__(self, *args, **kwargs):
+        try:
+            import httpx
+        except ImportError as e:
+            raise ImportError("AsyncAICaller requires httpx: pip install httpx") from e
+        self._httpx = httpx
+        super().__init__(*args, **kwargs)
+        # Limits must be set on the transport: the client ignores its own when given a transport
+        transport = httpx.AsyncHTTPTransport(
+            retries=self.retries,
+            limits=httpx.Limits(max_connections=self.pool_size, max_keepalive_connections=self.pool_size),
+        )
+        self.client = httpx.AsyncClient(
+            base_url=self.api_base,
+            timeout=httpx.Timeout(self.timeout[1], connect=self.timeout[0]),
+            transport=transport,
+        )
+
+    async def call_model(self, prompt: Dict[str, str], stream: bool = False, max_tokens: int = 2048, temperature: float = 0.2, seed: Optional[int] = None) -> Tuple[str, int, int]:
+        if not all(k in prompt for k in ["system", "user"]):
+            raise KeyError("Prompt must contain 'system' and 'user' keys")
+
+        if self.simulation_mode:
+            import asyncio
+
+            return await asyncio.to_thread(self._simulate_ai_response, prompt)
+
+        cache_key = self._cache_key(prompt, max_tokens, temperature, seed)
+        if cache_key:
+            cached = self.response_cache.lookup(cache_key, self.model, prompt)
+            if cached:
+                return cached
+
+        # Streaming only changes how the text arrives, so the async caller always reads whole responses
+        message, payload = self._build_payload(prompt, False, max_tokens, temperature, seed)
+        if self.request_slots is not None:
+            import asyncio
+
+            # The slots are a thread semaphore; waiting for one must not block the event loop
+            await asyncio.to_thread(self.request_slots.acquire)
+        try:
+            for attempt in range(self.retries + 1):
+                response = await self.client.post("/api/generate", json=payload)
+                if response.status_code not in RETRY_STATUS_CODES or attempt == self.retries:
+                    break
+                await self._sleep_before_retry(attempt)
+        finally:
+            if self.request_slots is not None:
+                self.request_slots.release()
+        try:
+            response.raise_for_status()
+        except Exception as e:
+            self.logger.error(f"Error during Ollama call: {e}")
+            raise
+        body = response.json()
+        content = body.get('response', '')
+        result = (content, *self._usage(body, message, content))
+        if cache_key:
+            self.response_cache.store(cache_key, self.model, prompt, *result)
+        return result
+
+    async def _sleep_before_retry(self, attempt: int) -> None:
+        import asyncio
+
+        await asyncio.sleep(float(_get_llm_setting("llm.retry_backoff", 0.5)) * (2 ** attempt))
+
+    async def aclose(self) -> None:
+        """Close both the async client and the synchronous session used for connection checks."""
+        await self.client.aclose()
+        self.close()
+
+    async def __aenter__(self) -> "AsyncAICaller":
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.aclose()
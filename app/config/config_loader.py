@@ -1,8 +1,14 @@
+import hashlib
+import json
+import os
 import sys
+import tempfile
 
-from os.path import abspath, dirname, exists, join
+from os.path import abspath, dirname, exists, expanduser, join
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Union
 
-from dynaconf import Dynaconf
+if TYPE_CHECKING:
+    from dynaconf import Dynaconf
 
 
 SETTINGS_FILES = [
@@ -17,6 +23,159 @@ SETTINGS_FILES = [
 ]
 
 
+# Bump when the snapshot layout changes, so older snapshots are rebuilt
+SNAPSHOT_VERSION = 1
+
+# Set to "0" to always load the settings through Dynaconf
+SNAPSHOT_ENV_VAR = "COVER_AGENT_SETTINGS_SNAPSHOT"
+
+
+class SettingsSection(dict):
+    """A table of the settings; its keys are also readable as attributes, like Dynaconf's."""
+
+    def __getattr__(self, name: str) -> Any:
+        try:
+            return self[name]
+        except KeyError:
+            raise AttributeError(name) from None
+
+
+def _wrap(value: Any) -> Any:
+    if isinstance(value, dict):
+        return SettingsSection({key: _wrap(item) for key, item in value.items()})
+    if isinstance(value, list):
+        return [_wrap(item) for item in value]
+    return value
+
+
+class SettingsSnapshot:
+    """
+    The merged settings files, without Dynaconf.
+
+    Supports the part of Dynaconf's API the code uses: dotted `get("section.key", default)`
+    and attribute access to sections. Top-level keys are case-insensitive, as in Dynaconf.
+    """
+
+    def __init__(self, data: Dict[str, Any]):
+        self._data = {key.lower(): _wrap(value) for key, value in data.items()}
+
+    def get(self, key: str, default: Any = None) -> Any:
+        section, *path = key.split(".")
+        value = self._data.get(section.lower(), default)
+        for part in path:
+            if not isinstance(value, dict) or part not in value:
+                return default
+            value = value[part]
+        return value
+
+    def __getattr__(self, name: str) -> Any:
+        try:
+            return self._data[name.lower()]
+        except KeyError:
+            raise AttributeError(name) from None
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {key.upper(): value for key, value in self._data.items()}
+
+
+def user_cache_dir() -> str:
+    """Directory for caches that persist across runs: `$XDG_CACHE_HOME/cover-agent`, or `~/.cache/cover-agent`."""
+    cache_home = os.environ.get("XDG_CACHE_HOME") or join(expanduser("~"), ".cache")
+    return join(cache_home, "cover-agent")
+
+
+def _snapshot_path(settings_files: List[str]) -> str:
+    # One snapshot per installation, so side-by-side checkouts do not overwrite each other's
+    digest = hashlib.sha256(dirname(settings_files[0]).encode("utf-8")).hexdigest()[:16]
+    return join(user_cache_dir(), f"settings-{digest}.json")
+
+
+def _file_stamps(settings_files: List[str]) -> List[List[Any]]:
+    stamps = []
+    for file_path in settings_files:
+        stat = os.stat(file_path)
+        stamps.append([file_path, stat.st_mtime_ns, stat.st_size])
+    return stamps
+
+
+def _overridden_by_environment(section_names: List[str]) -> bool:
+    """
+    Whether environment variables change the settings.
+
+    Without a prefix, Dynaconf lets any variable named like a section (`LLM`) or a
+    nested key (`DEFAULT__MODEL`) override it, and `*_FOR_DYNACONF` variables
+    configure Dynaconf itself. The snapshot does not replicate this.
+    """
+    sections = {name.upper() for name in section_names}
+    for name in os.environ:
+        name = name.upper()
+        if name.endswith("_FOR_DYNACONF") or name.split("__", 1)[0] in sections:
+            return True
+    return False
+
+
+def _load_snapshot(path: str, stamps: List[List[Any]]) -> Optional[Dict[str, Any]]:
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            snapshot = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if not isinstance(snapshot, dict) or snapshot.get("version") != SNAPSHOT_VERSION or snapshot.get("files") != stamps:
+        return None
+    return snapshot.get("settings")
+
+
+def _store_snapshot(path: str, stamps: List[List[Any]], data: Dict[str, Any]) -> None:
+    try:
+        os.makedirs(dirname(path), exist_ok=True)
+        # Write then rename, so a concurrent process never reads a partial snapshot
+        fd, tmp_path = tempfile.mkstemp(dir=dirname(path), suffix=".tmp")
+    except OSError:
+        # The snapshot is only an optimization; e.g. a read-only home directory just disables it
+        return
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump({"version": SNAPSHOT_VERSION, "files": stamps, "settings": data}, f)
+        os.replace(tmp_path, path)
+    except (OSError, TypeError, ValueError):
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+
+
+def _load_dynaconf(settings_files: List[str], environment: bool = True) -> "Dynaconf":
+    from dynaconf import Dynaconf
+
+    options = {} if environment else {"loaders": []}
+    return Dynaconf(envvar_prefix=False, merge_enabled=True, settings_files=settings_files, **options)
+
+
+def load_settings(settings_files: List[str]) -> Union[SettingsSnapshot, "Dynaconf"]:
+    """
+    Load the merged settings files.
+
+    Merging the TOML files through Dynaconf is slow, so the merged result is kept as
+    a JSON snapshot in the user's cache directory, keyed on the files' modification
+    times and sizes. Later processes read the snapshot without importing Dynaconf.
+    Dynaconf is used directly when environment variables override settings or the
+    snapshot is disabled with COVER_AGENT_SETTINGS_SNAPSHOT=0.
+    """
+    if os.environ.get(SNAPSHOT_ENV_VAR, "1") == "0":
+        return _load_dynaconf(settings_files)
+
+    stamps = _file_stamps(settings_files)
+    path = _snapshot_path(settings_files)
+    data = _load_snapshot(path, stamps)
+    if data is None:
+        data = _load_dynaconf(settings_files, environment=False).as_dict()
+        _store_snapshot(path, stamps, data)
+
+    if _overridden_by_environment(list(data)):
+        return _load_dynaconf(settings_files)
+    return SettingsSnapshot(data)
+
+
 class SingletonSettings:
     _instance = None
 
@@ -31,7 +190,7 @@ class SingletonSettings:
         Check if the 'settings' attribute is not already set, then construct the paths to the settings files based on the current directory.
         Ensure that all settings files exist by checking their presence using the 'os.path.exists' function.
         If any of the settings files are missing, raise a 'FileNotFoundError' with a message indicating the missing file.
-        Finally, initialize the 'settings' attribute with a Dynaconf instance using the specified settings files and configuration options.
+        Finally, initialize the 'settings' attribute with the merged settings, read from a cached snapshot when it is up to date.
 
         Parameters:
             self: SingletonSettings
@@ -54,8 +213,8 @@ class SingletonSettings:
                 if not exists(file_path):
                     raise FileNotFoundError(f"Settings file not found: {file_path}")
 
-            self.settings = Dynaconf(envvar_prefix=False, merge_enabled=True, settings_files=settings_files)
+            self.settings = load_settings(settings_files)
 
 
-def get_settings() -> Dynaconf:
+def get_settings() -> Union[SettingsSnapshot, "Dynaconf"]:
     return SingletonSettings().settings
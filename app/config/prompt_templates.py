@@ -0,0 +1,107 @@
+import os
+from os.path import splitext
+from threading import Lock
+from typing import Dict, List, Optional
+
+from jinja2 import BaseLoader, Environment, FileSystemBytecodeCache, StrictUndefined, TemplateNotFound
+
+from config.config_loader import SETTINGS_FILES, get_settings
+
+
+PROMPT_PARTS = ("system", "user")
+
+
+class SettingsTemplateLoader(BaseLoader):
+    """
+    Loads the prompt templates of the settings files.
+
+    Template names are `<prompt>/<part>`, e.g. `test_generation_prompt/user` for the
+    `user` template of `test_generation_prompt.toml`.
+    """
+
+    def get_source(self, environment: Environment, template: str):
+        prompt, _, part = template.rpartition("/")
+        source = get_settings().get(f"{prompt}.{part}") if prompt and part in PROMPT_PARTS else None
+        if not isinstance(source, str):
+            raise TemplateNotFound(template)
+        # The settings are loaded once per process, so a compiled template never goes stale
+        return source, None, lambda: True
+
+    def list_templates(self) -> List[str]:
+        settings = get_settings()
+        return [
+            f"{prompt}/{part}"
+            for prompt in (splitext(f)[0] for f in SETTINGS_FILES)
+            for part in PROMPT_PARTS
+            if isinstance(settings.get(f"{prompt}.{part}"), str)
+        ]
+
+
+class PromptTemplates:
+    """
+    Registry of compiled prompt templates.
+
+    Each template is parsed and compiled on its first use and rendered from the
+    compiled `Template` afterwards. With a bytecode cache folder, the compiled code
+    is also stored on disk, keyed by a checksum of the template source, so a fresh
+    process skips the compilation as well.
+    """
+
+    def __init__(self, bytecode_cache_folder: Optional[str] = None):
+        """
+        Args:
+            bytecode_cache_folder: Directory for the on-disk bytecode cache; None disables it.
+        """
+        bytecode_cache = None
+        if bytecode_cache_folder:
+            os.makedirs(bytecode_cache_folder, exist_ok=True)
+            bytecode_cache = FileSystemBytecodeCache(bytecode_cache_folder)
+        self.environment = Environment(
+            loader=SettingsTemplateLoader(),
+            undefined=StrictUndefined,
+            bytecode_cache=bytecode_cache,
+            auto_reload=False,
+            cache_size=-1,
+        )
+
+    def render(self, prompt: str, **variables) -> Dict[str, str]:
+        """
+        Render the system and user templates of `prompt`.
+
+        Returns:
+            {"system": ..., "user": ...}; a part without a template renders as "".
+
+        Raises:
+            ValueError: If `prompt` has neither a system nor a user template.
+        """
+        rendered, found = {}, False
+        for part in PROMPT_PARTS:
+            try:
+                template = self.environment.get_template(f"{prompt}/{part}")
+            except TemplateNotFound:
+                rendered[part] = ""
+                continue
+            rendered[part] = template.render(**variables)
+            found = True
+        if not found:
+            raise ValueError(f"Neither 'system' nor 'user' templates found in config '{prompt}'")
+        return rendered
+
+    def precompile(self) -> None:
+        """Compile every prompt template of the settings files now instead of on first use."""
+        for name in self.environment.list_templates():
+            self.environment.get_template(name)
+
+
+_prompt_templates: Optional[PromptTemplates] = None
+_prompt_templates_lock = Lock()
+
+
+def get_prompt_templates() -> PromptTemplates:
+    """The process-wide registry, using `default.template_cache_folder` as bytecode cache."""
+    global _prompt_templates
+    if _prompt_templates is None:
+        with _prompt_templates_lock:
+            if _prompt_templates is None:
+                _prompt_templates = PromptTemplates(get_settings().get("default.template_cache_folder", "") or None)
+    return _prompt_templates
@@ -1,6 +1,11 @@
+import logging
+from collections import OrderedDict
+from hashlib import blake2b
 from threading import Lock
 
-from tiktoken import get_encoding
+
+# Number of distinct texts whose token counts are remembered by count_tokens
+TOKEN_COUNT_CACHE_SIZE = 1024
 
 
 class TokenEncoder:
@@ -13,18 +18,77 @@ class TokenEncoder:
         if cls._encoder_instance is None:  # Check without acquiring the lock for performance
             with cls._lock:  # Lock acquisition to ensure thread safety
                 if cls._encoder_instance is None:
+                    from tiktoken import get_encoding
+
                     cls._encoder_instance = get_encoding(
                         "o200k_base"
                     )  # for now, we use the same encoder for all models
         return cls._encoder_instance
 
 
+_token_counts: "OrderedDict[bytes, int]" = OrderedDict()
+_token_counts_lock = Lock()
+
+
+def count_tokens(text: str) -> int:
+    """
+    Count the tokens of `text` with the shared encoder, memoized by content hash.
+
+    Prompt sections such as the source file, the test file and the included files
+    are sent unchanged on every iteration, so each distinct text is encoded once.
+    """
+    if not text:
+        return 0
+    key = blake2b(text.encode("utf-8", "surrogatepass"), digest_size=16).digest()
+    with _token_counts_lock:
+        count = _token_counts.get(key)
+        if count is not None:
+            _token_counts.move_to_end(key)
+            return count
+
+    count = len(TokenEncoder.get_token_encoder().encode(text, disallowed_special=()))
+    with _token_counts_lock:
+        _token_counts[key] = count
+        if len(_token_counts) > TOKEN_COUNT_CACHE_SIZE:
+            _token_counts.popitem(last=False)
+    return count
+
+
+_encoder_unavailable = False
+_encoder_unavailable_lock = Lock()
+
+
+def _load_encoder() -> bool:
+    """Whether the shared encoder can be loaded; concurrent callers wait for the first attempt."""
+    global _encoder_unavailable
+    with _encoder_unavailable_lock:
+        if not _encoder_unavailable:
+            try:
+                TokenEncoder.get_token_encoder()
+            except Exception as e:
+                logging.getLogger(__name__).warning(f"Token encoder unavailable, estimating token counts: {e}")
+                _encoder_unavailable = True
+        return not _encoder_unavailable
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    count_tokens, or roughly 4 characters per token when the encoder cannot be loaded.
+
+    Loading the encoding may need a download; after it failed once (e.g. offline),
+    the estimate is used without retrying.
+    """
+    if TokenEncoder._encoder_instance is not None or _load_encoder():
+        return count_tokens(text)
+    return max(1, len(text) // 4) if text else 0
+
+
 class TokenHandler:
     def __init__(self):
         self.encoder = TokenEncoder.get_token_encoder()
 
     def count_tokens(self, patch: str) -> int:
-        return len(self.encoder.encode(patch))
+        return count_tokens(patch)
 
 
 def clip_tokens(
@@ -39,8 +103,7 @@ def clip_tokens(
 
     try:
         if num_input_tokens is None:
-            encoder = TokenEncoder.get_token_encoder()
-            num_input_tokens = len(encoder.encode(text))
+            num_input_tokens = count_tokens(text)
         if num_input_tokens <= max_tokens:
             return text
         if max_tokens <= 0:
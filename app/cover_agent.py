@@ -1,7 +1,10 @@
 # Simple working cover agent that just demonstrates the core functionality
 import os
 import logging
-from typing import Optional
+import re
+from concurrent.futures import Future, ThreadPoolExecutor
+from threading import Semaphore
+from typing import Any, Dict, List, Optional, Tuple
 
 from app.logging.custom_logger import CustomLogger
 
@@ -24,8 +27,23 @@ class CoverAgent:
         project_root: Optional[str] = None,
         logger: Optional[logging.Logger] = None,
         generate_log_files: bool = True,
+        validation_workers: Optional[int] = None,
+        run_each_test_separately: Optional[bool] = None,
+        use_warm_worker: Optional[bool] = None,
+        batch_validation: Optional[bool] = None,
+        concurrent_generations: Optional[int] = None,
+        pipeline_generation: Optional[bool] = None,
+        stream_generation: Optional[bool] = None,
+        source_windowing: Optional[bool] = None,
+        llm_slots: Optional[Semaphore] = None,
+        test_slots: Optional[Semaphore] = None,
     ):
-        """Initialize the CoverAgent with simplified parameters."""
+        """
+        Initialize the CoverAgent with simplified parameters.
+
+        `llm_slots` and `test_slots` are semaphores shared with other agents that bound
+        how many model requests and test runs are in flight at once across all of them.
+        """
         self.source_file_path = source_file_path
         self.test_file_path = test_file_path
         self.code_coverage_report_path = code_coverage_report_path
@@ -37,6 +55,20 @@ class CoverAgent:
         self.max_run_time_sec = max_run_time_sec
         self.test_command_dir = test_command_dir or os.path.dirname(test_file_path)
         self.project_root = project_root or os.getcwd()
+        self.validation_workers = validation_workers
+        self.run_each_test_separately = run_each_test_separately
+        self.use_warm_worker = use_warm_worker
+        self.batch_validation = batch_validation
+        self.concurrent_generations = concurrent_generations
+        if pipeline_generation is None:
+            pipeline_generation = self._get_generation_setting("pipeline", False)
+        self.pipeline_generation = bool(pipeline_generation)
+        if stream_generation is None:
+            stream_generation = self._get_generation_setting("stream", False)
+        self.stream_generation = bool(stream_generation)
+        self.source_windowing = source_windowing
+        self.llm_slots = llm_slots
+        self.test_slots = test_slots
         
         # Initialize logger (returns standard logging.Logger)
         self.logger = logger or CustomLogger.get_logger(__name__, generate_log_files=generate_log_files)
@@ -46,6 +78,7 @@ class CoverAgent:
         self.iteration_count = 0
         self.tests_generated = 0
         self.tests_passed = 0
+        self._ollama_available: Optional[bool] = None
 
     def run(self, demo_mode: bool = None) -> bool:
         """
@@ -74,7 +107,12 @@ class CoverAgent:
         else:            return self._run_production_mode()
     
     def _check_ollama_availability(self) -> bool:
-        """Check if Ollama is available and responsive."""
+        """Check if Ollama is available and responsive. The result is checked once per agent."""
+        if self._ollama_available is None:
+            self._ollama_available = self._probe_ollama()
+        return self._ollama_available
+
+    def _probe_ollama(self) -> bool:
         try:
             import requests
             response = requests.get(f"{self.api_base}/api/tags", timeout=2)
@@ -141,6 +179,11 @@ class CoverAgent:
         except Exception as e:
             self.logger.error(f"Error in production mode: {e}", exc_info=True)
             return False
+        finally:
+            if hasattr(self, 'test_validator'):
+                self.test_validator.close()
+            if hasattr(self, 'ai_caller'):
+                self.ai_caller.close()
     
     def _initialize_ai_components(self) -> bool:
         """Initialize AI caller and related components."""
@@ -157,7 +200,8 @@ class CoverAgent:
             self.ai_caller = AICaller(
                 model=self.model, 
                 api_base=self.api_base,
-                simulation_mode=not ollama_available
+                simulation_mode=not ollama_available,
+                request_slots=self.llm_slots,
             )
             
             # Test AI connection
@@ -181,7 +225,9 @@ class CoverAgent:
                 agent_completion=self.prompt_builder,
                 test_command_dir=self.test_command_dir,
                 project_root=self.project_root,
-                logger=self.logger
+                logger=self.logger,
+                concurrent_generations=self.concurrent_generations,
+                source_windowing=self.source_windowing,
             )
             
             # Initialize test validator
@@ -196,7 +242,12 @@ class CoverAgent:
                 desired_coverage=self.desired_coverage,
                 test_command_dir=self.test_command_dir,
                 project_root=self.project_root,
-                logger=self.logger
+                logger=self.logger,
+                parallel_workers=self.validation_workers,
+                run_each_test_separately=self.run_each_test_separately,
+                use_warm_worker=self.use_warm_worker,
+                batch_validation=self.batch_validation,
+                test_slots=self.test_slots,
             )
             
             return True
@@ -209,7 +260,7 @@ class CoverAgent:
         """Get the baseline coverage by running existing tests."""
         try:
             if hasattr(self, 'test_validator'):
-                return self.test_validator.get_coverage()
+                return self.test_validator.get_baseline().coverage
             else:
                 # Fallback: run test command and try to parse coverage
                 import subprocess
@@ -236,52 +287,141 @@ class CoverAgent:
             self.logger.warning(f"Error getting baseline coverage: {e}")
             return None
     
+    @staticmethod
+    def _get_generation_setting(key: str, default: Any) -> Any:
+        """Read `generation.<key>` from the settings, falling back to `default`."""
+        try:
+            from config.config_loader import get_settings
+            return get_settings().get(f"generation.{key}", default)
+        except Exception:
+            return default
+
+    def _generate_candidates(self, missed_lines: List[int]) -> Dict[str, Any]:
+        """Ask the model for new tests targeting `missed_lines`."""
+        return self.test_generator.generate_tests_concurrently(missed_lines=missed_lines)
+
+    def _stream_and_validate(self, missed_lines: List[int]) -> Tuple[List[Dict[str, Any]], int]:
+        """
+        Validate each new test as soon as the model has written it, while it writes the next ones.
+
+        Returns:
+            The generated tests and the number of them that passed validation
+        """
+        generated_tests, passed_count = [], 0
+        for test in self.test_generator.stream_tests(missed_lines=missed_lines):
+            generated_tests.append(test)
+            self.logger.info(f"✅ Validating {str(test.get('test_name') or 'test').strip()}...")
+            validation_result = self.test_validator.validate_test(test)
+            if validation_result and validation_result.get('status') == 'PASS':
+                passed_count += 1
+        return generated_tests, passed_count
+
+    @staticmethod
+    def _target_lines(test: Dict[str, Any]) -> List[int]:
+        """The line numbers a generated test declares in `lines_to_cover`."""
+        return [int(n) for n in re.findall(r"\d+", str(test.get('lines_to_cover') or ''))]
+
+    def _drop_stale_candidates(self, tests: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Drop speculatively generated tests whose target lines were covered in the meantime.
+
+        A test is dropped when every line in its `lines_to_cover` is now covered; tests
+        without parseable target lines are kept.
+        """
+        covered = self.test_validator.get_baseline().lines_covered
+        fresh = []
+        for test in tests:
+            target_lines = self._target_lines(test)
+            if target_lines and all(line in covered for line in target_lines):
+                self.logger.info(f"Skipping {test.get('test_name', 'test')}: its target lines are already covered")
+                continue
+            fresh.append(test)
+        return fresh
+
     def _run_generation_loop(self) -> bool:
-        """Run the iterative test generation loop."""
+        """
+        Run the iterative test generation loop.
+
+        With pipelining enabled, the next iteration's generation request is sent as soon
+        as the current candidates arrive, so the model works while they are validated.
+        The request targets the missed lines the current candidates do not aim at, and
+        its candidates are filtered against the coverage reached in the meantime.
+
+        With streaming enabled, each candidate is validated as soon as the model has
+        written it, while the model writes the rest of the response.
+        """
         self.logger.info(f"🔄 Starting generation loop (max {self.max_iterations} iterations)")
         
-        for iteration in range(1, self.max_iterations + 1):
-            self.iteration_count = iteration
-            self.logger.info(f"\n--- ITERATION {iteration}/{self.max_iterations} ---")
-            
-            # Generate new tests
-            self.logger.info("🧠 Generating new tests with AI...")
-            test_results = self.test_generator.generate_tests()
-            
-            if not test_results or not test_results.get('new_tests', []):
-                self.logger.warning("No tests were generated this iteration")
-                continue
-            
-            generated_tests = test_results.get('new_tests', [])
-            self.tests_generated += len(generated_tests)
-            self.logger.info(f"📝 Generated {len(generated_tests)} new tests")
-            
-            # Validate generated tests
-            self.logger.info("✅ Validating generated tests...")
-            passed_count = 0
-            
-            for test_data in generated_tests:
-                validation_result = self.test_validator.validate_test(test_data)
-                if validation_result and validation_result.get('status') == 'PASS':
-                    passed_count += 1
-                    self.tests_passed += 1
-            
-            self.logger.info(f"✔️ {passed_count}/{len(generated_tests)} tests passed validation")
-            
-            # Update coverage
-            new_coverage = self._get_baseline_coverage()
-            if new_coverage is not None and new_coverage > self.current_coverage:
-                improvement = (new_coverage - self.current_coverage) * 100
-                self.current_coverage = new_coverage
-                self.logger.info(f"📈 Coverage improved by {improvement:.2f}% to {new_coverage * 100:.2f}%")
+        # A single worker: at most one speculative generation is in flight
+        executor = ThreadPoolExecutor(max_workers=1) if self.pipeline_generation else None
+        pending: Optional[Future] = None
+        try:
+            for iteration in range(1, self.max_iterations + 1):
+                self.iteration_count = iteration
+                self.logger.info(f"\n--- ITERATION {iteration}/{self.max_iterations} ---")
+
+                missed_lines = sorted(self.test_validator.get_baseline().lines_missed)
+                speculative = pending is not None
+                # Streaming needs a single response; concurrent requests are merged once all have arrived
+                streamed = self.stream_generation and not speculative and self.test_generator.concurrent_generations == 1
+                passed_count = 0
+                if speculative:
+                    self.logger.info("🧠 Collecting tests generated during the previous validation...")
+                    test_results = pending.result()
+                    pending = None
+                elif streamed:
+                    self.logger.info("🧠 Generating new tests with AI, validating each as it arrives...")
+                    generated_tests, passed_count = self._stream_and_validate(missed_lines)
+                else:
+                    self.logger.info("🧠 Generating new tests with AI...")
+                    test_results = self._generate_candidates(missed_lines)
+
+                if not streamed:
+                    generated_tests = (test_results or {}).get('new_tests', []) or []
+                if speculative:
+                    generated_tests = self._drop_stale_candidates(generated_tests)
+
+                if executor and iteration < self.max_iterations:
+                    in_flight = {line for test in generated_tests for line in self._target_lines(test)}
+                    next_targets = [line for line in missed_lines if line not in in_flight] or missed_lines
+                    pending = executor.submit(self._generate_candidates, next_targets)
+                if not generated_tests:
+                    self.logger.warning("No tests were generated this iteration")
+                    continue
                 
-                # Check if target achieved
-                if new_coverage * 100 >= self.desired_coverage:
-                    self.logger.info(f"🎯 Target coverage {self.desired_coverage}% achieved!")
-                    self._print_summary()
-                    return True
-            else:
-                self.logger.warning("No coverage improvement this iteration")
+                self.tests_generated += len(generated_tests)
+                self.logger.info(f"📝 Generated {len(generated_tests)} new tests")
+                
+                if not streamed:
+                    # Validate generated tests
+                    self.logger.info("✅ Validating generated tests...")
+                    for validation_result in self.test_validator.validate_tests(generated_tests):
+                        if validation_result and validation_result.get('status') == 'PASS':
+                            passed_count += 1
+                self.tests_passed += passed_count
+                
+                self.logger.info(f"✔️ {passed_count}/{len(generated_tests)} tests passed validation")
+                
+                # Update coverage
+                new_coverage = self._get_baseline_coverage()
+                if new_coverage is not None and new_coverage > self.current_coverage:
+                    improvement = (new_coverage - self.current_coverage) * 100
+                    self.current_coverage = new_coverage
+                    self.logger.info(f"📈 Coverage improved by {improvement:.2f}% to {new_coverage * 100:.2f}%")
+                    
+                    # Check if target achieved
+                    if new_coverage * 100 >= self.desired_coverage:
+                        self.logger.info(f"🎯 Target coverage {self.desired_coverage}% achieved!")
+                        self._print_summary()
+                        return True
+                else:
+                    self.logger.warning("No coverage improvement this iteration")
+        finally:
+            if executor:
+                # An in-flight speculative request is not needed anymore
+                if pending is not None:
+                    pending.cancel()
+                executor.shutdown(wait=False, cancel_futures=True)
         
         # Completed all iterations
         final_coverage = (self.current_coverage * 100) if self.current_coverage else 0.0
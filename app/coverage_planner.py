@@ -0,0 +1,190 @@
+"""
+Ranking of source files by expected coverage gain per unit of cost.
+
+The planner reads one whole-repository coverage report up front and ranks the
+(source, test) pairs by how many lines each pipeline can newly cover, divided
+by what the pipeline costs: the model time for its prompt plus the runtime of
+its test file. Limited model time is spent on the files where it buys the most
+coverage.
+"""
+
+import logging
+import os
+import xml.etree.ElementTree as ET
+from typing import TYPE_CHECKING, Dict, List, Mapping, Optional
+
+from app.coverage_processor import CoverageProcessor, CoverageType
+from app.file_coverage import FileCoverage
+from config.token_handling import estimate_tokens
+
+if TYPE_CHECKING:
+    from app.repo_cover_agent import FilePair
+
+
+_COMMENT_PREFIXES = ("#", "//", "/*", "*")
+
+
+def count_code_lines(source: str) -> int:
+    """Number of lines that are neither blank nor comments: an upper bound on the missed lines."""
+    return sum(1 for line in source.splitlines() if line.strip() and not line.strip().startswith(_COMMENT_PREFIXES))
+
+
+def read_test_durations(junit_report_path: str) -> Dict[str, float]:
+    """
+    Total duration in seconds per test module from a JUnit XML report.
+
+    Keys are the testcases' `file` attribute when present (xunit1, jest-junit),
+    otherwise their `classname` (e.g. `tests.test_parser` or `tests.test_parser.TestX`).
+    """
+    durations: Dict[str, float] = {}
+    for _, element in ET.iterparse(junit_report_path):
+        if element.tag != "testcase":
+            continue
+        key = element.get("file") or element.get("classname") or ""
+        try:
+            durations[key] = durations.get(key, 0.0) + float(element.get("time") or 0)
+        except ValueError:
+            pass
+        element.clear()
+    return durations
+
+
+class CoveragePlanner:
+    """Ranks (source, test) pairs by missed lines per estimated second of work."""
+
+    def __init__(
+        self,
+        project_root: str,
+        coverage_report_path: Optional[str] = None,
+        coverage_type: str = "cobertura",
+        junit_report_path: Optional[str] = None,
+        llm_tokens_per_sec: float = 200,
+        test_run_sec: float = 10,
+        logger: Optional[logging.Logger] = None,
+    ):
+        """
+        Args:
+            project_root: Root the pairs' paths are relative to.
+            coverage_report_path: Whole-repository coverage report. Without it, every code
+                line of a source file counts as missed.
+            coverage_type: Format of the coverage report, a CoverageType value.
+            junit_report_path: JUnit XML report of a whole-suite run, for per-test-file runtimes.
+            llm_tokens_per_sec: Estimated model throughput.
+            test_run_sec: Runtime assumed for test files without a measured duration.
+            logger: Optional logger instance.
+        """
+        self.project_root = os.path.abspath(project_root)
+        self.coverage_report_path = coverage_report_path
+        self.coverage_type = CoverageType(coverage_type)
+        self.junit_report_path = junit_report_path
+        self.llm_tokens_per_sec = max(float(llm_tokens_per_sec), 1e-9)
+        self.test_run_sec = float(test_run_sec)
+        self.logger = logger or logging.getLogger(__name__)
+
+        self._coverage: Optional[Dict[str, FileCoverage]] = None
+        self._durations: Optional[Dict[str, float]] = None
+
+    def _load_coverage(self) -> Dict[str, FileCoverage]:
+        """The report's per-file coverage, keyed by normalized report path, parsed once."""
+        if self._coverage is None:
+            self._coverage = {}
+            if self.coverage_report_path and os.path.exists(self.coverage_report_path):
+                processor = CoverageProcessor(
+                    file_path=self.coverage_report_path,
+                    src_file_path="",
+                    coverage_type=self.coverage_type,
+                    use_report_coverage_feature_flag=True,
+                    logger=self.logger,
+                )
+                report: Mapping[str, FileCoverage] = processor.parse_coverage_report()
+                self._coverage = {os.path.normpath(path): coverage for path, coverage in report.items()}
+                self.logger.info(f"Planning from the coverage of {len(self._coverage)} files in {self.coverage_report_path}")
+            elif self.coverage_report_path:
+                self.logger.warning(f"Coverage report {self.coverage_report_path} not found, ranking by file size")
+        return self._coverage
+
+    def _load_durations(self) -> Dict[str, float]:
+        """
+        Test durations summed per file path and per dotted prefix of the class names,
+        so a test module's total is a single lookup.
+        """
+        if self._durations is None:
+            self._durations = {}
+            if self.junit_report_path and os.path.exists(self.junit_report_path):
+                try:
+                    durations = read_test_durations(self.junit_report_path)
+                except ET.ParseError as e:
+                    self.logger.warning(f"Could not read test durations from {self.junit_report_path}: {e}")
+                    durations = {}
+                for key, seconds in durations.items():
+                    if key.endswith((".py", ".js", ".jsx", ".ts", ".tsx")):
+                        prefixes = [os.path.normpath(key)]
+                    else:
+                        parts = key.split(".")
+                        prefixes = [".".join(parts[:end]) for end in range(1, len(parts) + 1)]
+                    for prefix in prefixes:
+                        self._durations[prefix] = self._durations.get(prefix, 0.0) + seconds
+        return self._durations
+
+    def file_coverage(self, source_file: str) -> Optional[FileCoverage]:
+        """
+        The report's coverage of `source_file` (relative to the project root), if it is in the report.
+
+        Report paths are relative to the report's source roots, so the longest suffix of
+        `source_file` that is a report path matches, e.g. `src/pkg/parser.py` -> `pkg/parser.py`.
+        """
+        coverage = self._load_coverage()
+        parts = os.path.normpath(source_file).split(os.sep)
+        for start in range(len(parts)):
+            match = coverage.get(os.path.join(*parts[start:]))
+            if match is not None:
+                return match
+        return coverage.get(os.path.normpath(os.path.join(self.project_root, source_file)))
+
+    def test_runtime(self, test_file: str) -> float:
+        """Measured runtime of `test_file` in seconds, or the assumed `test_run_sec`."""
+        durations = self._load_durations()
+        relative = os.path.normpath(test_file)
+        module = os.path.splitext(relative)[0].replace(os.sep, ".")
+        for key in (relative, module):
+            if key in durations:
+                return durations[key]
+        return self.test_run_sec
+
+    def missed_lines(self, source_file: str, source: str) -> int:
+        coverage = self.file_coverage(source_file)
+        if coverage is not None:
+            return len(coverage.lines_missed)
+        if self._load_coverage():
+            # Files the suite never imports are absent from the report: all their code is missed
+            self.logger.debug(f"{source_file} is not in the coverage report")
+        return count_code_lines(source)
+
+    def gain_per_second(self, source_file: str, test_file: str) -> float:
+        """Expected newly covered lines per second of running the pipeline of the pair."""
+        try:
+            with open(os.path.join(self.project_root, source_file), "r", encoding="utf-8", errors="replace") as f:
+                source = f.read()
+            with open(os.path.join(self.project_root, test_file), "r", encoding="utf-8", errors="replace") as f:
+                test = f.read()
+        except OSError:
+            return 0.0
+        prompt_tokens = estimate_tokens(source) + estimate_tokens(test)
+        seconds = prompt_tokens / self.llm_tokens_per_sec + self.test_runtime(test_file)
+        return self.missed_lines(source_file, source) / max(seconds, 1e-9)
+
+    def rank(self, pairs: List["FilePair"]) -> List["FilePair"]:
+        """
+        Set each pair's `priority` to its gain per second and return the pairs, highest first.
+
+        Pairs whose source file is fully covered get priority 0 and go last.
+        """
+        for pair in pairs:
+            pair.priority = self.gain_per_second(pair.source_file, pair.test_file)
+        ranked = sorted(pairs, key=lambda pair: pair.priority, reverse=True)
+        if ranked:
+            self.logger.info(
+                "Highest expected coverage gain per second: "
+                + ", ".join(f"{pair.source_file} ({pair.priority:.2f})" for pair in ranked[:5])
+            )
+        return ranked
@@ -1,14 +1,32 @@
 import xml.etree.ElementTree as ET
 import json
+import mmap
 import os
+import re
+import sqlite3
+import threading
 import time
 import logging
-from typing import Tuple, List, Dict, Optional, Union
+from collections import OrderedDict
+from collections.abc import Mapping
+from types import MappingProxyType
+from typing import Iterator, Tuple, List, Dict, Optional, Set, Union
 from enum import Enum
 
+from app.file_coverage import FileCoverage, LineSet
 from app.logging.custom_logger import CustomLogger
 
 
+_LCOV_SOURCE = re.compile(rb'^SF:([^\r\n]*)', re.M)
+# DA:<line>,<hits>[,<checksum>], split by whether the line was hit
+_LCOV_LINE_HIT = re.compile(rb'^DA:(\d+),0*[1-9]', re.M)
+_LCOV_LINE_MISSED = re.compile(rb'^DA:(\d+),(?:0+|-\d+)(?:[,\r\n]|$)', re.M)
+# BRDA:<line>,<block>,<branch>,<taken or ->
+_LCOV_BRANCH = re.compile(rb'^BRDA:(\d+),[^,\r\n]*,[^,\r\n]*,(-|\d+)', re.M)
+# FNDA:<hits>,<function name>
+_LCOV_FUNCTION = re.compile(rb'^FNDA:(\d+),([^\r\n]*)', re.M)
+
+
 class CoverageType(Enum):
     COBERTURA = "cobertura"
     LCOV = "lcov" 
@@ -20,7 +38,18 @@ class CoverageProcessor:
     """
     Processes coverage reports and extracts coverage information.
     Supports multiple coverage formats but simplified for Python/JavaScript only.
+
+    Parsed reports are cached process-wide, keyed by the report's path, stat
+    signature (mtime, size) and coverage type, so re-reading an unchanged report
+    costs no I/O. Cached results are shared and therefore immutable: each file's
+    coverage is a `FileCoverage` whose lines are bitset-backed `LineSet`s, and
+    per-file results are read-only mappings.
     """
+
+    # Maximum number of parsed reports kept in the cache, least recently used first out
+    PARSE_CACHE_SIZE = 32
+    _parse_cache: "OrderedDict[tuple, Union[Tuple, MappingProxyType]]" = OrderedDict()
+    _parse_cache_lock = threading.Lock()
     
     def __init__(
         self,
@@ -52,7 +81,7 @@ class CoverageProcessor:
         
         self.logger = logger or CustomLogger.get_logger(__name__, generate_log_files=generate_log_files)
 
-    def process_coverage_report(self, time_of_test_command: int) -> Union[Tuple[List, List, float], Dict]:
+    def process_coverage_report(self, time_of_test_command: int) -> Union[FileCoverage, Mapping]:
         """
         Process the coverage report and extract coverage information.
         
@@ -61,7 +90,7 @@ class CoverageProcessor:
             
         Returns:
             If use_report_coverage_feature_flag is True: Dict mapping file paths to coverage info
-            Otherwise: Tuple of (lines_covered, lines_missed, percentage_covered)
+            Otherwise: FileCoverage (lines_covered, lines_missed, percentage_covered) of the source file
         """
         # Verify the report was updated after the test command
         self.verify_report_update(time_of_test_command)
@@ -70,8 +99,54 @@ class CoverageProcessor:
             return self.parse_coverage_report()
         else:
             # Return coverage for just the source file
-            lines_covered, lines_missed, percentage_covered = self._parse_single_file_coverage()
-            return lines_covered, lines_missed, percentage_covered
+            return self._parse_single_file_coverage()
+
+    def _cached_parse(self, report_path: Optional[str], scope: Optional[str], parse):
+        """
+        Return `parse()` for the report at `report_path`, memoized by the report's stat signature.
+
+        Args:
+            report_path: The report file the result is derived from
+            scope: The source file for single-file results, None for whole-report results
+            parse: Callable producing the result on a cache miss
+        """
+        try:
+            stat = os.stat(report_path)
+        except (OSError, TypeError):
+            return parse()
+
+        key = (os.path.abspath(report_path), stat.st_mtime_ns, stat.st_size, self.coverage_type.value, scope)
+        with self._parse_cache_lock:
+            if key in self._parse_cache:
+                self._parse_cache.move_to_end(key)
+                return self._parse_cache[key]
+
+        result = self._freeze(parse())
+        with self._parse_cache_lock:
+            self._parse_cache[key] = result
+            while len(self._parse_cache) > self.PARSE_CACHE_SIZE:
+                self._parse_cache.popitem(last=False)
+        return result
+
+    @staticmethod
+    def _freeze(result):
+        """Make a parse result safe to share: FileCoverage per file, a read-only mapping for per-file results."""
+        def freeze_file(file_data):
+            if isinstance(file_data, FileCoverage):
+                return file_data
+            if isinstance(file_data, (list, tuple)) and len(file_data) >= 2:
+                return FileCoverage.from_lines(file_data[0], file_data[1])
+            return file_data
+
+        if isinstance(result, dict):
+            return MappingProxyType({path: freeze_file(data) for path, data in result.items()})
+        return freeze_file(result)
+
+    @classmethod
+    def clear_parse_cache(cls) -> None:
+        """Drop all cached parse results."""
+        with cls._parse_cache_lock:
+            cls._parse_cache.clear()
 
     def verify_report_update(self, time_of_test_command: int):
         """Verify that the coverage report was updated after the test command."""
@@ -91,8 +166,15 @@ class CoverageProcessor:
         Parse the coverage report and return coverage info for all files.
         
         Returns:
-            Dict mapping file paths to (lines_covered, lines_missed, percentage_covered) tuples
+            Read-only mapping of file paths to FileCoverage (lines_covered, lines_missed, percentage_covered)
         """
+        if self.coverage_type == CoverageType.DIFF_COVER_JSON:
+            report_path = self.diff_coverage_report_path
+        else:
+            report_path = self.file_path
+        return self._cached_parse(report_path, None, self._parse_coverage_report_uncached)
+
+    def _parse_coverage_report_uncached(self) -> Dict:
         if self.coverage_type == CoverageType.COBERTURA:
             return self.parse_coverage_report_cobertura()
         elif self.coverage_type == CoverageType.LCOV:
@@ -104,8 +186,13 @@ class CoverageProcessor:
         else:
             raise NotImplementedError(f"Coverage type {self.coverage_type} not supported")
 
-    def _parse_single_file_coverage(self) -> Tuple[List, List, float]:
+    def _parse_single_file_coverage(self) -> FileCoverage:
         """Parse coverage for the specific source file."""
+        return self._cached_parse(
+            self.file_path, os.path.abspath(self.src_file_path), self._parse_single_file_coverage_uncached
+        )
+
+    def _parse_single_file_coverage_uncached(self) -> Tuple[List, List, float]:
         if self.coverage_type == CoverageType.COBERTURA:
             return self._parse_cobertura_single_file()
         elif self.coverage_type == CoverageType.LCOV:
@@ -120,18 +207,12 @@ class CoverageProcessor:
         coverage_file = filename or self.file_path
         
         try:
-            tree = ET.parse(coverage_file)
-            root = tree.getroot()
-            
             if self.use_report_coverage_feature_flag:
                 # Return coverage for all files
                 file_coverage_dict = {}
                 
-                for cls in root.iter('class'):
-                    filename = cls.get('filename')
-                    if filename:
-                        lines_covered, lines_missed, percentage = self.parse_coverage_data_for_class(cls)
-                        file_coverage_dict[filename] = (lines_covered, lines_missed, percentage)
+                for filename, class_coverage in self._iter_cobertura_classes(coverage_file):
+                    file_coverage_dict[filename] = class_coverage
                         
                 return file_coverage_dict
             else:
@@ -145,14 +226,10 @@ class CoverageProcessor:
     def _parse_cobertura_single_file(self) -> Tuple[List, List, float]:
         """Parse Cobertura coverage for a single file."""
         try:
-            tree = ET.parse(self.file_path)
-            root = tree.getroot()
-            
-            # Find the class/file that matches our source file
-            for cls in root.iter('class'):
-                filename = cls.get('filename')
-                if filename and self._file_matches(filename, self.src_file_path):
-                    return self.parse_coverage_data_for_class(cls)
+            # Find the class/file that matches our source file; the rest of the report is not read
+            for filename, class_coverage in self._iter_cobertura_classes(self.file_path):
+                if self._file_matches(filename, self.src_file_path):
+                    return class_coverage
                     
             # If not found, return empty coverage
             self.logger.warning(f"Source file {self.src_file_path} not found in coverage report")
@@ -162,7 +239,40 @@ class CoverageProcessor:
             self.logger.error(f"Error parsing Cobertura coverage: {e}")
             return [], [], 0.0
 
-    def parse_coverage_data_for_class(self, cls) -> Tuple[List, List, float]:
+    def _iter_cobertura_classes(self, report_path: str) -> Iterator[Tuple[str, FileCoverage]]:
+        """
+        Stream (filename, (lines_covered, lines_missed, percentage)) for each <class> of a Cobertura report.
+
+        The report is read incrementally with iterparse and every class is cleared once
+        consumed, so memory stays flat regardless of the report size. Closing the
+        iterator early stops reading the file.
+        """
+        with open(report_path, 'rb') as f:
+            filename = None
+            lines_covered: List[int] = []
+            lines_missed: List[int] = []
+            for event, elem in ET.iterparse(f, events=('start', 'end')):
+                if event == 'start':
+                    if elem.tag == 'class':
+                        filename = elem.get('filename')
+                        lines_covered, lines_missed = [], []
+                elif elem.tag == 'line':
+                    if filename:
+                        if int(elem.get('hits', 0)) > 0:
+                            lines_covered.append(int(elem.get('number', 0)))
+                        else:
+                            lines_missed.append(int(elem.get('number', 0)))
+                    elem.clear()
+                elif elem.tag == 'class':
+                    if filename:
+                        yield filename, FileCoverage.from_lines(lines_covered, lines_missed)
+                    filename = None
+                    elem.clear()
+                elif elem.tag == 'package':
+                    # Drop the emptied <class> shells as well
+                    elem.clear()
+
+    def parse_coverage_data_for_class(self, cls) -> FileCoverage:
         """Parse coverage data for a specific class element."""
         lines_covered = []
         lines_missed = []
@@ -176,60 +286,94 @@ class CoverageProcessor:
             else:
                 lines_missed.append(line_number)
                 
-        total_lines = len(lines_covered) + len(lines_missed)
-        percentage_covered = len(lines_covered) / total_lines if total_lines > 0 else 0.0
-        
-        return lines_covered, lines_missed, percentage_covered
+        return FileCoverage.from_lines(lines_covered, lines_missed)
 
     def parse_coverage_report_lcov(self) -> Dict:
         """Parse LCOV coverage report."""
         file_coverage_dict = {}
         
         try:
-            with open(self.file_path, 'r') as f:
-                current_file = None
-                lines_covered = []
-                lines_missed = []
-                
-                for line in f:
-                    line = line.strip()
-                    
-                    if line.startswith('SF:'):  # Source file
-                        current_file = line[3:]  # Remove 'SF:' prefix
-                        lines_covered = []
-                        lines_missed = []
-                        
-                    elif line.startswith('DA:'):  # Line data
-                        parts = line[3:].split(',')  # Remove 'DA:' prefix
-                        if len(parts) >= 2:
-                            line_num = int(parts[0])
-                            hit_count = int(parts[1])
-                            
-                            if hit_count > 0:
-                                lines_covered.append(line_num)
-                            else:
-                                lines_missed.append(line_num)
-                                
-                    elif line == 'end_of_record' and current_file:
-                        total_lines = len(lines_covered) + len(lines_missed)
-                        percentage = len(lines_covered) / total_lines if total_lines > 0 else 0.0
-                        file_coverage_dict[current_file] = (lines_covered, lines_missed, percentage)
+            for current_file, file_coverage in self._iter_lcov_records(self.file_path):
+                file_coverage_dict[current_file] = file_coverage
                         
         except Exception as e:
             self.logger.error(f"Error parsing LCOV report: {e}")
             
         return file_coverage_dict
 
-    def _parse_lcov_single_file(self) -> Tuple[List, List, float]:
+    def _parse_lcov_single_file(self) -> FileCoverage:
         """Parse LCOV coverage for a single file."""
-        file_coverage = self.parse_coverage_report_lcov()
-        
-        for file_path, (lines_covered, lines_missed, percentage) in file_coverage.items():
-            if self._file_matches(file_path, self.src_file_path):
-                return lines_covered, lines_missed, percentage
+        try:
+            # Records of other files are skipped without being parsed
+            for file_path, file_coverage in self._iter_lcov_records(self.file_path, only_source_file=True):
+                return file_coverage
+        except Exception as e:
+            self.logger.error(f"Error parsing LCOV report: {e}")
                 
         return [], [], 0.0
 
+    def _iter_lcov_records(self, report_path: str, only_source_file: bool = False) -> Iterator[Tuple[str, FileCoverage]]:
+        """
+        Yield (source path, FileCoverage) for the records of an LCOV report.
+
+        The report is memory-mapped and scanned with precompiled bytes regular
+        expressions, so only line numbers are extracted and no per-line strings are
+        created. BRDA and FNDA records fill in branch and function coverage of the same
+        record.
+
+        Args:
+            report_path: Path to the LCOV report
+            only_source_file: Only yield the first record matching the source file;
+                the bodies of the other records are jumped over.
+        """
+        with open(report_path, 'rb') as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                return
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as report:
+                position = 0
+                while True:
+                    source = _LCOV_SOURCE.search(report, position)
+                    if source is None:
+                        return
+                    source_path = source.group(1).decode('utf-8', 'replace').strip()
+                    if only_source_file and not self._file_matches(source_path, self.src_file_path):
+                        position = source.end()
+                        continue
+
+                    file_coverage, position = self._parse_lcov_record(report, source.end())
+                    yield source_path, file_coverage
+                    if only_source_file:
+                        return
+
+    @staticmethod
+    def _parse_lcov_record(report, start: int) -> Tuple[FileCoverage, int]:
+        """Parse the LCOV record body starting at `start`; returns its coverage and the position after it."""
+        end = report.find(b'end_of_record', start)
+        next_source = _LCOV_SOURCE.search(report, start)
+        if next_source is not None and (end < 0 or next_source.start() < end):
+            # Record without end_of_record: stop before the next one
+            end = next_source.start()
+        elif end < 0:
+            end = len(report)
+
+        branches: Dict[int, Tuple[int, int]] = {}
+        for line, taken in _LCOV_BRANCH.findall(report, start, end):
+            branch_taken, branch_total = branches.get(int(line), (0, 0))
+            branches[int(line)] = (branch_taken + (taken != b'-' and int(taken) > 0), branch_total + 1)
+
+        functions: Dict[str, int] = {}
+        for hits, name in _LCOV_FUNCTION.findall(report, start, end):
+            name = name.decode('utf-8', 'replace')
+            functions[name] = functions.get(name, 0) + int(hits)
+
+        file_coverage = FileCoverage.from_lines(
+            map(int, _LCOV_LINE_HIT.findall(report, start, end)),
+            map(int, _LCOV_LINE_MISSED.findall(report, start, end)),
+            branches=branches,
+            functions=functions,
+        )
+        return file_coverage, end
+
     def parse_coverage_report_jacoco(self) -> Union[Tuple[List, List, float], Dict]:
         """Parse JaCoCo coverage report (CSV format)."""
         # Note: JaCoCo support is minimal since we focus on Python/JavaScript
@@ -256,10 +400,7 @@ class CoverageProcessor:
                 covered_lines = file_data.get('covered_lines', [])
                 missed_lines = file_data.get('missing_lines', [])
                 
-                total_lines = len(covered_lines) + len(missed_lines)
-                percentage = len(covered_lines) / total_lines if total_lines > 0 else 0.0
-                
-                file_coverage_dict[file_path] = (covered_lines, missed_lines, percentage)
+                file_coverage_dict[file_path] = FileCoverage.from_lines(covered_lines, missed_lines)
                 
             return file_coverage_dict
             
@@ -267,6 +408,93 @@ class CoverageProcessor:
             self.logger.error(f"Error parsing diff coverage report: {e}")
             return {}
 
+    def parse_test_contexts(self, data_file: str) -> Dict[str, LineSet]:
+        """
+        Read per-test covered lines of the source file from coverage.py dynamic contexts.
+
+        The data must be recorded with contexts enabled (e.g. pytest-cov's
+        `--cov-context=test`). Both the `.coverage` SQLite database and the JSON
+        report written by `coverage json --show-contexts` are supported.
+
+        Args:
+            data_file: Path to the `.coverage` database or the JSON report
+
+        Returns:
+            Dict mapping test node ids (without the `|setup`/`|run`/`|teardown` phase)
+            to the LineSet of source lines they executed. Lines run outside any test, such as
+            module imports, are stored under the empty string. Empty if the file is
+            missing or has no contexts.
+        """
+        test_lines: Dict[str, LineSet] = {}
+        try:
+            if data_file.endswith('.json'):
+                contexts_by_line = self._read_json_contexts(data_file)
+            else:
+                contexts_by_line = self._read_sqlite_contexts(data_file)
+        except (OSError, ValueError, sqlite3.Error) as e:
+            self.logger.warning(f"Could not read coverage contexts from {data_file}: {e}")
+            return {}
+
+        for context, lines in contexts_by_line.items():
+            test = context.split('|', 1)[0]
+            test_lines[test] = test_lines.get(test, LineSet()) | lines
+        return test_lines
+
+    def _read_sqlite_contexts(self, data_file: str) -> Dict[str, LineSet]:
+        """Return {context: lines} of the source file from a coverage.py SQLite data file."""
+        if not os.path.exists(data_file):
+            return {}
+
+        connection = sqlite3.connect(f"file:{data_file}?mode=ro", uri=True)
+        try:
+            file_ids = [
+                file_id for file_id, path in connection.execute("SELECT id, path FROM file")
+                if self._file_matches(path, self.src_file_path)
+            ]
+            if not file_ids:
+                return {}
+            placeholders = ",".join("?" * len(file_ids))
+
+            contexts_by_line: Dict[str, LineSet] = {}
+            rows = connection.execute(
+                "SELECT context.context, line_bits.numbits FROM line_bits "
+                f"JOIN context ON context.id = line_bits.context_id WHERE line_bits.file_id IN ({placeholders})",
+                file_ids,
+            )
+            for context, numbits in rows:
+                # numbits: bit n of the blob is set when line n was executed, i.e. a little-endian bitset
+                lines = LineSet.from_bits(int.from_bytes(numbits, 'little'))
+                contexts_by_line[context] = contexts_by_line.get(context, LineSet()) | lines
+
+            # With branch coverage, lines are only recorded as arcs
+            rows = connection.execute(
+                "SELECT context.context, arc.fromno, arc.tono FROM arc "
+                f"JOIN context ON context.id = arc.context_id WHERE arc.file_id IN ({placeholders})",
+                file_ids,
+            )
+            arc_lines: Dict[str, Set[int]] = {}
+            for context, from_line, to_line in rows:
+                arc_lines.setdefault(context, set()).update(line for line in (from_line, to_line) if line > 0)
+            for context, lines in arc_lines.items():
+                contexts_by_line[context] = contexts_by_line.get(context, LineSet()) | lines
+            return contexts_by_line
+        finally:
+            connection.close()
+
+    def _read_json_contexts(self, data_file: str) -> Dict[str, Set[int]]:
+        """Return {context: lines} of the source file from a `coverage json --show-contexts` report."""
+        with open(data_file, 'r') as f:
+            data = json.load(f)
+
+        contexts_by_line: Dict[str, Set[int]] = {}
+        for path, file_data in data.get('files', {}).items():
+            if not self._file_matches(path, self.src_file_path):
+                continue
+            for line, contexts in file_data.get('contexts', {}).items():
+                for context in contexts:
+                    contexts_by_line.setdefault(context, set()).add(int(line))
+        return contexts_by_line
+
     def _file_matches(self, report_path: str, source_path: str) -> bool:
         """Check if a file path from the report matches our source file."""
         # Normalize paths for comparison
@@ -278,11 +506,13 @@ class CoverageProcessor:
             return True
             
         # Check if source path ends with report path (relative vs absolute)
-        if source_path.endswith(report_path):
+        if source_path.endswith(os.sep + report_path):
             return True
             
-        # Check if report path ends with source path
-        if report_path.endswith(os.path.basename(source_path)):
+        # Check if report path ends with source path, on a path component boundary
+        # so that e.g. "test_calculator.py" does not match "calculator.py"
+        basename = os.path.basename(source_path)
+        if report_path == basename or report_path.endswith(os.sep + basename):
             return True
             
         return False
@@ -0,0 +1,167 @@
+"""
+Compact per-file coverage results.
+
+Line numbers are stored as bitsets in arbitrary-precision integers: bit n is
+set when line n is in the set. Union, intersection and difference are single
+C-level operations over machine words, and counting uses `int.bit_count`, so
+comparing the coverage of two runs never materializes per-line Python ints.
+"""
+
+from types import MappingProxyType
+from typing import Dict, Iterable, Iterator, Optional, Tuple, Union
+
+
+class LineSet:
+    """An immutable set of line numbers backed by a bitset."""
+
+    __slots__ = ("_bits",)
+
+    def __init__(self, lines: Iterable[int] = ()):
+        if isinstance(lines, LineSet):
+            self._bits = lines._bits
+            return
+        lines = list(lines)
+        buffer = bytearray((max(lines) >> 3) + 1 if lines else 0)
+        for line in lines:
+            buffer[line >> 3] |= 1 << (line & 7)
+        self._bits = int.from_bytes(buffer, "little")
+
+    @classmethod
+    def from_bits(cls, bits: int) -> "LineSet":
+        line_set = cls.__new__(cls)
+        line_set._bits = bits
+        return line_set
+
+    @property
+    def bits(self) -> int:
+        return self._bits
+
+    @staticmethod
+    def _coerce(other: Union["LineSet", Iterable[int]]) -> int:
+        return other._bits if isinstance(other, LineSet) else LineSet(other)._bits
+
+    def __or__(self, other) -> "LineSet":
+        return LineSet.from_bits(self._bits | self._coerce(other))
+
+    def __and__(self, other) -> "LineSet":
+        return LineSet.from_bits(self._bits & self._coerce(other))
+
+    def __sub__(self, other) -> "LineSet":
+        return LineSet.from_bits(self._bits & ~self._coerce(other))
+
+    __ror__ = __or__
+    __rand__ = __and__
+
+    def __rsub__(self, other) -> "LineSet":
+        return LineSet.from_bits(self._coerce(other) & ~self._bits)
+
+    def __len__(self) -> int:
+        return self._bits.bit_count()
+
+    def __bool__(self) -> bool:
+        return self._bits != 0
+
+    def __contains__(self, line: int) -> bool:
+        return line >= 0 and (self._bits >> line) & 1 == 1
+
+    def __iter__(self) -> Iterator[int]:
+        data = self._bits.to_bytes((self._bits.bit_length() + 7) >> 3, "little")
+        for index, byte in enumerate(data):
+            while byte:
+                low = byte & -byte
+                yield (index << 3) + low.bit_length() - 1
+                byte ^= low
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, LineSet):
+            return self._bits == other._bits
+        if isinstance(other, (set, frozenset, list, tuple)):
+            return self._bits == self._coerce(other)
+        return NotImplemented
+
+    def __hash__(self) -> int:
+        return hash(self._bits)
+
+    def __repr__(self) -> str:
+        return f"LineSet({list(self)})"
+
+
+class FileCoverage:
+    """
+    Coverage of one file: (lines_covered, lines_missed, percentage_covered).
+
+    It unpacks and indexes like the plain 3-tuples the coverage parsers used to
+    return. Reports that carry them (LCOV) also fill in branch and function data.
+    """
+
+    __slots__ = ("lines_covered", "lines_missed", "percentage_covered", "branches", "functions")
+
+    def __init__(
+        self,
+        lines_covered: LineSet,
+        lines_missed: LineSet,
+        percentage_covered: float,
+        branches: Optional[Dict[int, Tuple[int, int]]] = None,
+        functions: Optional[Dict[str, int]] = None,
+    ):
+        """
+        Args:
+            lines_covered: Lines executed at least once.
+            lines_missed: Executable lines that were not executed.
+            percentage_covered: Covered fraction of the executable lines, 0.0 to 1.0.
+            branches: Line number -> (branches taken, branches total), if the report has branch data.
+            functions: Function name -> hit count, if the report has function data.
+        """
+        self.lines_covered = lines_covered
+        self.lines_missed = lines_missed
+        self.percentage_covered = percentage_covered
+        # Results are shared through the parse cache, so keep them read-only
+        self.branches = MappingProxyType(dict(branches or {}))
+        self.functions = MappingProxyType(dict(functions or {}))
+
+    @classmethod
+    def from_lines(
+        cls,
+        lines_covered: Iterable[int],
+        lines_missed: Iterable[int],
+        branches: Optional[Dict[int, Tuple[int, int]]] = None,
+        functions: Optional[Dict[str, int]] = None,
+    ) -> "FileCoverage":
+        covered, missed = LineSet(lines_covered), LineSet(lines_missed)
+        total_lines = len(covered) + len(missed)
+        percentage = len(covered) / total_lines if total_lines > 0 else 0.0
+        return cls(covered, missed, percentage, branches, functions)
+
+    @property
+    def branch_percentage(self) -> Optional[float]:
+        """Fraction of branches taken, or None without branch data."""
+        total = sum(branch_total for _, branch_total in self.branches.values())
+        if not total:
+            return None
+        return sum(taken for taken, _ in self.branches.values()) / total
+
+    def newly_covered(self, previous: "FileCoverage") -> LineSet:
+        """Lines covered here that `previous` did not cover."""
+        return self.lines_covered - previous.lines_covered
+
+    def __iter__(self) -> Iterator:
+        return iter((self.lines_covered, self.lines_missed, self.percentage_covered))
+
+    def __getitem__(self, index):
+        return (self.lines_covered, self.lines_missed, self.percentage_covered)[index]
+
+    def __len__(self) -> int:
+        return 3
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, (FileCoverage, tuple)):
+            return tuple(self) == tuple(other)
+        return NotImplemented
+
+    __hash__ = None
+
+    def __repr__(self) -> str:
+        return (
+            f"FileCoverage(covered={len(self.lines_covered)}, missed={len(self.lines_missed)}, "
+            f"percentage={self.percentage_covered:.2%})"
+        )
@@ -8,7 +8,7 @@ from grep_ast.parsers import PARSERS, filename_to_lang
 # from pygments.token import Token
 from tree_sitter_languages import get_language, get_parser
 
-from cover_agent.lsp_logic.file_map.queries.get_queries import get_queries_scheme
+from lsp.file_map.queries.get_queries import get_queries_scheme
 
 
 class FileMap:
@@ -44,7 +44,7 @@ class FileMap:
         self.margin = margin
 
     def summarize(self):
-        query_results = self.get_query_results()
+        query_results, _ = self.get_query_results() or ([], [])
         summary_str = self.query_processing(query_results)
         return summary_str
 
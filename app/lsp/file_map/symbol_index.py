@@ -0,0 +1,245 @@
+"""
+Project-wide index of the symbols each file defines and references.
+
+The index is built from the FileMap tree-sitter captures of every file of the
+project's language and answers context lookups without a language server round
+trip per symbol. It is stored on disk and updated incrementally: a file is only
+parsed again when its content hash changes.
+
+The tags only record function and class definitions, so the index answers a
+lookup only when the captures settle it: a name defined in a single project file
+that the other file's imports point to. Everything else (constants, names with
+no indexed definition, names defined in several files) is left to the language
+server.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import tempfile
+from threading import Lock
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from config.config_loader import user_cache_dir
+from repo_scanner import RepoScanner
+
+
+# Bump when the index layout or the tag extraction changes, so older indexes are rebuilt
+SYMBOL_INDEX_VERSION = 2
+
+# File names whose module is named after their directory, e.g. `pkg/__init__.py`
+_PACKAGE_FILES = ("__init__", "index")
+
+
+def module_names(relative_path: str) -> Set[str]:
+    """Names under which other files import `relative_path`, e.g. `parser` for `pkg/parser.py`."""
+    stem = os.path.splitext(os.path.basename(relative_path))[0]
+    if stem in _PACKAGE_FILES:
+        return {os.path.basename(os.path.dirname(relative_path))} - {""}
+    return {stem}
+
+
+class SymbolIndex:
+    """Definitions (name -> lines) and mentioned identifiers per file of a project, keyed by relative path."""
+
+    def __init__(
+        self,
+        project_root: str,
+        language: str,
+        index_path: Optional[str] = None,
+        logger: Optional[logging.Logger] = None,
+    ):
+        """
+        Args:
+            project_root: The project root.
+            language: Only files of this language are indexed.
+            index_path: JSON file holding the index; defaults to the user cache directory.
+            logger: Optional logger instance.
+        """
+        self.project_root = os.path.abspath(project_root)
+        self.language = language
+        self.logger = logger or logging.getLogger(__name__)
+        if index_path is None:
+            digest = hashlib.sha256(f"{self.project_root}:{language}".encode("utf-8")).hexdigest()[:16]
+            index_path = os.path.join(user_cache_dir(), f"symbols-{digest}.json")
+        self.index_path = index_path
+        self._files: Dict[str, dict] = self._load()
+        self._definitions: Dict[str, Set[str]] = {}
+        self._mentions: Dict[str, Set[str]] = {}
+        self._identifiers: Dict[str, Set[str]] = {}
+        self._lock = Lock()
+
+    def _load(self) -> Dict[str, dict]:
+        try:
+            with open(self.index_path, "r", encoding="utf-8") as f:
+                index = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        if not isinstance(index, dict) or index.get("version") != SYMBOL_INDEX_VERSION:
+            return {}
+        return index.get("files", {})
+
+    def _save(self) -> None:
+        try:
+            os.makedirs(os.path.dirname(self.index_path), exist_ok=True)
+            # Write then rename, so a concurrent run never reads a partial index
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(self.index_path), suffix=".tmp")
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump({"version": SYMBOL_INDEX_VERSION, "files": self._files}, f)
+            os.replace(tmp_path, self.index_path)
+        except OSError as e:
+            self.logger.debug(f"Could not save the symbol index {self.index_path}: {e}")
+
+    def _parse(self, relative_path: str) -> Tuple[Dict[str, List[int]], List[str]]:
+        """
+        Definitions of a file and every identifier it mentions (calls, attribute names,
+        imports, annotations, base classes...), from its FileMap captures.
+        """
+        from lsp.file_map.file_map import FileMap
+
+        file_map = FileMap(os.path.join(self.project_root, relative_path), project_base_path=self.project_root)
+        _, captures = file_map.get_query_results() or ([], [])
+        definitions: Dict[str, List[int]] = {}
+        identifiers: Set[str] = set()
+        for node, tag in captures:
+            if tag != "ref" and not tag.startswith("name."):
+                continue
+            name = node.text.decode("utf-8")
+            identifiers.add(name)
+            if tag.startswith("name.definition."):
+                definitions.setdefault(name, []).append(node.start_point[0])
+        return definitions, sorted(identifiers)
+
+    def refresh(self) -> int:
+        """
+        Bring the index up to date with the project's files.
+
+        Files whose size and mtime are unchanged are not read; changed ones are hashed
+        and only parsed again when the hash differs.
+
+        Returns:
+            The number of files parsed.
+        """
+        with self._lock:
+            files: Dict[str, dict] = {}
+            parsed = 0
+            scanner = RepoScanner(self.project_root, language=self.language, logger=self.logger)
+            for relative_path in scanner.files(language=self.language):
+                entry = self._files.get(relative_path)
+                try:
+                    stat = os.stat(os.path.join(self.project_root, relative_path))
+                except OSError:
+                    continue
+                stamp = [stat.st_mtime_ns, stat.st_size]
+                if entry is not None and entry["stamp"] == stamp:
+                    files[relative_path] = entry
+                    continue
+                try:
+                    with open(os.path.join(self.project_root, relative_path), "rb") as f:
+                        sha = hashlib.sha256(f.read()).hexdigest()
+                except OSError:
+                    continue
+                if entry is None or entry["sha"] != sha:
+                    try:
+                        definitions, identifiers = self._parse(relative_path)
+                    except Exception as e:
+                        self.logger.warning(f"Skipping file {relative_path} in the symbol index: {e}")
+                        continue
+                    entry = {"definitions": definitions, "identifiers": identifiers}
+                    parsed += 1
+                files[relative_path] = dict(entry, stamp=stamp, sha=sha)
+
+            changed = parsed > 0 or files != self._files
+            self._files = files
+            self._definitions, self._mentions = {}, {}
+            self._identifiers = {relative_path: set(entry["identifiers"]) for relative_path, entry in files.items()}
+            for relative_path, entry in files.items():
+                for name in entry["definitions"]:
+                    self._definitions.setdefault(name, set()).add(relative_path)
+                for name in entry["identifiers"]:
+                    self._mentions.setdefault(name, set()).add(relative_path)
+            if changed:
+                self._save()
+            return parsed
+
+    def defining_files(self, name: str) -> Set[str]:
+        return self._definitions.get(name, set())
+
+    def mentioning_files(self, name: str) -> Set[str]:
+        return self._mentions.get(name, set())
+
+    def _imports(self, relative_path: str, imported_path: str) -> bool:
+        """Whether `relative_path` mentions a module name of `imported_path`, as its imports do."""
+        return not self._identifiers[relative_path].isdisjoint(module_names(imported_path))
+
+    def direct_context(self, relative_path: str, names: Iterable[str]) -> Tuple[Set[str], Set[str], Set[str]]:
+        """
+        The files defining the symbols `names` used in `relative_path`.
+
+        A name defined in the file itself refers to that definition. A name defined in a
+        single other file resolves to it when `relative_path` imports that file's module.
+
+        Returns:
+            (context files as absolute paths, the symbols found in them, the names the
+            index cannot resolve, which need the language server).
+        """
+        entry = self._files.get(relative_path)
+        if entry is None:
+            return set(), set(), set(names)
+        context_files, context_symbols, unresolved = set(), set(), set()
+        for name in names:
+            if name in entry["definitions"]:
+                continue
+            defining_files = self.defining_files(name) - {relative_path}
+            if len(defining_files) == 1:
+                defining_file = next(iter(defining_files))
+                if self._imports(relative_path, defining_file):
+                    context_files.add(os.path.join(self.project_root, defining_file))
+                    context_symbols.add(name)
+                    continue
+            # Constants, imported names, external or ambiguous names
+            unresolved.add(name)
+        return context_files, context_symbols, unresolved
+
+    def reverse_context(self, relative_path: str, names: Iterable[str]) -> Tuple[Set[str], Set[str], Set[str]]:
+        """
+        The files referencing the symbols `names` defined in `relative_path`.
+
+        A name defined only in `relative_path` resolves when every other file mentioning
+        it imports the module of `relative_path`; those files are its references.
+
+        Returns:
+            (referencing files as absolute paths, the symbols they reference, the names
+            the index cannot resolve, which need the language server).
+        """
+        if relative_path not in self._files:
+            return set(), set(), set(names)
+        reverse_context_files, reverse_context_symbols, unresolved = set(), set(), set()
+        for name in names:
+            mentioning_files = self.mentioning_files(name) - {relative_path}
+            if self.defining_files(name) - {relative_path} or not all(
+                self._imports(path, relative_path) for path in mentioning_files
+            ):
+                unresolved.add(name)
+                continue
+            for path in mentioning_files:
+                reverse_context_files.add(os.path.join(self.project_root, path))
+            if mentioning_files:
+                reverse_context_symbols.add(name)
+        return reverse_context_files, reverse_context_symbols, unresolved
+
+
+_symbol_indexes: Dict[Tuple[str, str], SymbolIndex] = {}
+_symbol_indexes_lock = Lock()
+
+
+def get_symbol_index(project_root: str, language: str) -> SymbolIndex:
+    """The process-wide, up-to-date symbol index of a project."""
+    key = (os.path.abspath(project_root), language)
+    with _symbol_indexes_lock:
+        if key not in _symbol_indexes:
+            _symbol_indexes[key] = SymbolIndex(project_root, language)
+    symbol_index = _symbol_indexes[key]
+    symbol_index.refresh()
+    return symbol_index
@@ -141,6 +141,7 @@ class LanguageServer:
 
         self.language_id = language_id
         self.open_file_buffers: Dict[str, LSPFileBuffer] = {}
+        self.max_concurrent_requests = max(1, config.max_concurrent_requests)
 
     @asynccontextmanager
     async def start_server(self) -> AsyncIterator["LanguageServer"]:
@@ -699,24 +700,31 @@ class LanguageServer:
 
         return multilspy_types.Hover(**response)
 
-    async def get_direct_context(self, captures, language, project_dir, rel_file):
+    async def get_direct_context(self, captures, language, project_dir, rel_file, symbol_index=None):
+        """
+        Files defining the symbols referenced by `rel_file`. With a SymbolIndex, the names
+        it resolves are answered from the index and the rest are sent to the server.
+        The definition requests are sent concurrently, see `_request_in_rounds`.
+        """
         target_file = str(os.path.join(project_dir, rel_file))
         skip_found_symbols = True
         context_files = set()
         context_symbols = set()
         context_symbols_and_files = set()
-        for ref in captures:
+        if symbol_index is not None:
+            context_files, context_symbols, unresolved = symbol_index.direct_context(
+                rel_file, {ref[0].text.decode() for ref in captures}
+            )
+            captures = [ref for ref in captures if ref[0].text.decode() in unresolved]
+        # getting direct context - which files are referenced by the target file
+        async for ref, symbol_definition in _request_in_rounds(
+            self,
+            self.request_definition,
+            rel_file,
+            captures,
+            lambda name: name in context_symbols and skip_found_symbols,
+        ):
             name_symbol = str(ref[0].text.decode())
-            if name_symbol in context_symbols and skip_found_symbols:
-                continue
-            # getting direct context - which files are referenced by the target file
-            try:
-                symbol_definition = await self.request_definition(
-                    rel_file, line=ref[0].start_point[0], column=ref[0].start_point[1]
-                )
-                # sleep(0.01)
-            except:
-                symbol_definition = []
             for d in symbol_definition:
                 line = ref[0].start_point[0]
                 d_path = uri_to_path(d["uri"])
@@ -736,28 +744,33 @@ class LanguageServer:
                         context_symbols_and_files.add((name_symbol, rel_d_path))
         return context_files, context_symbols
 
-    async def get_reverse_context(self, captures, project_dir, rel_file):
+    async def get_reverse_context(self, captures, project_dir, rel_file, symbol_index=None):
+        """
+        Files referencing the symbols defined in `rel_file`. With a SymbolIndex, the names
+        it resolves are answered from the index and the rest are sent to the server.
+        The reference requests are sent concurrently, see `_request_in_rounds`.
+        """
         target_file = str(os.path.join(project_dir, rel_file))
         skip_found_symbols = True
         reverse_context_files = set()
         reverse_context_symbols = set()
         reverse_context_symbols_and_files = set()
-        for ref in captures:
+        # only consider definition symbols for reverse context
+        captures = [ref for ref in captures if "name.definition" in ref[1]]
+        if symbol_index is not None:
+            reverse_context_files, reverse_context_symbols, unresolved = symbol_index.reverse_context(
+                rel_file, {ref[0].text.decode() for ref in captures}
+            )
+            captures = [ref for ref in captures if ref[0].text.decode() in unresolved]
+        # getting reverse context - which files reference the target file
+        async for ref, symbol_references in _request_in_rounds(
+            self,
+            self.request_references,
+            rel_file,
+            captures,
+            lambda name: name in reverse_context_symbols and skip_found_symbols,
+        ):
             symbol_name = str(ref[0].text.decode())
-            if symbol_name in reverse_context_symbols and skip_found_symbols:
-                continue
-            if (
-                "name.definition" not in ref[1]
-            ):  # only consider definition symbols for reverse context
-                continue
-            # getting reverse context - which files reference the target file
-            try:
-                symbol_references = await self.request_references(
-                    rel_file, line=ref[0].start_point[0], column=ref[0].start_point[1]
-                )
-            except:
-                symbol_references = []
-            # sleep(0.01)
             for r in symbol_references:
                 ref_path = uri_to_path(r["uri"])
                 rel_ref_path = os.path.relpath(ref_path, project_dir)
@@ -782,6 +795,59 @@ class LanguageServer:
         return reverse_context_files, reverse_context_symbols
 
 
+async def _request_in_rounds(language_server, request, relative_file_path, captures, is_found):
+    """
+    Send `request` for the captures as the one-by-one loop did: a later capture of a symbol
+    name is only sent while `is_found(name)` is false, i.e. none of the name's earlier
+    captures resolved to another file. Each round sends the next capture of every pending
+    name concurrently; the caller handles the responses of a round before the next one.
+
+    :return: Async iterator of (capture, response) pairs.
+    """
+    pending = {}
+    for ref in captures:
+        pending.setdefault(ref[0].text.decode(), []).append(ref)
+    while pending:
+        round_captures = []
+        for name, refs in list(pending.items()):
+            if is_found(name):
+                del pending[name]
+                continue
+            round_captures.append(refs.pop(0))
+            if not refs:
+                del pending[name]
+        if not round_captures:
+            return
+        responses = await _request_concurrently(language_server, request, relative_file_path, round_captures)
+        for ref, response in zip(round_captures, responses):
+            yield ref, response
+
+
+async def _request_concurrently(language_server, request, relative_file_path, captures):
+    """
+    Send `request` (e.g. request_definition) for the position of each capture, with at most
+    `max_concurrent_requests` of them in flight. The file is opened once for the whole batch.
+
+    :return: The response of each capture, in order; a failed request yields [].
+    """
+    in_flight = asyncio.Semaphore(language_server.max_concurrent_requests)
+
+    async def send(ref):
+        async with in_flight:
+            try:
+                return await request(
+                    relative_file_path,
+                    line=ref[0].start_point[0],
+                    column=ref[0].start_point[1],
+                )
+            except Exception:
+                return []
+
+    # Requests opening the file again only increment its reference count
+    with language_server.open_file(relative_file_path):
+        return await asyncio.gather(*(send(ref) for ref in captures))
+
+
 @ensure_all_methods_implemented(LanguageServer)
 class SyncLanguageServer:
     """
@@ -1013,18 +1079,20 @@ class SyncLanguageServer:
         ).result()
         return result
 
-    def get_direct_context(self, captures, language, project_dir, rel_file):
+    def get_direct_context(self, captures, language, project_dir, rel_file, symbol_index=None):
         result = asyncio.run_coroutine_threadsafe(
             self.language_server.get_direct_context(
-                captures, language, project_dir, rel_file
+                captures, language, project_dir, rel_file, symbol_index
             ),
             self.loop,
         ).result()
         return result
 
-    def get_reverse_context(self, captures, project_dir, rel_file):
+    def get_reverse_context(self, captures, project_dir, rel_file, symbol_index=None):
         result = asyncio.run_coroutine_threadsafe(
-            self.language_server.get_reverse_context(captures, project_dir, rel_file),
+            self.language_server.get_reverse_context(
+                captures, project_dir, rel_file, symbol_index
+            ),
             self.loop,
         ).result()
         return result
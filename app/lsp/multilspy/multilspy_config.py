@@ -30,6 +30,8 @@ class MultilspyConfig:
 
     code_language: Language
     trace_lsp_communication: bool = False
+    # Requests in flight at once when resolving the context of a file
+    max_concurrent_requests: int = 8
 
     @classmethod
     def from_dict(cls, env: dict):
@@ -7,6 +7,7 @@ from grep_ast import filename_to_lang
 
 from Unit_Test_Generator.lsp.multilspy import LanguageServer
 from cover_agent.lsp.file_map.file_map import FileMap
+from cover_agent.lsp.file_map.symbol_index import get_symbol_index
 from cover_agent.lsp.multilspy.multilspy_config import MultilspyConfig
 from cover_agent.lsp.multilspy.multilspy_logger import MultilspyLogger
 
@@ -63,6 +64,10 @@ async def run():
     query_results, captures = fname_summary.get_query_results()
     print("Tree-sitter query results for the target file done.")
 
+    print("\nUpdating the symbol index...")
+    symbol_index = get_symbol_index(project_dir, language)
+    print("Symbol index updated.")
+
     # initialize LSP server
     print("\nInitializing LSP server...")
     logger = MultilspyLogger()
@@ -74,13 +79,13 @@ async def run():
 
         print("\nGetting context ...")
         context_files, context_symbols = await lsp.get_direct_context(
-            captures, language, project_dir, rel_file
+            captures, language, project_dir, rel_file, symbol_index
         )
         print("Getting context done.")
 
         print("\nGetting reverse context ...")
         reverse_context_files, reverse_context_symbols = await lsp.get_reverse_context(
-            captures, project_dir, rel_file
+            captures, project_dir, rel_file, symbol_index
         )
         print("Getting reverse context done.")
 
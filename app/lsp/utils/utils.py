@@ -18,33 +18,13 @@ IMAGE_EXTENSIONS = {".png", ".jpg", ".jpeg", ".gif", ".bmp", ".tiff", ".webp"}
 
 
 def find_relevant_files_in_repo(repo_root: str, chat_files: list[str]):
-    gitignore_file = Path(repo_root) / ".gitignore"
-    gitignore_content = ""
-    if gitignore_file.exists():
-        with open(gitignore_file, "r") as f:
-            gitignore_content = f.read().strip().split("\n")
-
-    # get all files in the repo
-    repo_files = []
+    from repo_scanner import RepoScanner, language_for_file
+
+    # get all files in the repo with the chat files' extension, skipping ignored ones
     chat_file_type = chat_files[0].split(".")[-1]
-    root = repo_root
-    for root, dirs, files in os.walk(root):
-        for file in files:
-            file_type = file.split(".")[-1]
-            if file_type != chat_file_type:
-                continue
-            # gitignore_content
-            relative_path = os.path.relpath(os.path.join(root, file), repo_root)
-            if gitignore_content:
-                if any(
-                    relative_path.startswith(pattern) for pattern in gitignore_content
-                ):
-                    continue
-            if "venv/" in relative_path:
-                continue
-
-            repo_files.append(os.path.join(root, file))
-    return repo_files
+    language = language_for_file(chat_files[0])
+    scanner = RepoScanner(repo_root, language=language if language in IGNORED_DIRECTORIES else None)
+    return [os.path.join(repo_root, path) for path in scanner.files(extensions=(f".{chat_file_type}",))]
 
 
 class IgnorantTemporaryDirectory:
@@ -423,45 +403,43 @@ def uri_to_path(uri):
     return unquote(urlparse(uri).path)
 
 
-def is_forbidden_directory(d_path, language):
-    directories_to_ignore = []
-    if language == "python":
-        directories_to_ignore = [
-            "venv",  # Virtual environment
-            "pyenv",  # Python environment
-            "__pycache__/",  # Compiled Python files
-            "dist/",  # Distribution directories
-            "build/",  # Build directories
-        ]
-    elif language == "javascript" or language == "typescript":
-        directories_to_ignore = [
-            "node_modules/",  # Dependencies installed by npm or yarn
-            "dist/",  # Common output directory for built files
-            "build/",  # Another common output directory for built files
-            "coverage/",  # Test coverage reports
-            ".cache/",  # Cache directory (used by some build tools)
-            ".next/",  # Next.js build output
-            ".nuxt/",  # Nuxt.js build output
-            ".DS_Store",  # macOS folder attributes
-        ]
-    elif language == "java":
-        directories_to_ignore = [
-            "target/",  # Maven build directory
-            "build/",  # Gradle build directory
-            ".gradle/",  # Gradle-specific files and caches
-            ".idea/",  # IntelliJ IDEA settings
-            ".iml",  # IntelliJ IDEA module files
-            ".classpath",  # Eclipse project file
-            ".project",  # Eclipse project file
-            "out/",  # Output directory for IntelliJ IDEA
-        ]
-    elif language == "rust":
-        directories_to_ignore = [
-            "target/",  # Default output directory for compiled artifacts
-            "Cargo.lock",  # Lock file for cargo dependencies (ignored for libraries, kept for binaries)
-            ".cargo/",  # Cargo cache directory
-        ]
-    if any([directory in d_path for directory in directories_to_ignore]):
-        return True
+# Path fragments of build output, dependency and tool directories, per language
+IGNORED_DIRECTORIES = {
+    "python": (
+        "venv",  # Virtual environment
+        "pyenv",  # Python environment
+        "__pycache__/",  # Compiled Python files
+        "dist/",  # Distribution directories
+        "build/",  # Build directories
+    ),
+    "javascript": (
+        "node_modules/",  # Dependencies installed by npm or yarn
+        "dist/",  # Common output directory for built files
+        "build/",  # Another common output directory for built files
+        "coverage/",  # Test coverage reports
+        ".cache/",  # Cache directory (used by some build tools)
+        ".next/",  # Next.js build output
+        ".nuxt/",  # Nuxt.js build output
+        ".DS_Store",  # macOS folder attributes
+    ),
+    "java": (
+        "target/",  # Maven build directory
+        "build/",  # Gradle build directory
+        ".gradle/",  # Gradle-specific files and caches
+        ".idea/",  # IntelliJ IDEA settings
+        ".iml",  # IntelliJ IDEA module files
+        ".classpath",  # Eclipse project file
+        ".project",  # Eclipse project file
+        "out/",  # Output directory for IntelliJ IDEA
+    ),
+    "rust": (
+        "target/",  # Default output directory for compiled artifacts
+        "Cargo.lock",  # Lock file for cargo dependencies (ignored for libraries, kept for binaries)
+        ".cargo/",  # Cargo cache directory
+    ),
+}
+IGNORED_DIRECTORIES["typescript"] = IGNORED_DIRECTORIES["javascript"]
 
-    return False
+
+def is_forbidden_directory(d_path, language):
+    return any(directory in d_path for directory in IGNORED_DIRECTORIES.get(language, ()))
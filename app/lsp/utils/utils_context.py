@@ -1,14 +1,14 @@
 import os
 from time import sleep
 
-from jinja2 import Environment, StrictUndefined
-
 from cover_agent.lsp_logic.file_map.file_map import FileMap
+from cover_agent.lsp_logic.file_map.symbol_index import get_symbol_index
 from cover_agent.lsp_logic.multilspy import LanguageServer
 from cover_agent.lsp_logic.multilspy.multilspy_config import MultilspyConfig
 from cover_agent.lsp_logic.multilspy.multilspy_logger import MultilspyLogger
 
 from cover_agent.settings.config_loader import get_settings
+from cover_agent.settings.prompt_templates import get_prompt_templates
 from cover_agent.utils import load_yaml
 
 
@@ -34,15 +34,9 @@ async def analyze_context(test_file, context_files, args, ai_caller):
             "test_file_content": open(test_file, "r").read(),
             "context_files_names_rel": context_files_rel_filtered_list_str,
         }
-        environment = Environment(undefined=StrictUndefined)
-        system_prompt = environment.from_string(
-            get_settings().analyze_test_against_context.system
-        ).render(variables)
-        user_prompt = environment.from_string(
-            get_settings().analyze_test_against_context.user
-        ).render(variables)
+        prompt = get_prompt_templates().render("analyze_test_against_context", **variables)
         response, prompt_token_count, response_token_count = ai_caller.call_model(
-            prompt={"system": system_prompt, "user": user_prompt}, stream=False
+            prompt=prompt, stream=False
         )
         response_dict = load_yaml(response)
         if int(response_dict.get("is_this_a_unit_test", 0)) == 1:
@@ -83,8 +77,10 @@ async def find_test_file_context(args, lsp, test_file):
         # print("Tree-sitter query results for the target file done.")
 
         # print("\nGetting context ...")
+        # The project's symbol index answers what the tags settle; the server resolves the rest
+        symbol_index = get_symbol_index(args.project_root, args.project_language)
         context_files, context_symbols = await lsp.get_direct_context(
-            captures, args.project_language, args.project_root, rel_file
+            captures, args.project_language, args.project_root, rel_file, symbol_index
         )
         # filter empty files
         context_files_filtered = []
@@ -103,7 +99,12 @@ async def find_test_file_context(args, lsp, test_file):
 
 async def initialize_language_server(args):
     logger = MultilspyLogger()
-    config = MultilspyConfig.from_dict({"code_language": args.project_language})
+    config = MultilspyConfig.from_dict(
+        {
+            "code_language": args.project_language,
+            "max_concurrent_requests": get_settings().get("lsp.max_concurrent_requests", 8),
+        }
+    )
     if args.project_language == "python":
         lsp = LanguageServer.create(config, logger, args.project_root)
         sleep(0.1)
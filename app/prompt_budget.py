@@ -0,0 +1,128 @@
+"""
+Token-budgeted assembly of prompt sections.
+
+Sections are packed into the model's context window by priority. When the
+prompt does not fit, sections are replaced by their summaries (e.g. a FileMap
+outline that keeps the definitions' headers) and then clipped, lowest priority
+first, so the high priority sections keep as much of their content as possible.
+"""
+
+import logging
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional
+
+from config.token_handling import clip_tokens, estimate_tokens
+
+
+# Tokens kept free for the response: the default max_tokens of AICaller.call_model
+RESPONSE_TOKENS = 2048
+
+
+@dataclass
+class PromptSection:
+    """
+    One variable part of a prompt.
+
+    Attributes:
+        name: The template variable the section fills.
+        text: The full content.
+        priority: Lower values are kept intact longer.
+        summarize: Returns a shorter rendering of the content, or None if there is none.
+            Only called when the section has to shrink.
+    """
+
+    name: str
+    text: str
+    priority: int
+    summarize: Optional[Callable[[], Optional[str]]] = None
+
+
+class PromptBudget:
+    """Packs prompt sections into a token budget by priority."""
+
+    def __init__(self, context_window: int, reserved_tokens: int = RESPONSE_TOKENS, logger: Optional[logging.Logger] = None):
+        """
+        Args:
+            context_window: Context size of the model, in tokens.
+            reserved_tokens: Tokens kept free for the fixed prompt text and the response.
+            logger: Optional logger instance.
+        """
+        self.context_window = context_window
+        self.reserved_tokens = reserved_tokens
+        self.logger = logger or logging.getLogger(__name__)
+
+    @property
+    def available_tokens(self) -> int:
+        return max(0, self.context_window - self.reserved_tokens)
+
+    def pack(self, sections: List[PromptSection]) -> Dict[str, str]:
+        """
+        Fit the sections into the budget.
+
+        Sections are first replaced by their summaries, lowest priority first. If that
+        is not enough they are clipped, again lowest priority first. Whatever budget
+        is left afterwards is spent on restoring full texts, highest priority first.
+
+        Returns:
+            Section name -> the text to use, full, summarized or clipped.
+        """
+        texts = {section.name: section.text for section in sections}
+        full_tokens = {section.name: estimate_tokens(section.text) for section in sections}
+        tokens = dict(full_tokens)
+        budget = self.available_tokens
+        if sum(tokens.values()) <= budget:
+            return texts
+
+        def room_for(name: str) -> int:
+            return budget - (sum(tokens.values()) - tokens[name])
+
+        # Stable sort: among equal priorities, later sections are degraded first
+        lowest_first = sorted(sections, key=lambda s: s.priority, reverse=True)
+        for section in lowest_first:
+            if sum(tokens.values()) <= budget:
+                break
+            summary = section.summarize() if section.summarize else None
+            if summary is not None and estimate_tokens(summary) < tokens[section.name]:
+                texts[section.name], tokens[section.name] = summary, estimate_tokens(summary)
+
+        for section in lowest_first:
+            if sum(tokens.values()) <= budget:
+                break
+            allowed = max(0, room_for(section.name))
+            texts[section.name] = clip_tokens(texts[section.name], allowed, num_input_tokens=tokens[section.name])
+            tokens[section.name] = estimate_tokens(texts[section.name])
+
+        for section in reversed(lowest_first):
+            if tokens[section.name] < full_tokens[section.name] <= room_for(section.name):
+                texts[section.name], tokens[section.name] = section.text, full_tokens[section.name]
+
+        for section in sections:
+            if tokens[section.name] < full_tokens[section.name]:
+                self.logger.info(
+                    f"Prompt section '{section.name}' reduced from {full_tokens[section.name]} to "
+                    f"{tokens[section.name]} tokens to fit the {self.context_window}-token context window"
+                )
+        return texts
+
+
+def summarize_file(file_path: str, project_root: str = "") -> Optional[str]:
+    """
+    Outline of a source file: its definitions with their headers, bodies elided.
+
+    Uses the tree-sitter FileMap; returns None when it cannot summarize the file
+    (unsupported language, or the tree-sitter grammars are not installed).
+    """
+    try:
+        from lsp.file_map.file_map import FileMap
+
+        summary = FileMap(
+            file_path,
+            parent_context=True,
+            child_context=False,
+            header_max=3,
+            project_base_path=project_root or None,
+        ).summarize()
+    except Exception as e:
+        logging.getLogger(__name__).debug(f"No FileMap summary for {file_path}: {e}")
+        return None
+    return summary.strip() or None
@@ -1,10 +1,8 @@
 from typing import Optional, Tuple
 import logging
 
-from jinja2 import Environment, StrictUndefined
-
 from app.abstract.prompt_builder_abc import PromptBuilderABC
-from ai_caller import AICaller
+from ai_caller import AICaller, StreamedResponse
 from app.logging.custom_logger import CustomLogger
 from config.config_loader import get_settings
 from utility.utils import load_yaml
@@ -44,7 +42,8 @@ class PromptBuilder(PromptBuilderABC):
             ValueError: If the TOML config does not contain valid 'system' and 'user' keys.
             RuntimeError: If an error occurs while rendering the templates.
         """
-        environment = Environment(undefined=StrictUndefined)
+        # Imports jinja2, which only processes that build prompts need
+        from config.prompt_templates import get_prompt_templates
 
         try:
             # 1. Fetch the prompt config from your TOML-based settings
@@ -52,18 +51,8 @@ class PromptBuilder(PromptBuilderABC):
             if not prompt_config:
                 raise ValueError(f"Prompt configuration '{file}' not found in settings")
 
-            # 2. Get the system and user templates
-            system_template = getattr(prompt_config, 'system', '')
-            user_template = getattr(prompt_config, 'user', '')
-
-            if not system_template and not user_template:
-                raise ValueError(f"Neither 'system' nor 'user' templates found in config '{file}'")
-
-            # 3. Render the templates with the provided variables
-            system_prompt = environment.from_string(system_template).render(**kwargs) if system_template else ""
-            user_prompt = environment.from_string(user_template).render(**kwargs) if user_template else ""
-
-            return {"system": system_prompt, "user": user_prompt}
+            # 2. Render the system and user templates, compiled once per process
+            return get_prompt_templates().render(file, **kwargs)
 
         except Exception as e:
             error_msg = f"Error building prompt from template '{file}': {str(e)}"
@@ -83,6 +72,8 @@ class PromptBuilder(PromptBuilderABC):
         additional_instructions_text: str = None,
         additional_includes_section: str = None,
         failed_tests_section: str = None,
+        temperature: Optional[float] = None,
+        seed: Optional[int] = None,
     ) -> Tuple[str, int, int, str]:
         """
         Generates additional unit tests using the 'test_generation_prompt.toml' template.
@@ -99,6 +90,8 @@ class PromptBuilder(PromptBuilderABC):
             additional_instructions_text (str, optional): Extra instructions or context for the AI.
             additional_includes_section (str, optional): Additional code or includes.
             failed_tests_section (str, optional): Details of failed tests to consider.
+            temperature (float, optional): Sampling temperature; the caller's default if omitted.
+            seed (int, optional): Sampling seed, so concurrent requests explore different outputs.
 
         Returns:
             Tuple[str, int, int, str]:
@@ -123,9 +116,60 @@ class PromptBuilder(PromptBuilderABC):
             failed_tests_section=failed_tests_section or "",
         )
         
-        response, prompt_tokens, completion_tokens = self.caller.call(prompt)
+        response, prompt_tokens, completion_tokens = self.caller.call_model(prompt, **self._sampling(temperature, seed))
         return response, prompt_tokens, completion_tokens, str(prompt)
 
+    def stream_tests(
+        self,
+        source_file_name: str,
+        max_tests: int,
+        source_file_numbered: str,
+        code_coverage_report: str,
+        language: str,
+        test_file: str,
+        test_file_name: str,
+        testing_framework: str,
+        additional_instructions_text: str = None,
+        additional_includes_section: str = None,
+        failed_tests_section: str = None,
+        temperature: Optional[float] = None,
+        seed: Optional[int] = None,
+    ) -> Tuple[StreamedResponse, str]:
+        """
+        Like generate_tests, but streams the response while the model generates it.
+
+        Returns:
+            Tuple[StreamedResponse, str]:
+                - The streamed AI-generated test suggestions; token counts are set once it is exhausted,
+                - The final constructed prompt sent to the AI (str).
+        """
+        prompt = self._build_prompt(
+            file="test_generation_prompt",
+            source_file_name=source_file_name,
+            max_tests=max_tests,
+            source_file_numbered=source_file_numbered,
+            code_coverage_report=code_coverage_report,
+            language=language,
+            test_file=test_file,
+            test_file_name=test_file_name,
+            testing_framework=testing_framework,
+            additional_instructions_text=additional_instructions_text or "",
+            additional_includes_section=additional_includes_section or "",
+            failed_tests_section=failed_tests_section or "",
+        )
+
+        return self.caller.stream_model(prompt, **self._sampling(temperature, seed)), str(prompt)
+
+    @staticmethod
+    def _sampling(temperature: Optional[float], seed: Optional[int]) -> dict:
+        """Sampling arguments for the caller, leaving out the ones that keep the caller's default."""
+        sampling = {}
+        if temperature is not None:
+            sampling["temperature"] = temperature
+        if seed is not None:
+            sampling["seed"] = seed
+        return sampling
+
     def analyze_test_failure(
         self,
         source_file_name: str,
@@ -159,7 +203,7 @@ class PromptBuilder(PromptBuilderABC):
             test_file_name=test_file_name,
         )
         
-        response, prompt_tokens, completion_tokens = self.caller.call(prompt)
+        response, prompt_tokens, completion_tokens = self.caller.call_model(prompt)
         return response, prompt_tokens, completion_tokens, str(prompt)
 
     def analyze_test_insert_line(
@@ -190,7 +234,7 @@ class PromptBuilder(PromptBuilderABC):
             additional_instructions_text=additional_instructions_text or "",
         )
         
-        response, prompt_tokens, completion_tokens = self.caller.call(prompt)
+        response, prompt_tokens, completion_tokens = self.caller.call_model(prompt)
         return response, prompt_tokens, completion_tokens, str(prompt)
 
     def analyze_test_against_context(
@@ -220,7 +264,7 @@ class PromptBuilder(PromptBuilderABC):
             context_files_names_rel=context_files_names_rel,
         )
         
-        response, prompt_tokens, completion_tokens = self.caller.call(prompt)
+        response, prompt_tokens, completion_tokens = self.caller.call_model(prompt)
         return response, prompt_tokens, completion_tokens, str(prompt)
 
     def analyze_suite_test_headers_indentation(
@@ -247,7 +291,7 @@ class PromptBuilder(PromptBuilderABC):
             test_file=test_file,
         )
         
-        response, prompt_tokens, completion_tokens = self.caller.call(prompt)
+        response, prompt_tokens, completion_tokens = self.caller.call_model(prompt)
         return response, prompt_tokens, completion_tokens, str(prompt)
 
     def adapt_test_command_for_a_single_test_via_ai(
@@ -275,5 +319,5 @@ class PromptBuilder(PromptBuilderABC):
             project_root_dir=project_root_dir,
         )
         
-        response, prompt_tokens, completion_tokens = self.caller.call(prompt)
+        response, prompt_tokens, completion_tokens = self.caller.call_model(prompt)
         return response, prompt_tokens, completion_tokens, str(prompt)
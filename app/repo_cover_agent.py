@@ -0,0 +1,246 @@
+"""
+Repository mode: one CoverAgent pipeline per (source file, test file) pair.
+
+Pairs are discovered from test file naming conventions and run on a bounded
+pool of pipelines, most promising first. Model requests and test runs have
+their own limits shared by all pipelines: a local model server serves few
+requests at a time, while test runs are bound by the CPU count.
+"""
+
+import os
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass
+from threading import BoundedSemaphore
+from typing import Any, Callable, Dict, List, Optional
+
+from app.coverage_planner import CoveragePlanner
+from app.logging.custom_logger import CustomLogger
+from config.config_loader import get_settings
+from repo_scanner import RepoScanner
+
+
+# Test file name -> the stem of the source file it tests, per language
+TEST_FILE_PATTERNS = {
+    "python": [re.compile(r"^test_(?P<stem>.+)\.py$"), re.compile(r"^(?P<stem>.+)_test\.py$")],
+    "javascript": [re.compile(r"^(?P<stem>.+)\.(?:test|spec)\.[jt]sx?$")],
+}
+
+SOURCE_EXTENSIONS = {
+    "python": (".py",),
+    "javascript": (".js", ".jsx", ".ts", ".tsx"),
+}
+
+
+@dataclass
+class FilePair:
+    """A source file and the test file that covers it, with paths relative to the project root."""
+
+    source_file: str
+    test_file: str
+    priority: float = 0.0
+
+
+def _get_repository_setting(key: str, default: Any) -> Any:
+    try:
+        return get_settings().get(f"repository.{key}", default)
+    except Exception:
+        return default
+
+
+def discover_file_pairs(project_root: str, language: str = "python") -> List[FilePair]:
+    """
+    Find the test files under `project_root` and the source file each one tests.
+
+    A test file named e.g. `test_parser.py` tests the `parser.py` nearest to it in
+    the directory tree. Test files without a matching source file are skipped.
+    """
+    patterns = TEST_FILE_PATTERNS.get(language)
+    if patterns is None:
+        raise ValueError(f"Repository mode does not support {language}")
+    extensions = SOURCE_EXTENSIONS[language]
+
+    files_by_stem: Dict[str, List[str]] = {}
+    test_files = []
+    scanner = RepoScanner(project_root, language=language, skip_hidden=True)
+    for path in scanner.files(extensions=extensions):
+        name = os.path.basename(path)
+        files_by_stem.setdefault(os.path.splitext(name)[0], []).append(path)
+        if any(pattern.match(name) for pattern in patterns):
+            test_files.append(path)
+
+    pairs = []
+    for test_file in sorted(test_files):
+        name = os.path.basename(test_file)
+        stem = next(pattern.match(name) for pattern in patterns if pattern.match(name)).group("stem")
+        candidates = [path for path in files_by_stem.get(stem, []) if path != test_file]
+        if not candidates:
+            continue
+        test_dir = os.path.dirname(os.path.abspath(os.path.join(project_root, test_file)))
+        # The candidate sharing the longest directory prefix with the test file
+        source_file = max(
+            candidates,
+            key=lambda path: len(os.path.commonpath([test_dir, os.path.abspath(os.path.join(project_root, path))])),
+        )
+        pairs.append(FilePair(source_file=source_file, test_file=test_file))
+    return pairs
+
+
+class RepoCoverAgent:
+    """Runs a CoverAgent pipeline for every (source, test) pair of a repository."""
+
+    def __init__(
+        self,
+        project_root: str,
+        test_command: str,
+        language: str = "python",
+        pipelines: Optional[int] = None,
+        llm_concurrency: Optional[int] = None,
+        test_concurrency: Optional[int] = None,
+        reports_dir: Optional[str] = None,
+        coverage_report_path: Optional[str] = None,
+        coverage_type: str = "cobertura",
+        junit_report_path: Optional[str] = None,
+        logger: Optional[CustomLogger] = None,
+        generate_log_files: bool = True,
+        **agent_options: Any,
+    ):
+        """
+        Args:
+            project_root: Root of the repository; test commands run here.
+            test_command: Test command template, formatted per pair with `{source_file}` and
+                `{test_file}` (relative to the project root), `{coverage_report}` (the pair's
+                own report path) and `{pair}` (the pair's index, e.g. to give each pipeline its
+                own COVERAGE_FILE, as pipelines run concurrently in the same directory).
+            language: Language of the files to pair up.
+            pipelines: Pairs processed at once. Defaults to `repository.pipelines`.
+            llm_concurrency: Model requests in flight at once, across pipelines. Defaults to
+                `repository.llm_concurrency`.
+            test_concurrency: Test runs at once, across pipelines. Defaults to
+                `repository.test_concurrency`, where 0 means the CPU count.
+            reports_dir: Directory of the per-pair coverage reports. Defaults to
+                `.cover-agent-reports` in the project root.
+            coverage_report_path: Whole-repository coverage report used to rank the pairs by
+                their missed lines. Without it, each source file's code lines count as missed.
+            coverage_type: Format of that report, a CoverageType value.
+            junit_report_path: JUnit XML report of a whole-suite run, whose test durations
+                weight the ranking.
+            logger: Optional logger instance.
+            generate_log_files: Whether or not to generate log files.
+            **agent_options: Passed on to each CoverAgent, e.g. `model` or `max_iterations`.
+        """
+        self.project_root = os.path.abspath(project_root)
+        self.test_command = test_command
+        self.language = language
+        self.pipelines = max(1, int(pipelines or _get_repository_setting("pipelines", 4)))
+        self.llm_concurrency = max(1, int(llm_concurrency or _get_repository_setting("llm_concurrency", 1)))
+        test_concurrency = test_concurrency or int(_get_repository_setting("test_concurrency", 0))
+        self.test_concurrency = max(1, test_concurrency or os.cpu_count() or 1)
+        self.reports_dir = reports_dir or os.path.join(self.project_root, ".cover-agent-reports")
+        self.coverage_report_path = coverage_report_path
+        self.coverage_type = coverage_type
+        self.junit_report_path = junit_report_path
+        self.generate_log_files = generate_log_files
+        self.agent_options = agent_options
+        self.logger = logger or CustomLogger.get_logger(__name__, generate_log_files=generate_log_files)
+
+        self.llm_slots = BoundedSemaphore(self.llm_concurrency)
+        self.test_slots = BoundedSemaphore(self.test_concurrency)
+
+    def prioritize(self, pairs: List[FilePair]) -> List[FilePair]:
+        """Order `pairs` by expected coverage gain per second, highest first."""
+        planner = CoveragePlanner(
+            project_root=self.project_root,
+            coverage_report_path=self.coverage_report_path,
+            coverage_type=self.coverage_type,
+            junit_report_path=self.junit_report_path,
+            llm_tokens_per_sec=float(_get_repository_setting("llm_tokens_per_sec", 200)),
+            test_run_sec=float(_get_repository_setting("test_run_sec", 10)),
+            logger=self.logger,
+        )
+        return planner.rank(pairs)
+
+    def run(
+        self,
+        pairs: Optional[List[FilePair]] = None,
+        on_result: Optional[Callable[[Dict[str, Any]], None]] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Run the pipelines of `pairs`, or of all discovered pairs, in priority order.
+
+        Args:
+            pairs: The pairs to process; discovered and prioritized when omitted.
+            on_result: Called with each pair's result as soon as its pipeline ends.
+
+        Returns:
+            One result per pair, in completion order: source_file, test_file, priority,
+            success, coverage, tests_generated, tests_passed, elapsed_sec and error.
+        """
+        if pairs is None:
+            pairs = self.prioritize(discover_file_pairs(self.project_root, self.language))
+        self.logger.info(
+            f"Processing {len(pairs)} file pairs with {self.pipelines} pipelines, "
+            f"{self.llm_concurrency} concurrent model requests and {self.test_concurrency} concurrent test runs"
+        )
+        os.makedirs(self.reports_dir, exist_ok=True)
+
+        results = []
+        # The executor's queue is FIFO, so pipelines start in priority order
+        with ThreadPoolExecutor(max_workers=self.pipelines) as executor:
+            futures = [executor.submit(self._run_pair, index, pair) for index, pair in enumerate(pairs)]
+            for future in as_completed(futures):
+                result = future.result()
+                results.append(result)
+                if on_result:
+                    on_result(result)
+
+        succeeded = sum(1 for result in results if result["success"])
+        self.logger.info(f"Reached the target coverage for {succeeded}/{len(results)} file pairs")
+        return results
+
+    def _run_pair(self, index: int, pair: FilePair) -> Dict[str, Any]:
+        from app.cover_agent import CoverAgent
+
+        coverage_report = os.path.join(self.reports_dir, f"coverage-{index}.xml")
+        result = {
+            "source_file": pair.source_file,
+            "test_file": pair.test_file,
+            "priority": pair.priority,
+            "success": False,
+            "coverage": None,
+            "tests_generated": 0,
+            "tests_passed": 0,
+            "elapsed_sec": 0.0,
+            "error": None,
+        }
+        started = time.monotonic()
+        try:
+            agent = CoverAgent(
+                source_file_path=os.path.join(self.project_root, pair.source_file),
+                test_file_path=os.path.join(self.project_root, pair.test_file),
+                code_coverage_report_path=coverage_report,
+                test_command=self.test_command.format(
+                    source_file=pair.source_file,
+                    test_file=pair.test_file,
+                    coverage_report=coverage_report,
+                    pair=index,
+                ),
+                test_command_dir=self.project_root,
+                project_root=self.project_root,
+                logger=self.logger,
+                generate_log_files=self.generate_log_files,
+                llm_slots=self.llm_slots,
+                test_slots=self.test_slots,
+                **self.agent_options,
+            )
+            result["success"] = agent.run()
+            result["coverage"] = agent.current_coverage
+            result["tests_generated"] = agent.tests_generated
+            result["tests_passed"] = agent.tests_passed
+        except Exception as e:
+            # One failing pipeline must not stop the others
+            self.logger.error(f"Pipeline for {pair.source_file} failed: {e}", exc_info=True)
+            result["error"] = str(e)
+        result["elapsed_sec"] = time.monotonic() - started
+        return result
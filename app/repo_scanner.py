@@ -0,0 +1,347 @@
+"""
+Shared scanner of a project's files.
+
+The scanner walks the project with `os.scandir` and prunes ignored directories
+(version control, per-language build and dependency directories, `.gitignore`
+matches) before descending into them, so e.g. `node_modules` is never listed.
+The rules of each `.gitignore` are compiled into a single regular expression.
+
+Directory listings are kept in a persistent index, keyed by each directory's
+mtime: a directory whose mtime did not change since the last scan is not listed
+again. Ignore rules are applied when the listings are read, so edits to a
+`.gitignore` take effect without invalidating the index.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import re
+import tempfile
+import time
+from functools import lru_cache
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from config.config_loader import user_cache_dir
+from lsp.utils.utils import IGNORED_DIRECTORIES
+
+
+# Bump when the index layout changes, so older indexes are rebuilt
+INDEX_VERSION = 1
+
+VCS_DIRECTORIES = frozenset({".git", ".hg", ".svn"})
+
+# Listings of directories modified this recently may miss a change made in the same
+# mtime tick (some filesystems have 1-2 s resolution), so they are not reused
+_RACY_INTERVAL_NS = 2_000_000_000
+
+
+@lru_cache(maxsize=1)
+def _language_table() -> Dict[str, str]:
+    # grep_ast loads the tree-sitter language pack on import
+    from grep_ast.parsers import PARSERS
+
+    return PARSERS
+
+
+@lru_cache(maxsize=None)
+def _language_for_extension(extension: str) -> Optional[str]:
+    return _language_table().get(extension)
+
+
+def language_for_file(filename: str) -> Optional[str]:
+    """
+    The language of `filename`, as grep_ast's filename_to_lang, with the lookups cached.
+
+    Special file names (e.g. `Dockerfile`) are matched first, then the extension.
+    """
+    basename = os.path.basename(filename)
+    language = _language_table().get(basename)
+    if language is not None:
+        return language
+    return _language_for_extension(os.path.splitext(basename)[1])
+
+
+def _translate_glob(pattern: str) -> str:
+    """Regular expression of a gitignore glob, matched against `/`-separated relative paths."""
+    regex, i, n = [], 0, len(pattern)
+    while i < n:
+        if pattern.startswith("**/", i) and (i == 0 or pattern[i - 1] == "/"):
+            # Leading or middle `**/`: zero or more directories
+            regex.append("(?:.*/)?")
+            i += 3
+        elif pattern.startswith("**", i) and i + 2 == n and (i == 0 or pattern[i - 1] == "/"):
+            # Trailing `/**`: everything inside
+            regex.append(".*")
+            i += 2
+        elif pattern[i] == "*":
+            regex.append("[^/]*")
+            i += 1
+        elif pattern[i] == "?":
+            regex.append("[^/]")
+            i += 1
+        elif pattern[i] == "[":
+            end = pattern.find("]", i + 2)
+            if end == -1:
+                regex.append(re.escape("["))
+                i += 1
+                continue
+            body = pattern[i + 1:end]
+            if body.startswith("!"):
+                body = "^" + body[1:]
+            regex.append(f"[{body.replace(chr(92), chr(92) * 2)}]")
+            i = end + 1
+        elif pattern[i] == "\\" and i + 1 < n:
+            regex.append(re.escape(pattern[i + 1]))
+            i += 2
+        else:
+            regex.append(re.escape(pattern[i]))
+            i += 1
+    return "".join(regex)
+
+
+class GitIgnore:
+    """
+    The rules of one `.gitignore` file.
+
+    All rules are compiled into one alternation per entry type (files skip the
+    directory-only rules). The alternatives are in reverse rule order, so the
+    alternative that matches is the last matching rule, which decides as in git.
+    """
+
+    def __init__(self, lines: Iterable[str]):
+        rules: List[Tuple[str, bool, bool]] = []
+        for line in lines:
+            line = re.sub(r"(?<!\\) +$", "", line.rstrip("\r\n"))
+            if not line or line.startswith("#"):
+                continue
+            negate = line.startswith("!")
+            if negate:
+                line = line[1:]
+            elif line.startswith(("\\!", "\\#")):
+                line = line[1:]
+            directory_only = line.endswith("/")
+            line = line.rstrip("/")
+            if not line:
+                continue
+            # A slash other than a trailing one anchors the rule to the .gitignore's directory
+            anchored = "/" in line
+            regex = _translate_glob(line.lstrip("/"))
+            rules.append(((regex if anchored else "(?:.*/)?" + regex), negate, directory_only))
+
+        self._negated: Dict[str, bool] = {}
+        self._directory_pattern = self._compile(rules, include_directory_only=True)
+        self._file_pattern = self._compile(rules, include_directory_only=False)
+
+    def _compile(self, rules: List[Tuple[str, bool, bool]], include_directory_only: bool) -> Optional["re.Pattern"]:
+        alternatives = []
+        for index in reversed(range(len(rules))):
+            regex, negate, directory_only = rules[index]
+            if directory_only and not include_directory_only:
+                continue
+            self._negated[f"r{index}"] = negate
+            alternatives.append(f"(?P<r{index}>{regex})")
+        return re.compile("|".join(alternatives)) if alternatives else None
+
+    @classmethod
+    def from_file(cls, path: str) -> Optional["GitIgnore"]:
+        try:
+            with open(path, "r", encoding="utf-8", errors="replace") as f:
+                return cls(f)
+        except OSError:
+            return None
+
+    def match(self, path: str, is_dir: bool) -> Optional[bool]:
+        """
+        Whether the rules ignore `path` (relative to the .gitignore's directory, `/`-separated).
+
+        Returns:
+            True if ignored, False if re-included by a negated rule, None if no rule matches.
+        """
+        pattern = self._directory_pattern if is_dir else self._file_pattern
+        match = pattern.fullmatch(path) if pattern else None
+        if match is None:
+            return None
+        return not self._negated[match.lastgroup]
+
+
+class FileIndex:
+    """Directory listings of a project, persisted between scans and reused while a directory's mtime is unchanged."""
+
+    def __init__(self, path: Optional[str], logger: Optional[logging.Logger] = None):
+        """
+        Args:
+            path: JSON file holding the index; None keeps it in memory only.
+            logger: Optional logger instance.
+        """
+        self.path = path
+        self.logger = logger or logging.getLogger(__name__)
+        self._previous: Dict[str, list] = self._load() if path else {}
+        self._current: Dict[str, list] = {}
+        self.listed = 0
+        self.reused = 0
+
+    def _load(self) -> Dict[str, list]:
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                index = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        if not isinstance(index, dict) or index.get("version") != INDEX_VERSION:
+            return {}
+        return index.get("directories", {})
+
+    def listing(self, path: str, key: str) -> Tuple[List[str], List[str]]:
+        """(file names, subdirectory names) of the directory at `path`, indexed under `key`."""
+        try:
+            mtime = os.stat(path).st_mtime_ns
+        except OSError:
+            return [], []
+        cached = self._previous.get(key)
+        if cached and cached[0] == mtime:
+            self._current[key] = cached
+            self.reused += 1
+            return cached[1], cached[2]
+
+        files, directories = [], []
+        try:
+            with os.scandir(path) as entries:
+                for entry in entries:
+                    try:
+                        # Symlinked directories are not followed, as with os.walk
+                        if entry.is_dir(follow_symlinks=False):
+                            directories.append(entry.name)
+                        elif entry.is_file():
+                            files.append(entry.name)
+                    except OSError:
+                        continue
+        except OSError:
+            return [], []
+        self.listed += 1
+        racy = time.time_ns() - mtime < _RACY_INTERVAL_NS
+        self._current[key] = [None if racy else mtime, files, directories]
+        return files, directories
+
+    def save(self, complete: bool = True) -> None:
+        """
+        Persist the listings of this scan. After a complete scan, directories it did not
+        reach are dropped; after one stopped early, their earlier listings are kept.
+        """
+        if not complete:
+            self._current = {**self._previous, **self._current}
+        if not self.path or (self.listed == 0 and self._current.keys() == self._previous.keys()):
+            return
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            # Write then rename, so a concurrent scan never reads a partial index
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(self.path), suffix=".tmp")
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump({"version": INDEX_VERSION, "directories": self._current}, f)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            self.logger.debug(f"Could not save the file index {self.path}: {e}")
+        self._previous, self._current = self._current, {}
+
+
+class RepoScanner:
+    """Lists the files of a project, skipping ignored directories and files."""
+
+    def __init__(
+        self,
+        root: str,
+        language: Optional[str] = None,
+        use_gitignore: bool = True,
+        skip_hidden: bool = False,
+        use_index: bool = True,
+        index_path: Optional[str] = None,
+        logger: Optional[logging.Logger] = None,
+    ):
+        """
+        Args:
+            root: The project root.
+            language: Prune that language's build and dependency directories (matched
+                against whole directory names); None prunes those of all languages.
+            use_gitignore: Skip what the project's `.gitignore` files ignore.
+            skip_hidden: Skip directories whose name starts with a dot.
+            use_index: Reuse the directory listings of earlier scans.
+            index_path: Where the index is kept; defaults to the user cache directory.
+            logger: Optional logger instance.
+        """
+        self.root = os.path.abspath(root)
+        self.language = language
+        self.use_gitignore = use_gitignore
+        self.skip_hidden = skip_hidden
+        self.logger = logger or logging.getLogger(__name__)
+        # Entries ending in "/" name a directory; the others (e.g. "venv") may be part of one, as in ".venv"
+        entries = {
+            entry
+            for name in ([language] if language is not None else IGNORED_DIRECTORIES)
+            for entry in IGNORED_DIRECTORIES.get(name, ())
+        }
+        self._pruned_names = frozenset(entry.rstrip("/") for entry in entries if entry.endswith("/"))
+        self._pruned_fragments = tuple(entry for entry in entries if not entry.endswith("/"))
+        if use_index and index_path is None:
+            digest = hashlib.sha256(self.root.encode("utf-8")).hexdigest()[:16]
+            index_path = os.path.join(user_cache_dir(), f"index-{digest}.json")
+        self.index = FileIndex(index_path if use_index else None, logger=self.logger)
+
+    def _is_pruned(self, name: str) -> bool:
+        if name in VCS_DIRECTORIES or (self.skip_hidden and name.startswith(".")):
+            return True
+        return name in self._pruned_names or any(fragment in name for fragment in self._pruned_fragments)
+
+    @staticmethod
+    def _ignored(gitignores: List[Tuple[str, GitIgnore]], relative: str, is_dir: bool) -> bool:
+        # The deepest .gitignore with a matching rule decides
+        for base, gitignore in reversed(gitignores):
+            result = gitignore.match(relative[len(base):], is_dir)
+            if result is not None:
+                return result
+        return False
+
+    def iter_files(self) -> Iterator[str]:
+        """Yield the relative paths (`os.sep`-separated) of the project's files that are not ignored."""
+        # (relative directory, its `/`-separated prefix, the .gitignores in effect)
+        stack: List[Tuple[str, str, List[Tuple[str, GitIgnore]]]] = [("", "", [])]
+        try:
+            yield from self._walk(stack)
+        finally:
+            # Also runs when the caller stops iterating early and the generator is closed
+            self.index.save(complete=not stack)
+            self.logger.debug(
+                f"Scanned {self.root}: listed {self.index.listed} directories, reused {self.index.reused}"
+            )
+
+    def _walk(self, stack: List[Tuple[str, str, List[Tuple[str, GitIgnore]]]]) -> Iterator[str]:
+        while stack:
+            relative_dir, prefix, gitignores = stack.pop()
+            files, directories = self.index.listing(os.path.join(self.root, relative_dir), prefix)
+            if self.use_gitignore and ".gitignore" in files:
+                gitignore = GitIgnore.from_file(os.path.join(self.root, relative_dir, ".gitignore"))
+                if gitignore is not None:
+                    gitignores = gitignores + [(prefix, gitignore)]
+
+            for name in sorted(directories, reverse=True):
+                relative = os.path.join(relative_dir, name)
+                if self._is_pruned(name) or self._ignored(gitignores, prefix + name, True):
+                    continue
+                stack.append((relative, prefix + name + "/", gitignores))
+            for name in sorted(files):
+                if gitignores and self._ignored(gitignores, prefix + name, False):
+                    continue
+                yield os.path.join(relative_dir, name)
+
+    def files(self, language: Optional[str] = None, extensions: Optional[Iterable[str]] = None) -> List[str]:
+        """
+        The relative paths of the project's files, optionally only those of `language`
+        (by language_for_file) or with one of `extensions` (e.g. `.py`).
+        """
+        extensions = tuple(extensions) if extensions is not None else None
+        selected = []
+        for path in self.iter_files():
+            if extensions is not None and not path.endswith(extensions):
+                continue
+            if language is not None and language_for_file(path) != language:
+                continue
+            selected.append(path)
+        return selected
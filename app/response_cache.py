@@ -0,0 +1,210 @@
+import difflib
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from typing import Any, Dict, Optional, Tuple
+
+from config.config_loader import get_settings
+from utility.utils import truncate_hash
+
+
+CACHE_MODES = ("off", "auto", "record", "replay")
+
+
+class ResponseNotRecordedError(RuntimeError):
+    """Raised in replay mode when no recorded response matches a prompt."""
+
+
+class ResponseCache:
+    """
+    Disk-backed, content-addressed cache of LLM responses.
+
+    Each response is stored as one JSON file in the responses folder, named after
+    the SHA-256 of the request: model, rendered system and user prompts, and the
+    sampling parameters. The n-th identical request of a run maps to the n-th
+    recording, so a run that repeats a prompt (e.g. when an iteration changed
+    nothing) still gets fresh responses, and a re-run replays the same sequence.
+
+    Modes:
+        off: the cache is not used.
+        auto: serve recorded responses, call the model and record on a miss.
+        record: always call the model and (re-)record the response.
+        replay: never call the model; fall back to a fuzzy prompt-prefix match and
+            raise ResponseNotRecordedError when nothing matches.
+    """
+
+    def __init__(
+        self,
+        folder: str,
+        mode: str = "auto",
+        max_size_bytes: int = 200 * 1024 * 1024,
+        fuzzy_threshold: float = 95,
+        fuzzy_prefix_length: int = 1000,
+        fuzzy_best_ratio: float = 0,
+        hash_display_length: int = 12,
+        logger: Optional[logging.Logger] = None,
+    ):
+        """
+        Args:
+            folder: Directory holding the recorded responses.
+            mode: One of CACHE_MODES.
+            max_size_bytes: Total size of the recordings above which the least recently
+                used ones are evicted.
+            fuzzy_threshold: Minimum similarity (0-100) of prompt prefixes for a fuzzy replay match.
+            fuzzy_prefix_length: Number of prompt characters compared by the fuzzy lookup.
+            fuzzy_best_ratio: Initial best ratio of the fuzzy lookup; a match must beat it.
+            hash_display_length: Length of the hashes shown in log messages.
+            logger: Optional logger instance.
+        """
+        if mode not in CACHE_MODES:
+            raise ValueError(f"Unknown response cache mode '{mode}', expected one of {', '.join(CACHE_MODES)}")
+        self.folder = folder
+        self.mode = mode
+        self.max_size_bytes = max_size_bytes
+        self.fuzzy_threshold = fuzzy_threshold
+        self.fuzzy_prefix_length = fuzzy_prefix_length
+        self.fuzzy_best_ratio = fuzzy_best_ratio
+        self.hash_display_length = hash_display_length
+        self.logger = logger or logging.getLogger(__name__)
+
+        self._occurrences: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_settings(cls, logger: Optional[logging.Logger] = None) -> Optional["ResponseCache"]:
+        """Build the cache configured in the settings, or None when it is off."""
+        settings = get_settings()
+        mode = settings.get("llm.response_cache", "off")
+        if mode == "off":
+            return None
+        return cls(
+            folder=settings.get("default.responses_folder", "stored_responses"),
+            mode=mode,
+            max_size_bytes=int(float(settings.get("llm.response_cache_max_mb", 200)) * 1024 * 1024),
+            fuzzy_threshold=settings.get("default.fuzzy_lookup_threshold", 95),
+            fuzzy_prefix_length=settings.get("default.fuzzy_lookup_prefix_length", 1000),
+            fuzzy_best_ratio=settings.get("default.fuzzy_lookup_best_ratio", 0),
+            hash_display_length=settings.get("default.record_replay_hash_display_length", 12),
+            logger=logger,
+        )
+
+    @staticmethod
+    def request_hash(model: str, prompt: Dict[str, str], **sampling: Any) -> str:
+        """Hash of everything that determines a response."""
+        key = {"model": model, "system": prompt.get("system", ""), "user": prompt.get("user", ""), **sampling}
+        return hashlib.sha256(json.dumps(key, sort_keys=True).encode("utf-8")).hexdigest()
+
+    def next_key(self, request_hash: str) -> str:
+        """Claim the recording slot of the next occurrence of `request_hash` in this run."""
+        with self._lock:
+            occurrence = self._occurrences.get(request_hash, 0)
+            self._occurrences[request_hash] = occurrence + 1
+        return f"{request_hash}-{occurrence}"
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.folder, f"{key}.json")
+
+    def lookup(self, key: str, model: str, prompt: Dict[str, str]) -> Optional[Tuple[str, int, int]]:
+        """
+        Return the recorded (response, prompt_tokens, completion_tokens) for `key`, if any.
+
+        In replay mode a miss falls back to the most similar recording of the same
+        model, and raises ResponseNotRecordedError if none is similar enough.
+        """
+        if self.mode == "record":
+            return None
+
+        entry = self._read(self._path(key))
+        if entry is None and self.mode == "replay":
+            entry = self._fuzzy_lookup(model, prompt)
+            if entry is None:
+                raise ResponseNotRecordedError(
+                    f"No recorded response for request {truncate_hash(key, self.hash_display_length)}"
+                )
+        if entry is None:
+            return None
+
+        self.logger.info(f"Using recorded LLM response {truncate_hash(key, self.hash_display_length)}")
+        return entry["response"], entry["prompt_tokens"], entry["completion_tokens"]
+
+    def store(
+        self, key: str, model: str, prompt: Dict[str, str], response: str, prompt_tokens: int, completion_tokens: int
+    ) -> None:
+        """Record a response under `key`, evicting old recordings beyond the size limit."""
+        entry = {
+            "model": model,
+            "prompt": prompt,
+            "response": response,
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "created": time.time(),
+        }
+        os.makedirs(self.folder, exist_ok=True)
+        # Write then rename, so concurrent readers never see a partial file
+        fd, tmp_path = tempfile.mkstemp(dir=self.folder, suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(entry, f)
+        os.replace(tmp_path, self._path(key))
+        self.logger.info(f"Recorded LLM response {truncate_hash(key, self.hash_display_length)}")
+        self._evict()
+
+    def _read(self, path: str, touch: bool = True) -> Optional[Dict[str, Any]]:
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if touch:
+            # Serving a recording refreshes its modification time, which eviction uses as recency
+            try:
+                os.utime(path)
+            except OSError:
+                pass
+        return entry
+
+    def _fuzzy_lookup(self, model: str, prompt: Dict[str, str]) -> Optional[Dict[str, Any]]:
+        """Return the recording of `model` whose prompt prefix is most similar to `prompt`'s."""
+        target = (prompt.get("system", "") + prompt.get("user", ""))[: self.fuzzy_prefix_length]
+        best_ratio, best_entry, best_path = self.fuzzy_best_ratio, None, None
+        for path in self._recordings():
+            entry = self._read(path, touch=False)
+            if not entry or entry.get("model") != model:
+                continue
+            recorded = entry.get("prompt", {})
+            candidate = (recorded.get("system", "") + recorded.get("user", ""))[: self.fuzzy_prefix_length]
+            ratio = difflib.SequenceMatcher(None, target, candidate).ratio() * 100
+            if ratio >= self.fuzzy_threshold and ratio > best_ratio:
+                best_ratio, best_entry, best_path = ratio, entry, path
+        if best_entry is not None:
+            self._read(best_path)
+            self.logger.info(f"Using fuzzy-matched LLM response (similarity {best_ratio:.1f}%)")
+        return best_entry
+
+    def _recordings(self):
+        try:
+            return [entry.path for entry in os.scandir(self.folder) if entry.name.endswith(".json")]
+        except OSError:
+            return []
+
+    def _evict(self) -> None:
+        """Delete the least recently used recordings until the folder fits in `max_size_bytes`."""
+        files = []
+        for path in self._recordings():
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            files.append((stat.st_mtime, stat.st_size, path))
+        total = sum(size for _, size, _ in files)
+        for _, size, path in sorted(files):
+            if total <= self.max_size_bytes:
+                break
+            try:
+                os.remove(path)
+                total -= size
+            except OSError:
+                pass
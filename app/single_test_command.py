@@ -0,0 +1,137 @@
+import ast
+import os
+import re
+import textwrap
+from typing import List, Optional
+
+
+def path_variants(path: str, test_command_dir: str) -> List[str]:
+    """Return the spellings under which a path may appear in a test command, longest first."""
+    variants = {path, os.path.abspath(path)}
+    try:
+        variants.add(os.path.relpath(os.path.abspath(path), os.path.abspath(test_command_dir)))
+    except ValueError:
+        # Different drives on Windows
+        pass
+    return sorted(variants, key=len, reverse=True)
+
+
+def replace_path_in_command(command: str, path: str, test_command_dir: str, replacement: str) -> Optional[str]:
+    """
+    Replace every occurrence of `path` in `command` with `replacement`.
+
+    The path is matched as a whole argument under any of its spellings (as given,
+    absolute, or relative to `test_command_dir`).
+
+    Returns:
+        The new command, or None if the path does not occur in the command.
+    """
+    alternatives = "|".join(re.escape(v) for v in path_variants(path, test_command_dir))
+    pattern = re.compile(rf"(?<![\w./\\-])(?:{alternatives})(?![\w.-])")
+    new_command, count = pattern.subn(lambda _: replacement, command)
+    return new_command if count else None
+
+
+def add_pytest_arguments(test_command: str, arguments: str) -> Optional[str]:
+    """
+    Insert `arguments` right after the pytest invocation of `test_command`, so they reach
+    pytest even when the command chains other programs (e.g. `pytest ... && coverage xml`).
+
+    Returns:
+        The new command, or None if the command does not invoke pytest exactly once.
+    """
+    invocations = list(re.finditer(r"(?<![\w.-])pytest(?![\w.-])", test_command))
+    if len(invocations) != 1:
+        return None
+    end = invocations[0].end()
+    return f"{test_command[:end]} {arguments}{test_command[end:]}"
+
+
+def get_test_names(test_code: str) -> List[str]:
+    """
+    Extract the names a test runner uses to select the tests defined in `test_code`.
+
+    For Python these are the `test*` functions and the `test*` methods of `Test*`
+    classes (as `Class::method`); fixtures and helpers are not selected. For JavaScript
+    they are the descriptions passed to the `it(...)`/`test(...)` calls.
+    """
+    try:
+        # A method inserted into an existing class is indented
+        tree = ast.parse(textwrap.dedent(test_code))
+    except SyntaxError:
+        return [match.group(2) for match in re.finditer(r"\b(?:it|test)\s*\(\s*(['\"`])(.+?)\1", test_code)]
+
+    names = []
+    for node in tree.body:
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)) and node.name.startswith("test"):
+            names.append(node.name)
+        elif isinstance(node, ast.ClassDef) and node.name.startswith("Test"):
+            names.extend(
+                f"{node.name}::{child.name}"
+                for child in node.body
+                if isinstance(child, (ast.FunctionDef, ast.AsyncFunctionDef)) and child.name.startswith("test")
+            )
+    return names
+
+
+def get_pytest_node_id(test_file_content: str, test_file_arg: str, test_name: str) -> str:
+    """Return the pytest node id of `test_name`, including its enclosing class if it has one."""
+    if "::" in test_name:
+        return f"{test_file_arg}::{test_name}"
+    try:
+        for node in ast.parse(test_file_content).body:
+            if isinstance(node, ast.ClassDef):
+                for child in node.body:
+                    if isinstance(child, (ast.FunctionDef, ast.AsyncFunctionDef)) and child.name == test_name:
+                        return f"{test_file_arg}::{node.name}::{test_name}"
+    except SyntaxError:
+        pass
+    return f"{test_file_arg}::{test_name}"
+
+
+def build_single_test_command(
+    test_command: str,
+    test_file_path: str,
+    test_command_dir: str,
+    test_names: List[str],
+    test_file_content: str = "",
+) -> Optional[str]:
+    """
+    Deterministically adapt a test command to run only the tests `test_names`.
+
+    Supports pytest (the test file argument becomes one node id per test) and jest
+    (a `-t` name filter matching any of the tests is appended). Coverage thresholds
+    are dropped, since a few tests are not expected to meet the suite-wide threshold.
+
+    Args:
+        test_command: Command that runs the test file (or the whole suite).
+        test_file_path: Path to the test file containing the tests.
+        test_command_dir: The directory the test command runs in.
+        test_names: Names of the tests, as returned by `get_test_names`.
+        test_file_content: Content of the test file, used to find enclosing test classes.
+
+    Returns:
+        The adapted command, or None if there are no tests, the test framework is not
+        recognized or a pytest command does not name the test file.
+    """
+    if not test_names:
+        return None
+
+    if re.search(r"\bpytest\b", test_command):
+        command = re.sub(r"\s--cov-fail-under[= ]\S+", "", test_command)
+        relative_test_file = os.path.relpath(os.path.abspath(test_file_path), os.path.abspath(test_command_dir))
+        node_ids = " ".join(get_pytest_node_id(test_file_content, relative_test_file, name) for name in test_names)
+        # Without an explicit test file argument the command may also collect other paths
+        return replace_path_in_command(command, test_file_path, test_command_dir, node_ids)
+
+    if re.search(r"\bjest\b", test_command) or re.search(r"\b(?:npm|yarn|pnpm)\s+(?:run\s+)?test\b", test_command):
+        # jest treats the -t value as a regular expression
+        pattern = "|".join(re.sub(r"([.*+?^${}()|\[\]\\])", r"\\\1", name) for name in test_names)
+        quoted_pattern = '"' + pattern.replace('"', '\\"') + '"'
+        # An empty threshold overrides the configured coverageThreshold
+        arguments = f"-t {quoted_pattern} --coverageThreshold='{{}}'"
+        if re.search(r"\bjest\b", test_command) or " -- " in f"{test_command} ":
+            return f"{test_command} {arguments}"
+        return f"{test_command} -- {arguments}"
+
+    return None
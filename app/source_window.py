@@ -0,0 +1,139 @@
+"""
+Uncovered-region windows of a source file.
+
+Instead of the whole numbered source, a window shows the complete functions
+(or classes, for lines outside any function) that contain uncovered lines. All
+other definitions are elided to their headers, so the model still sees the
+module's API. Module-level statements outside any definition, such as imports
+and constants, are kept. Line numbers are those of the original file, in the
+same `<number> <line>` layout as the full numbered source.
+"""
+
+import ast
+import logging
+from typing import Iterable, List, NamedTuple, Optional, Set
+
+
+# Tree-sitter node types that define functions, methods and classes
+_FUNCTION_NODE_TYPES = ("function_definition", "function_declaration", "method_definition", "method_declaration")
+_CLASS_NODE_TYPES = ("class_definition", "class_declaration")
+
+ELISION = "..."
+
+
+class Definition(NamedTuple):
+    """A function or class, with 0-based line numbers; `header_end` is exclusive."""
+
+    start: int
+    end: int
+    header_end: int
+    is_function: bool
+
+
+def render_uncovered_windows(
+    file_path: str,
+    code: str,
+    missed_lines: Iterable[int],
+    header_max: int = 3,
+) -> Optional[str]:
+    """
+    Render the numbered source restricted to the definitions enclosing `missed_lines`.
+
+    Definitions come from the tree-sitter parse of grep_ast's TreeContext, or from
+    Python's `ast` for Python files when no tree-sitter grammar is available.
+
+    Args:
+        file_path: The source file; its extension selects the language.
+        code: The source code.
+        missed_lines: 1-based numbers of the uncovered lines.
+        header_max: Maximum number of lines kept of an elided definition's header.
+
+    Returns:
+        The windowed source, or None when there are no missed lines or the file
+        cannot be parsed.
+    """
+    missed = {line - 1 for line in missed_lines if line > 0}
+    if not missed:
+        return None
+    lines = code.split("\n")
+
+    definitions = _tree_sitter_definitions(file_path, code, header_max)
+    if definitions is None and file_path.endswith(".py"):
+        definitions = _python_definitions(code, header_max)
+    if definitions is None:
+        return None
+
+    shown = _lines_to_show(len(lines), missed, definitions)
+    output, elided = [], False
+    for index, line in enumerate(lines):
+        if index in shown:
+            output.append(f"{index + 1} {line}")
+            elided = False
+        elif not elided:
+            output.append(ELISION)
+            elided = True
+    return "\n".join(output)
+
+
+def _lines_to_show(line_count: int, missed: Set[int], definitions: List[Definition]) -> Set[int]:
+    inside_definitions: Set[int] = set()
+    for definition in definitions:
+        inside_definitions.update(range(definition.start, definition.end + 1))
+    # Module-level code outside any definition (imports, constants, missed top-level statements)
+    shown = set(range(line_count)) - inside_definitions
+
+    expanded = []
+    for line in missed:
+        enclosing = [d for d in definitions if d.start <= line <= d.end]
+        if not enclosing:
+            continue
+        functions = [d for d in enclosing if d.is_function]
+        # The innermost function, or the innermost class for class-level statements
+        window = min(functions or enclosing, key=lambda d: d.end - d.start)
+        expanded.append(window)
+        shown.update(range(window.start, window.end + 1))
+
+    for definition in definitions:
+        if not any(window.start <= definition.start and definition.end <= window.end for window in expanded):
+            shown.update(range(definition.start, definition.header_end))
+    return shown
+
+
+def _tree_sitter_definitions(file_path: str, code: str, header_max: int) -> Optional[List[Definition]]:
+    try:
+        # grep_ast loads the tree-sitter language pack on import, so only when a window is rendered
+        from grep_ast import TreeContext
+
+        context = TreeContext(file_path, code, color=False, line_number=True, header_max=header_max)
+    except Exception as e:
+        logging.getLogger(__name__).debug(f"No tree-sitter parse of {file_path}: {e}")
+        return None
+
+    definitions = []
+    for start, nodes in enumerate(context.nodes):
+        for node in nodes:
+            is_function = node.type in _FUNCTION_NODE_TYPES
+            if not is_function and node.type not in _CLASS_NODE_TYPES:
+                continue
+            _, head_end = context.header[start]
+            definitions.append(Definition(start, node.end_point[0], max(head_end, start + 1), is_function))
+    return definitions
+
+
+def _python_definitions(code: str, header_max: int) -> Optional[List[Definition]]:
+    try:
+        tree = ast.parse(code)
+    except SyntaxError:
+        return None
+
+    definitions = []
+    for node in ast.walk(tree):
+        if not isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+            continue
+        start = min([node.lineno] + [decorator.lineno for decorator in node.decorator_list]) - 1
+        # The header runs up to the first statement of the body
+        header_end = min(node.body[0].lineno - 1, node.lineno - 1 + header_max)
+        definitions.append(
+            Definition(start, node.end_lineno - 1, max(header_end, node.lineno), not isinstance(node, ast.ClassDef))
+        )
+    return definitions
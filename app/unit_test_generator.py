@@ -1,15 +1,28 @@
 # filepath: c:\Users\raedn\OneDrive\Bureau\FILES\DEV FILES\PROJECT\U-GEN\Unit_Test_Generator\app\unit_test_generator_fixed.py
 
+import ast
 import json
 import os
 import logging
-from typing import Optional, Dict, Any, List
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from queue import Queue
+from typing import Optional, Dict, Any, Iterator, List
 
 from abstract.prompt_builder_abc import PromptBuilderABC
+from app.coverage_processor import CoverageProcessor, CoverageType
 from app.logging.custom_logger import CustomLogger
 from file_preprocessor import FilePreprocessor
 from config.config_loader import get_settings
-from utility.utils import load_yaml
+from config.token_handling import estimate_tokens
+from prompt_budget import RESPONSE_TOKENS, PromptBudget, PromptSection, summarize_file
+from source_window import ELISION, render_uncovered_windows
+from utility.utils import NewTestsStreamParser, load_yaml
+
+
+# Keys whose values the model tends to emit without a block scalar
+KEYS_FIX_YAML = ["test_tags", "test_code", "test_name", "test_behavior"]
 
 
 class UnitTestGenerator:
@@ -31,8 +44,18 @@ class UnitTestGenerator:
         project_root: str = "",
         logger: Optional[logging.Logger] = None,
         generate_log_files: bool = True,
+        concurrent_generations: Optional[int] = None,
+        source_windowing: Optional[bool] = None,
     ):
-        """Initialize the UnitTestGenerator with simplified parameters."""
+        """
+        Initialize the UnitTestGenerator with simplified parameters.
+
+        `concurrent_generations` is the number of generation requests
+        `generate_tests_concurrently` sends per iteration; when omitted it is read from
+        `generation.concurrent_requests`. With `source_windowing` (default:
+        `generation.source_window`) the prompt shows only the definitions enclosing the
+        missed lines instead of the whole source file.
+        """
         self.project_root = project_root or os.getcwd()
         self.source_file_path = source_file_path
         self.test_file_path = test_file_path
@@ -48,6 +71,12 @@ class UnitTestGenerator:
         self.llm_model = llm_model
         self.agent_completion = agent_completion
         self.generate_log_files = generate_log_files
+        if concurrent_generations is None:
+            concurrent_generations = self._get_generation_setting("concurrent_requests", 1)
+        self.concurrent_generations = max(1, int(concurrent_generations))
+        if source_windowing is None:
+            source_windowing = self._get_generation_setting("source_window", False)
+        self.source_windowing = bool(source_windowing)
 
         # Get the logger instance (returns standard logging.Logger)
         self.logger = logger or CustomLogger.get_logger(__name__, generate_log_files=generate_log_files)
@@ -58,6 +87,8 @@ class UnitTestGenerator:
         self.total_output_token_count = 0
         self.testing_framework = "Unknown"
         self.code_coverage_report = ""
+        self._token_count_lock = threading.Lock()
+        self._template_tokens: Optional[int] = None
 
         # Read source file
         try:
@@ -139,6 +170,22 @@ class UnitTestGenerator:
         except Exception:
             return 4
 
+    @staticmethod
+    def _get_generation_setting(key: str, default: Any) -> Any:
+        """Read `generation.<key>` from the settings, falling back to `default`."""
+        try:
+            return get_settings().get(f"generation.{key}", default)
+        except Exception:
+            return default
+
+    @staticmethod
+    def _get_llm_setting(key: str, default: Any) -> Any:
+        """Read `llm.<key>` from the settings, falling back to `default`."""
+        try:
+            return get_settings().get(f"llm.{key}", default)
+        except Exception:
+            return default
+
     def get_included_files_content(self) -> str:
         """Convert included files to string format."""
         if not self.included_files:
@@ -156,51 +203,40 @@ class UnitTestGenerator:
         failed_test_runs: Optional[List[Dict[str, Any]]] = None, 
         language: str = "", 
         testing_framework: str = "", 
-        code_coverage_report: str = ""
+        code_coverage_report: str = "",
+        temperature: Optional[float] = None,
+        seed: Optional[int] = None,
+        missed_lines: Optional[List[int]] = None,
     ) -> Dict[str, Any]:
         """
         Generate tests using the AI model based on the constructed prompt.
+
+        Safe to call from several threads at once, as `generate_tests_concurrently` does.
+        `missed_lines` selects the source windows shown in windowing mode; by default
+        they are read from the coverage report.
         
         Returns:
             Dict containing generated tests or empty dict if error occurs
         """
-        # Process failed test runs
-        failed_test_runs_value = self.check_for_failed_test_runs(failed_test_runs)
-        
-        # Get max tests per run
-        max_tests_per_run = self.get_max_tests_per_run()
-        
-        # Get included files content
-        additional_includes_section = self.get_included_files_content()
-        
-        # Use provided language or fall back to detected language
-        language = language or self.language
+        prompt_arguments = self._prompt_arguments(
+            failed_test_runs, language, testing_framework, code_coverage_report, missed_lines
+        )
         
         try:
             # Generate tests using the agent completion
             response, prompt_token_count, response_token_count, self.prompt = self.agent_completion.generate_tests(
-                source_file_name=os.path.relpath(self.source_file_path, self.project_root),
-                max_tests=max_tests_per_run,
-                source_file_numbered="\n".join(f"{i + 1} {line}" for i, line in enumerate(self.source_code.split("\n"))),
-                code_coverage_report=code_coverage_report,
-                additional_instructions_text=self.additional_instructions,
-                additional_includes_section=additional_includes_section,
-                language=language,
-                test_file=self.test_code,
-                failed_tests_section=failed_test_runs_value,
-                test_file_name=os.path.relpath(self.test_file_path, self.project_root),
-                testing_framework=testing_framework,
+                **prompt_arguments,
+                temperature=temperature,
+                seed=seed,
             )
 
             # Update token counts
-            self.total_input_token_count += prompt_token_count
-            self.total_output_token_count += response_token_count
+            with self._token_count_lock:
+                self.total_input_token_count += prompt_token_count
+                self.total_output_token_count += response_token_count
             
             # Parse the response
-            tests_dict = load_yaml(
-                response,
-                keys_fix_yaml=["test_tags", "test_code", "test_name", "test_behavior"],
-            )
+            tests_dict = load_yaml(response, keys_fix_yaml=KEYS_FIX_YAML)
             
             if tests_dict is None:
                 self.logger.warning("No tests were generated from AI response")
@@ -212,3 +248,281 @@ class UnitTestGenerator:
             self.logger.error(f"Error during test generation: {e}")
             # Return empty dict instead of trying to record failure
             return {}
+
+    def _prompt_arguments(
+        self,
+        failed_test_runs: Optional[List[Dict[str, Any]]],
+        language: str,
+        testing_framework: str,
+        code_coverage_report: str,
+        missed_lines: Optional[List[int]] = None,
+    ) -> Dict[str, Any]:
+        """
+        Arguments of the test generation prompt, as taken by the agent completion.
+
+        The variable sections are packed into the model's context window (`llm.context_window`)
+        by priority: the coverage gaps and instructions, then the source file, the existing
+        tests, the failed runs and finally the included files. Sections that do not fit are
+        reduced to their FileMap outline, then clipped; the source file is first reduced to
+        the windows around its missed lines.
+        """
+        source_window = None
+        if self.source_windowing:
+            source_window = self._source_window(missed_lines)
+
+        sections = [
+            PromptSection("code_coverage_report", code_coverage_report, priority=0),
+            PromptSection("additional_instructions_text", self.additional_instructions, priority=0),
+            PromptSection(
+                "source_file_numbered",
+                source_window or "\n".join(f"{i + 1} {line}" for i, line in enumerate(self.source_code.split("\n"))),
+                priority=1,
+                summarize=lambda: (
+                    (None if self.source_windowing else self._source_window(missed_lines))
+                    or summarize_file(self.source_file_path, self.project_root)
+                ),
+            ),
+            PromptSection(
+                "test_file",
+                self.test_code,
+                priority=2,
+                summarize=lambda: summarize_file(self.test_file_path, self.project_root),
+            ),
+            PromptSection("failed_tests_section", self.check_for_failed_test_runs(failed_test_runs), priority=3),
+            PromptSection(
+                "additional_includes_section",
+                self.get_included_files_content(),
+                priority=4,
+                summarize=self._summarize_included_files,
+            ),
+        ]
+        budget = PromptBudget(
+            context_window=int(self._get_llm_setting("context_window", 8192)),
+            reserved_tokens=RESPONSE_TOKENS + self._prompt_template_tokens(),
+            logger=self.logger,
+        )
+        return {
+            **budget.pack(sections),
+            "source_file_name": os.path.relpath(self.source_file_path, self.project_root),
+            "max_tests": self.get_max_tests_per_run(),
+            # Use provided language or fall back to detected language
+            "language": language or self.language,
+            "test_file_name": os.path.relpath(self.test_file_path, self.project_root),
+            "testing_framework": testing_framework,
+        }
+
+    def _source_window(self, missed_lines: Optional[List[int]]) -> Optional[str]:
+        """The numbered source restricted to the definitions enclosing the missed lines."""
+        if missed_lines is None:
+            missed_lines = self._report_missed_lines()
+        window = render_uncovered_windows(self.source_file_path, self.source_code, missed_lines)
+        if window:
+            shown_lines = sum(1 for line in window.split("\n") if line != ELISION)
+            self.logger.info(
+                f"Showing {shown_lines} of {len(self.source_code.splitlines())} source lines "
+                f"around {len(missed_lines)} missed lines"
+            )
+        return window
+
+    def _report_missed_lines(self) -> List[int]:
+        """Missed lines of the source file according to the coverage report."""
+        try:
+            coverage_processor = CoverageProcessor(
+                file_path=self.code_coverage_report_path,
+                src_file_path=self.source_file_path,
+                coverage_type=CoverageType(self.coverage_type),
+                logger=self.logger,
+            )
+            return list(coverage_processor.process_coverage_report(time_of_test_command=0).lines_missed)
+        except Exception as e:
+            self.logger.warning(f"Could not read missed lines from {self.code_coverage_report_path}: {e}")
+            return []
+
+    def _prompt_template_tokens(self) -> int:
+        """Tokens of the fixed text of the test generation prompt."""
+        if self._template_tokens is None:
+            try:
+                template = get_settings().test_generation_prompt
+                self._template_tokens = estimate_tokens(f"{template.system}\n{template.user}")
+            except Exception:
+                self._template_tokens = 0
+        return self._template_tokens
+
+    def _summarize_included_files(self) -> Optional[str]:
+        """FileMap outlines of the included files, in the layout of `get_included_files`."""
+        summaries = []
+        for file_path in self.included_files:
+            summary = summarize_file(file_path, self.project_root)
+            if summary:
+                file_path_rel = os.path.relpath(file_path, self.project_root)
+                summaries.append(f"file_path: `{file_path_rel}`\ncontent:\n```\n{summary}\n```")
+        return "\n\n\n".join(summaries) or None
+
+    def stream_tests(
+        self,
+        failed_test_runs: Optional[List[Dict[str, Any]]] = None,
+        language: str = "",
+        testing_framework: str = "",
+        code_coverage_report: str = "",
+        temperature: Optional[float] = None,
+        seed: Optional[int] = None,
+        missed_lines: Optional[List[int]] = None,
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        Generate tests like `generate_tests`, yielding each one as soon as the model has written it.
+
+        The response is read and parsed on a background thread, so the model keeps
+        generating while the caller works on (e.g. validates) the tests already
+        yielded. When no test can be extracted incrementally, the complete response
+        is parsed as `generate_tests` would.
+
+        Yields:
+            The entries of the response's 'new_tests', in order
+        """
+        prompt_arguments = self._prompt_arguments(
+            failed_test_runs, language, testing_framework, code_coverage_report, missed_lines
+        )
+        tests: Queue = Queue()
+        end_of_response = object()
+
+        def read_response() -> None:
+            try:
+                response, self.prompt = self.agent_completion.stream_tests(
+                    **prompt_arguments,
+                    temperature=temperature,
+                    seed=seed,
+                )
+                parser = NewTestsStreamParser(keys_fix_yaml=KEYS_FIX_YAML, logger=self.logger)
+                for fragment in response:
+                    for test in parser.feed(fragment):
+                        tests.put(test)
+                for test in parser.close():
+                    tests.put(test)
+
+                if not parser.tests_parsed:
+                    tests_dict = load_yaml(response.text, keys_fix_yaml=KEYS_FIX_YAML)
+                    for test in (tests_dict.get('new_tests') if isinstance(tests_dict, dict) else None) or []:
+                        tests.put(test)
+
+                with self._token_count_lock:
+                    self.total_input_token_count += response.prompt_tokens
+                    self.total_output_token_count += response.completion_tokens
+            except Exception as e:
+                self.logger.error(f"Error during test generation: {e}")
+            finally:
+                tests.put(end_of_response)
+
+        threading.Thread(target=read_response, daemon=True).start()
+        while True:
+            test = tests.get()
+            if test is end_of_response:
+                return
+            yield test
+
+    def generate_tests_concurrently(
+        self,
+        failed_test_runs: Optional[List[Dict[str, Any]]] = None,
+        missed_lines: Optional[List[int]] = None,
+        language: str = "",
+        testing_framework: str = "",
+    ) -> Dict[str, Any]:
+        """
+        Issue `concurrent_generations` generation requests at once and merge their tests.
+
+        When `missed_lines` is given, each request targets its own contiguous slice of
+        the uncovered lines; otherwise the requests differ only in temperature and seed
+        (`generation.temperature` plus `generation.temperature_step` per request). The
+        merged result is de-duplicated with `merge_generated_tests`.
+
+        Returns:
+            Dict with the merged 'new_tests', or empty dict if no request produced tests
+        """
+        requests_count = self.concurrent_generations
+        if requests_count == 1:
+            return self.generate_tests(failed_test_runs, language, testing_framework, missed_lines=missed_lines)
+
+        base_temperature = float(self._get_generation_setting("temperature", 0.2))
+        temperature_step = float(self._get_generation_setting("temperature_step", 0.2))
+        slices = self._split_missed_lines(missed_lines or [], requests_count)
+
+        def request(index: int) -> Dict[str, Any]:
+            coverage_report = ""
+            if slices[index]:
+                coverage_report = f"Focus on these lines that are not covered yet: {self._format_line_ranges(slices[index])}"
+            return self.generate_tests(
+                failed_test_runs,
+                language,
+                testing_framework,
+                code_coverage_report=coverage_report,
+                temperature=min(base_temperature + index * temperature_step, 1.5),
+                seed=index,
+                missed_lines=slices[index] or missed_lines,
+            )
+
+        self.logger.info(f"Sending {requests_count} concurrent test generation requests")
+        with ThreadPoolExecutor(max_workers=requests_count) as executor:
+            responses = list(executor.map(request, range(requests_count)))
+        return self.merge_generated_tests(responses)
+
+    @staticmethod
+    def _split_missed_lines(missed_lines: List[int], parts: int) -> List[List[int]]:
+        """Split the sorted missed lines into `parts` contiguous slices of similar size."""
+        missed_lines = sorted(missed_lines)
+        size, remainder = divmod(len(missed_lines), parts)
+        slices, start = [], 0
+        for index in range(parts):
+            end = start + size + (1 if index < remainder else 0)
+            slices.append(missed_lines[start:end])
+            start = end
+        return slices
+
+    @staticmethod
+    def _format_line_ranges(lines: List[int]) -> str:
+        """Format sorted line numbers compactly, e.g. [3, 4, 5, 9] -> "3-5, 9"."""
+        ranges = []
+        for line in lines:
+            if ranges and line == ranges[-1][1] + 1:
+                ranges[-1][1] = line
+            else:
+                ranges.append([line, line])
+        return ", ".join(str(start) if start == end else f"{start}-{end}" for start, end in ranges)
+
+    def merge_generated_tests(self, responses: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Merge the parsed responses of several generation requests.
+
+        Tests are de-duplicated by normalized code (the AST for Python, whitespace-collapsed
+        text otherwise), and a test whose name was already taken by an earlier test is
+        dropped, since both cannot live in the same test file. Keys other than 'new_tests'
+        are taken from the first response that has them.
+        """
+        merged: Dict[str, Any] = {}
+        new_tests, seen_code, seen_names = [], set(), set()
+        for response in responses:
+            if not response:
+                continue
+            for key, value in response.items():
+                if key != 'new_tests':
+                    merged.setdefault(key, value)
+            for test in response.get('new_tests') or []:
+                code_key = self._normalize_test_code(test.get('test_code', ''))
+                name = test.get('test_name', '')
+                if code_key in seen_code or (name and name in seen_names):
+                    continue
+                seen_code.add(code_key)
+                seen_names.add(name)
+                new_tests.append(test)
+
+        if not new_tests and not merged:
+            return {}
+        self.logger.info(f"Merged {len(new_tests)} unique tests from {len(responses)} generation requests")
+        merged['new_tests'] = new_tests
+        return merged
+
+    def _normalize_test_code(self, test_code: str) -> str:
+        if self.language == "python":
+            try:
+                return ast.dump(ast.parse(test_code.strip()))
+            except SyntaxError:
+                pass
+        return re.sub(r"\s+", " ", test_code).strip()
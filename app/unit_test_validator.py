@@ -4,22 +4,64 @@ import os
 import shutil
 import logging
 import datetime
+import hashlib
 import json
+import re
 import subprocess
-from typing import Optional, Dict, Any, List, Union
+import tempfile
+import threading
+import time
+import xml.etree.ElementTree as ET
+from collections.abc import Mapping
+from contextlib import nullcontext
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, replace
+from queue import Queue
+from typing import Optional, Dict, Any, List, Tuple, Union
 
 from abstract.prompt_builder_abc import PromptBuilderABC
-from app.coverage_processor import CoverageProcessor
+from app.coverage_processor import CoverageProcessor, CoverageType as ReportCoverageType
+from app.file_coverage import FileCoverage, LineSet
 from app.logging.custom_logger import CustomLogger
 from file_preprocessor import FilePreprocessor
 from runner import Runner
+from single_test_command import add_pytest_arguments, build_single_test_command, get_pytest_node_id, get_test_names
 from config.config_loader import get_settings
 from config.config_schema import CoverageType
 from utility.utils import load_yaml
+from validation_sandbox import ValidationSandbox
+from warm_test_worker import WarmTestWorker
+
+
+@dataclass(frozen=True)
+class CoverageBaseline:
+    """
+    Coverage of the test suite as it currently stands, reused across candidate validations.
+
+    Attributes:
+        test_file_hash (str): Content hash of the test file the baseline was measured with.
+        source_file_hash (str): Content hash of the source file the baseline was measured with.
+        coverage (float): Coverage ratio, as returned by `UnitTestValidator.get_coverage`.
+        coverage_data: The parsed report, as returned by `CoverageProcessor.process_coverage_report`.
+        lines_covered (LineSet): Covered lines of the source file.
+        lines_missed (LineSet): Missed lines of the source file.
+        run_result (Dict[str, Any]): Result of the test run that produced the report.
+    """
+
+    test_file_hash: str
+    source_file_hash: str
+    coverage: float
+    coverage_data: Any
+    lines_covered: LineSet
+    lines_missed: LineSet
+    run_result: Dict[str, Any]
 
 
 class UnitTestValidator:
     """Simplified version of UnitTestValidator without external dependencies."""
+
+    # AI-adapted single test file commands, keyed by (project root, test command, test file)
+    _single_file_commands: Dict[Tuple[str, str, str], Optional[str]] = {}
     
     def __init__(
         self,
@@ -39,8 +81,34 @@ class UnitTestValidator:
         logger: Optional[logging.Logger] = None,
         project_root: Optional[str] = None,
         generate_log_files: bool = True,
+        parallel_workers: Optional[int] = None,
+        run_each_test_separately: Optional[bool] = None,
+        use_warm_worker: Optional[bool] = None,
+        batch_validation: Optional[bool] = None,
+        test_slots: Optional[threading.Semaphore] = None,
     ):
-        """Initialize the UnitTestValidator with simplified parameters."""
+        """
+        Initialize the UnitTestValidator with simplified parameters.
+
+        `parallel_workers` controls how many candidate tests `validate_tests` validates
+        concurrently, each in its own sandbox. When omitted it is read from
+        `validation.parallel_workers` in configuration.toml; 1 disables parallel validation.
+
+        `run_each_test_separately` validates each candidate by running only that test and
+        merging its coverage into the cached baseline, instead of re-running the whole suite.
+        When omitted it is read from `validation.run_each_test_separately`.
+
+        `use_warm_worker` runs those single Python tests in a long-lived `WarmTestWorker`
+        instead of a fresh test command process. When omitted it is read from
+        `validation.warm_worker`.
+
+        `batch_validation` makes `validate_tests` insert all candidates at once and run the
+        suite a single time, reading per-test outcomes from a JUnit XML report. When omitted
+        it is read from `validation.batch`.
+
+        `test_slots` is a semaphore shared with other validators, e.g. those of the
+        pipelines of a repository run, that bounds how many test runs execute at once.
+        """
         self.source_file_path = source_file_path
         self.test_file_path = test_file_path
         self.code_coverage_report_path = code_coverage_report_path
@@ -56,56 +124,151 @@ class UnitTestValidator:
         self.test_command_dir = test_command_dir or os.path.dirname(self.test_file_path)
         self.project_root = project_root or os.getcwd()
         self.generate_log_files = generate_log_files
+        self.parallel_workers = parallel_workers if parallel_workers is not None else self.get_parallel_workers()
+        if run_each_test_separately is None:
+            run_each_test_separately = self._get_validation_setting("run_each_test_separately", False)
+        self.run_each_test_separately = bool(run_each_test_separately)
+        if batch_validation is None:
+            batch_validation = self._get_validation_setting("batch", False)
+        self.batch_validation = bool(batch_validation)
+        self.test_slots = test_slots
         
         # Initialize logger
         self.logger = logger or CustomLogger.get_logger(__name__, generate_log_files=generate_log_files)
         
         # Initialize components
-        self.coverage_processor = CoverageProcessor(
-            coverage_type=coverage_type,
-            logger=self.logger
-        )
-        self.runner = Runner(
-            command=test_command,
-            cwd=self.test_command_dir,
-            logger=self.logger
-        )
+        self.coverage_processor = self._create_coverage_processor(self.code_coverage_report_path)
+        self.runner = Runner()
+        if use_warm_worker is None:
+            use_warm_worker = self._get_validation_setting("warm_worker", False)
+        self.warm_worker: Optional[WarmTestWorker] = None
+        if use_warm_worker and self.source_file_path.endswith(".py") and self.test_file_path.endswith(".py"):
+            self.warm_worker = WarmTestWorker(
+                source_file_path=self.source_file_path,
+                test_command_dir=self.test_command_dir,
+                python_executable=self._get_validation_setting("warm_worker_python", "") or None,
+                logger=self.logger,
+            )
         
         # State tracking
+        self.last_test_command_time = 0
+        self.baseline: Optional[CoverageBaseline] = None
         self.current_coverage = 0.0
         self.last_coverage_percentages = {}
         self.last_source_file_coverage = 0.0
         self.failed_test_runs = []
         
+    def _create_coverage_processor(self, report_path: str) -> CoverageProcessor:
+        """Create a CoverageProcessor reading `report_path` for this validator's source file."""
+        return CoverageProcessor(
+            file_path=report_path,
+            src_file_path=self.source_file_path,
+            coverage_type=ReportCoverageType(getattr(self.coverage_type, "value", self.coverage_type)),
+            logger=self.logger,
+            generate_log_files=self.generate_log_files,
+        )
+
+    @staticmethod
+    def _get_validation_setting(key: str, default: Any) -> Any:
+        """Read a `[validation]` setting from configuration.toml, falling back to `default`."""
+        try:
+            return get_settings().get(f"validation.{key}", default)
+        except Exception:
+            return default
+
+    def get_parallel_workers(self) -> int:
+        """Get the number of parallel validation workers from settings."""
+        try:
+            return max(1, int(self._get_validation_setting("parallel_workers", 1)))
+        except (TypeError, ValueError):
+            return 1
+
     def get_coverage(self) -> float:
         """Get the current coverage percentage."""
+        return self._read_coverage(self.coverage_processor, self.last_test_command_time)
+
+    def _read_coverage(self, coverage_processor: CoverageProcessor, time_of_test_command: int) -> float:
+        """Read the coverage ratio from the report behind `coverage_processor`."""
         try:
-            coverage_data = self.coverage_processor.process_coverage_report(
-                self.code_coverage_report_path
-            )
-            
-            if isinstance(coverage_data, dict) and 'total_coverage' in coverage_data:
-                return coverage_data['total_coverage']
-            elif isinstance(coverage_data, dict):
-                # Calculate total coverage from file data
-                total_lines = 0
-                covered_lines = 0
-                
-                for file_path, file_data in coverage_data.items():
-                    if isinstance(file_data, (list, tuple)) and len(file_data) >= 2:
-                        covered, total = file_data[0], file_data[0] + file_data[1]
-                        covered_lines += covered
-                        total_lines += total
-                
-                return covered_lines / total_lines if total_lines > 0 else 0.0
-            else:
-                self.logger.warning("Unexpected coverage data format")
-                return 0.0
-                
+            return self._coverage_ratio(coverage_processor.process_coverage_report(time_of_test_command))
         except Exception as e:
             self.logger.warning(f"Error getting coverage: {e}")
             return 0.0
-    
+
+    def _coverage_ratio(self, coverage_data: Any) -> float:
+        """Compute the coverage ratio from a parsed coverage report."""
+        if isinstance(coverage_data, (tuple, FileCoverage)):
+            # (lines_covered, lines_missed, percentage_covered) for the source file
+            return coverage_data[2]
+        elif isinstance(coverage_data, Mapping):
+            # Calculate total coverage from file data
+            total_lines = 0
+            covered_lines = 0
+
+            for file_path, file_data in coverage_data.items():
+                if isinstance(file_data, (list, tuple, FileCoverage)) and len(file_data) >= 2:
+                    covered = len(file_data[0])
+                    covered_lines += covered
+                    total_lines += covered + len(file_data[1])
+
+            return covered_lines / total_lines if total_lines > 0 else 0.0
+        else:
+            self.logger.warning("Unexpected coverage data format")
+            return 0.0
+
+    @staticmethod
+    def _content_hash(path: str) -> str:
+        """Return the SHA-256 of a file's content, or an empty string if it does not exist."""
+        try:
+            with open(path, "rb") as f:
+                return hashlib.sha256(f.read()).hexdigest()
+        except FileNotFoundError:
+            return ""
+
+    def _baseline_is_current(self) -> bool:
+        """Whether the cached baseline was measured with the current test and source files."""
+        return (
+            self.baseline is not None
+            and self.baseline.test_file_hash == self._content_hash(self.test_file_path)
+            and self.baseline.source_file_hash == self._content_hash(self.source_file_path)
+        )
+
+    def _record_baseline(self, run_result: Dict[str, Any]) -> CoverageBaseline:
+        """Parse the report produced by `run_result` and cache it as the current baseline."""
+        try:
+            coverage_data = self.coverage_processor.process_coverage_report(run_result['command_start_time'])
+        except Exception as e:
+            self.logger.warning(f"Error getting coverage: {e}")
+            coverage_data = ([], [], 0.0)
+
+        lines_covered, lines_missed = self._source_file_lines(coverage_data)
+        self.baseline = CoverageBaseline(
+            test_file_hash=self._content_hash(self.test_file_path),
+            source_file_hash=self._content_hash(self.source_file_path),
+            coverage=self._coverage_ratio(coverage_data),
+            coverage_data=coverage_data,
+            lines_covered=LineSet(lines_covered),
+            lines_missed=LineSet(lines_missed),
+            run_result=run_result,
+        )
+        return self.baseline
+
+    def get_baseline(self) -> CoverageBaseline:
+        """
+        Return the baseline coverage of the current test suite.
+
+        The suite is only re-run when the test file or the source file content has
+        changed since the cached baseline was measured.
+        """
+        if self._baseline_is_current():
+            self.logger.info("Reusing cached baseline coverage")
+            return self.baseline
+
+        baseline_result = self.run_test_command()
+        if not baseline_result['success']:
+            self.logger.warning("Baseline test run failed")
+        return self._record_baseline(baseline_result)
+
     def get_language_extension_mapping(self) -> Dict[str, List[str]]:
         """Get language to file extension mapping from configuration."""
         try:
@@ -138,25 +301,43 @@ class UnitTestValidator:
                 "javascript": [".js", ".jsx", ".ts", ".tsx"]
             }
     
-    def run_test_command(self) -> Dict[str, Any]:
-        """Run the test command and return the result."""
+    def _test_slot(self):
+        """Context holding one of the shared test run slots, if any, for the duration of a run."""
+        return self.test_slots if self.test_slots is not None else nullcontext()
+
+    def run_test_command(self, test_command: Optional[str] = None, env: Optional[Dict[str, str]] = None) -> Dict[str, Any]:
+        """
+        Run the test command and return the result.
+
+        Args:
+            test_command: Command to run instead of `self.test_command` (e.g. a sandboxed variant).
+            env: Extra environment variables for the run.
+        """
+        is_main_run = test_command is None
+        test_command = test_command or self.test_command
+        command_start_time = int(time.time() * 1000)
         try:
-            self.logger.info(f'Running test command: "{self.test_command}"')
-            
-            result = subprocess.run(
-                self.test_command,
-                shell=True,
-                cwd=self.test_command_dir,
-                capture_output=True,
-                text=True,
-                timeout=self.max_run_time_sec
-            )
-            
+            self.logger.info(f'Running test command: "{test_command}"')
+
+            with self._test_slot():
+                result = subprocess.run(
+                    test_command,
+                    shell=True,
+                    cwd=self.test_command_dir,
+                    capture_output=True,
+                    text=True,
+                    timeout=self.max_run_time_sec,
+                    env={**os.environ, **env} if env else None,
+                )
+            if is_main_run:
+                self.last_test_command_time = command_start_time
+
             return {
                 'exit_code': result.returncode,
                 'stdout': result.stdout,
                 'stderr': result.stderr,
-                'success': result.returncode == 0
+                'success': result.returncode == 0,
+                'command_start_time': command_start_time,
             }
             
         except subprocess.TimeoutExpired:
@@ -165,7 +346,8 @@ class UnitTestValidator:
                 'exit_code': -1,
                 'stdout': '',
                 'stderr': 'Test command timed out',
-                'success': False
+                'success': False,
+                'command_start_time': command_start_time,
             }
         except Exception as e:
             self.logger.error(f"Error running test command: {e}")
@@ -173,7 +355,8 @@ class UnitTestValidator:
                 'exit_code': -1,
                 'stdout': '',
                 'stderr': str(e),
-                'success': False
+                'success': False,
+                'command_start_time': command_start_time,
             }
     
     def insert_test_into_file(self, test_code: str) -> bool:
@@ -214,6 +397,11 @@ class UnitTestValidator:
         Returns:
             Dictionary with validation results or None if validation failed
         """
+        if (self.run_each_test_separately or self.warm_worker) and test_data.get('test_code'):
+            result = self._validate_test_separately(test_data)
+            if result is not None:
+                return result
+
         try:
             test_code = test_data.get('test_code', '')
             if not test_code:
@@ -228,12 +416,8 @@ class UnitTestValidator:
             if os.path.exists(self.test_file_path):
                 shutil.copy2(self.test_file_path, backup_path)
             
-            # Get baseline coverage
-            baseline_result = self.run_test_command()
-            if not baseline_result['success']:
-                self.logger.warning("Baseline test run failed")
-            
-            baseline_coverage = self.get_coverage()
+            # Get baseline coverage, re-running the suite only if the test or source file changed
+            baseline_coverage = self.get_baseline().coverage
             
             # Insert the new test
             if not self.insert_test_into_file(test_code):
@@ -251,6 +435,8 @@ class UnitTestValidator:
                 coverage_improvement = new_coverage - baseline_coverage
                 
                 if coverage_improvement > 0:
+                    # The accepted run is the baseline for the next candidate
+                    self._record_baseline(test_result)
                     self.logger.info(f"Test passed and improved coverage by {coverage_improvement:.2%}")
                     return {
                         'status': 'PASS',
@@ -309,6 +495,644 @@ class UnitTestValidator:
                 except Exception:
                     pass
     
+    def get_single_test_command(self, test_names: List[str], test_file_content: str) -> Optional[str]:
+        """
+        Build a command that runs only the tests `test_names` from the test file.
+
+        pytest and jest commands are adapted deterministically. Other commands are first
+        narrowed to the test file by the `adapt_test_command_for_a_single_test_via_ai`
+        prompt, whose answer is cached per project for the lifetime of the process.
+        """
+        command = build_single_test_command(
+            self.test_command, self.test_file_path, self.test_command_dir, test_names, test_file_content
+        )
+        if command:
+            return command
+
+        file_command = self._get_single_file_command()
+        if not file_command:
+            return None
+        return build_single_test_command(
+            file_command, self.test_file_path, self.test_command_dir, test_names, test_file_content
+        ) or file_command
+
+    def _get_single_file_command(self) -> Optional[str]:
+        """Ask the AI to adapt the test command to the test file, caching the answer per project."""
+        test_file_relative_path = os.path.relpath(self.test_file_path, self.project_root)
+        cache_key = (os.path.abspath(self.project_root), self.test_command, test_file_relative_path)
+        if cache_key in UnitTestValidator._single_file_commands:
+            return UnitTestValidator._single_file_commands[cache_key]
+
+        command = None
+        try:
+            response, _, _, _ = self.agent_completion.adapt_test_command_for_a_single_test_via_ai(
+                test_file_relative_path=test_file_relative_path,
+                test_command=self.test_command,
+                project_root_dir=self.project_root,
+            )
+            response_dict = load_yaml(response) or {}
+            command = str(response_dict.get("new_command_line", "")).strip() or None
+            self.logger.info(f'Adapted test command for a single test file: "{command}"')
+        except Exception as e:
+            self.logger.warning(f"Error adapting test command for a single test: {e}")
+
+        UnitTestValidator._single_file_commands[cache_key] = command
+        return command
+
+    def _merge_into_baseline(self, lines_covered: List[int], run_result: Dict[str, Any]) -> CoverageBaseline:
+        """Merge the lines covered by a single accepted test into the cached baseline."""
+        merged_covered = self.baseline.lines_covered | LineSet(lines_covered)
+        merged_missed = self.baseline.lines_missed - merged_covered
+        total_lines = len(merged_covered) + len(merged_missed)
+        percentage = len(merged_covered) / total_lines if total_lines > 0 else 0.0
+
+        self.baseline = CoverageBaseline(
+            test_file_hash=self._content_hash(self.test_file_path),
+            source_file_hash=self._content_hash(self.source_file_path),
+            coverage=percentage,
+            coverage_data=FileCoverage(merged_covered, merged_missed, percentage),
+            lines_covered=merged_covered,
+            lines_missed=merged_missed,
+            run_result=run_result,
+        )
+        return self.baseline
+
+    def _source_file_lines(self, coverage_data: Any) -> Tuple[List[int], List[int]]:
+        """Extract the (covered, missed) lines of the source file from a parsed coverage report."""
+        if isinstance(coverage_data, (tuple, FileCoverage)):
+            return coverage_data[0], coverage_data[1]
+        for file_path, file_data in coverage_data.items():
+            if self.coverage_processor._file_matches(file_path, self.source_file_path):
+                return file_data[0], file_data[1]
+        return [], []
+
+    def _validate_test_separately(self, test_data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """
+        Validate a candidate by running only its tests and merging their coverage into the baseline.
+
+        Returns:
+            The validation result, or None if the candidate's tests cannot be run on their
+            own, in which case the caller falls back to running the whole suite.
+        """
+        test_code = test_data['test_code']
+        test_names = get_test_names(test_code)
+
+        original_content = self._read_test_file()
+
+        # A name clash would shadow an existing test, which only a full suite run can detect
+        if not test_names or any(
+            re.search(rf"\b{re.escape(part)}\b", original_content) for name in test_names for part in name.split("::")
+        ):
+            return None
+
+        baseline = self.get_baseline()
+        if not self.insert_test_into_file(test_code):
+            return None
+
+        try:
+            with open(self.test_file_path, 'r', encoding='utf-8') as f:
+                new_content = f.read()
+            if self.warm_worker:
+                test_file_arg = os.path.abspath(self.test_file_path)
+                node_ids = [get_pytest_node_id(new_content, test_file_arg, name) for name in test_names]
+                with self._test_slot():
+                    test_result = self.warm_worker.run_test(self.test_file_path, node_ids, self.max_run_time_sec)
+            else:
+                command = self.get_single_test_command(test_names, new_content)
+                if not command:
+                    raise ValueError("no single-test command available")
+                test_result = self.run_test_command(test_command=command)
+            if not test_result['success']:
+                self.logger.warning("Test run failed")
+                self._restore_test_file(original_content)
+                return {
+                    'status': 'FAIL',
+                    'reason': 'Test execution failed',
+                    'coverage_improvement': 0.0,
+                    'error_output': test_result['stderr']
+                }
+
+            if 'lines_covered' in test_result:
+                lines_covered = test_result['lines_covered']
+            else:
+                coverage_data = self.coverage_processor.process_coverage_report(test_result['command_start_time'])
+                lines_covered, _ = self._source_file_lines(coverage_data)
+            newly_covered = LineSet(lines_covered) - baseline.lines_covered
+            if not newly_covered:
+                self.logger.info("Test passed but did not improve coverage")
+                self._restore_test_file(original_content)
+                return {
+                    'status': 'FAIL',
+                    'reason': 'Test did not improve coverage',
+                    'coverage_improvement': 0.0,
+                    'baseline_coverage': baseline.coverage,
+                    'new_coverage': baseline.coverage
+                }
+
+            new_coverage = self._merge_into_baseline(lines_covered, test_result).coverage
+            coverage_improvement = new_coverage - baseline.coverage
+            self.logger.info(
+                f"Test passed and covered {len(newly_covered)} new lines, improving coverage by {coverage_improvement:.2%}"
+            )
+            return {
+                'status': 'PASS',
+                'reason': 'Test passed and improved coverage',
+                'coverage_improvement': coverage_improvement,
+                'baseline_coverage': baseline.coverage,
+                'new_coverage': new_coverage
+            }
+
+        except Exception as e:
+            self.logger.warning(f"Running the test on its own failed ({e}), falling back to the full suite")
+            self._restore_test_file(original_content)
+            return None
+
+    def _read_test_file(self) -> str:
+        """Return the current content of the test file, or an empty string if it does not exist."""
+        try:
+            with open(self.test_file_path, 'r', encoding='utf-8') as f:
+                return f.read()
+        except FileNotFoundError:
+            return ""
+
+    def _restore_test_file(self, content: str) -> None:
+        """Write `content` back to the test file."""
+        with open(self.test_file_path, 'w', encoding='utf-8') as f:
+            f.write(content)
+
+    def validate_tests(self, tests: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Validate a batch of candidate tests, in parallel when `parallel_workers` > 1.
+
+        In parallel mode every candidate is validated against the same baseline in its own
+        `ValidationSandbox`, so candidates never see each other. The passing candidates are
+        then credited in their original order with the lines no earlier one covered, and
+        those adding no line fail as in the sequential mode. The rest are inserted into the
+        real test file in order and the suite is run once to confirm the merged file; if
+        that run fails, the winners are re-validated sequentially.
+
+        Args:
+            tests: Candidate tests as returned by `UnitTestGenerator.generate_tests`.
+
+        Returns:
+            One validation result per candidate, in the same order as `tests`.
+        """
+        if self.batch_validation and len(tests) > 1:
+            return self._validate_batch(tests)
+
+        workers = min(self.parallel_workers, len(tests))
+        if workers <= 1:
+            return [self.validate_test(test_data) for test_data in tests]
+
+        original_content = self._read_test_file()
+
+        sandboxes = []
+        try:
+            for worker_id in range(workers):
+                sandboxes.append(
+                    ValidationSandbox(
+                        worker_id=worker_id,
+                        test_file_path=self.test_file_path,
+                        code_coverage_report_path=self.code_coverage_report_path,
+                        test_command=self.test_command,
+                        test_command_dir=self.test_command_dir,
+                        coverage_type=getattr(self.coverage_type, "value", self.coverage_type),
+                    )
+                )
+        except ValueError as e:
+            for sandbox in sandboxes:
+                sandbox.cleanup()
+            self.logger.warning(f"Parallel validation unavailable ({e}), validating sequentially")
+            return [self.validate_test(test_data) for test_data in tests]
+
+        try:
+            baseline = self.get_baseline()
+
+            self.logger.info(f"Validating {len(tests)} tests on {workers} parallel workers")
+            free_sandboxes: Queue = Queue()
+            for sandbox in sandboxes:
+                free_sandboxes.put(sandbox)
+
+            def validate_with_free_sandbox(test_data: Dict[str, Any]) -> Tuple[Dict[str, Any], LineSet]:
+                sandbox = free_sandboxes.get()
+                try:
+                    return self._validate_in_sandbox(sandbox, original_content, test_data, baseline.coverage)
+                finally:
+                    free_sandboxes.put(sandbox)
+
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                outcomes = list(executor.map(validate_with_free_sandbox, tests))
+        finally:
+            for sandbox in sandboxes:
+                sandbox.cleanup()
+
+        results = [result for result, _ in outcomes]
+        winners = self._credit_parallel_winners(results, [lines for _, lines in outcomes], baseline)
+        if winners:
+            self._merge_parallel_winners(tests, results, winners, original_content)
+        return results
+
+    def _validate_in_sandbox(
+        self,
+        sandbox: ValidationSandbox,
+        original_content: str,
+        test_data: Dict[str, Any],
+        baseline_coverage: float,
+    ) -> Tuple[Dict[str, Any], LineSet]:
+        """
+        Validate one candidate against `baseline_coverage` inside `sandbox`.
+
+        Returns:
+            The validation result and the source lines covered by the sandbox's run
+            (empty unless the candidate passed).
+        """
+        test_code = test_data.get('test_code', '')
+        if not test_code:
+            return {
+                'status': 'FAIL',
+                'reason': 'No test code provided',
+                'coverage_improvement': 0.0
+            }, LineSet()
+
+        try:
+            sandbox.write_test_file(original_content + "\n\n" + test_code if original_content else test_code)
+            test_result = self.run_test_command(test_command=sandbox.test_command, env=sandbox.env)
+            if not test_result['success']:
+                return {
+                    'status': 'FAIL',
+                    'reason': 'Test execution failed',
+                    'coverage_improvement': 0.0,
+                    'error_output': test_result['stderr']
+                }, LineSet()
+
+            coverage_processor = self._create_coverage_processor(sandbox.code_coverage_report_path)
+            coverage_data = coverage_processor.process_coverage_report(test_result['command_start_time'])
+            new_coverage = self._coverage_ratio(coverage_data)
+            coverage_improvement = new_coverage - baseline_coverage
+            if coverage_improvement > 0:
+                return {
+                    'status': 'PASS',
+                    'reason': 'Test passed and improved coverage',
+                    'coverage_improvement': coverage_improvement,
+                    'baseline_coverage': baseline_coverage,
+                    'new_coverage': new_coverage
+                }, LineSet(self._source_file_lines(coverage_data)[0])
+            return {
+                'status': 'FAIL',
+                'reason': 'Test did not improve coverage',
+                'coverage_improvement': coverage_improvement,
+                'baseline_coverage': baseline_coverage,
+                'new_coverage': new_coverage
+            }, LineSet()
+
+        except Exception as e:
+            self.logger.error(f"Error validating test in sandbox {sandbox.worker_id}: {e}")
+            return {
+                'status': 'FAIL',
+                'reason': f'Validation error: {str(e)}',
+                'coverage_improvement': 0.0
+            }, LineSet()
+
+    def _credit_parallel_winners(
+        self,
+        results: List[Dict[str, Any]],
+        lines_covered: List[LineSet],
+        baseline: CoverageBaseline,
+    ) -> List[int]:
+        """
+        Credit the passing candidates in order with the lines no earlier one covered.
+
+        Every sandbox ran against the same baseline, so two candidates covering the same
+        missed line both passed there. Like the sequential mode, a candidate that adds no
+        line beyond the baseline and the earlier winners is marked FAIL.
+
+        Returns:
+            The indices of the candidates that still pass.
+        """
+        winners = []
+        claimed = baseline.lines_covered
+        for i, result in enumerate(results):
+            if result.get('status') != 'PASS':
+                continue
+            if not lines_covered[i]:
+                # The report had no line data for the source file, so only the ratio can judge
+                winners.append(i)
+                continue
+            new_lines = lines_covered[i] - claimed
+            if not new_lines:
+                self.logger.info("Test passed but did not improve coverage beyond earlier tests of the batch")
+                results[i] = dict(result, status='FAIL', reason='Test did not improve coverage', coverage_improvement=0.0)
+                continue
+            claimed = claimed | new_lines
+            winners.append(i)
+        return winners
+
+    def _merge_parallel_winners(
+        self,
+        tests: List[Dict[str, Any]],
+        results: List[Dict[str, Any]],
+        winners: List[int],
+        original_content: str,
+    ) -> None:
+        """Insert the winning candidates in order and confirm the merged test file with one run."""
+        for i in winners:
+            self.insert_test_into_file(tests[i]['test_code'])
+
+        confirm_result = self.run_test_command()
+        if confirm_result['success']:
+            self._record_baseline(confirm_result)
+            self.logger.info(f"Merged {len(winners)} parallel-validated tests into {self.test_file_path}")
+            return
+
+        self.logger.warning("Merged test file failed, re-validating winning tests sequentially")
+        with open(self.test_file_path, 'w', encoding='utf-8') as f:
+            f.write(original_content)
+        for i in winners:
+            results[i] = self.validate_test(tests[i])
+
+    def _write_candidates(self, original_content: str, test_codes: List[str]) -> None:
+        """Reset the test file to `original_content` and append `test_codes` in order."""
+        self._restore_test_file(original_content)
+        for test_code in test_codes:
+            self.insert_test_into_file(test_code)
+
+    def _is_pytest_command(self) -> bool:
+        # Batch runs pass their arguments to the command's only pytest invocation
+        return add_pytest_arguments(self.test_command, "") is not None
+
+    def _collects(self, original_content: str, test_codes: List[str]) -> bool:
+        """Whether pytest can collect the test file with `test_codes` appended."""
+        self._write_candidates(original_content, test_codes)
+        command = re.sub(r"\s--cov-fail-under[= ]\S+", "", self.test_command)
+        result = self.run_test_command(test_command=add_pytest_arguments(command, "--collect-only -q"))
+        # 5: collection succeeded but found no tests
+        return result['exit_code'] in (0, 5)
+
+    def _find_uncollectable(self, original_content: str, test_codes: List[str], indices: List[int]) -> List[int]:
+        """Bisect `indices` down to the candidates that break collection of the test file."""
+        if self._collects(original_content, [test_codes[i] for i in indices]):
+            return []
+        if len(indices) == 1:
+            return indices
+        middle = len(indices) // 2
+        return (
+            self._find_uncollectable(original_content, test_codes, indices[:middle])
+            + self._find_uncollectable(original_content, test_codes, indices[middle:])
+        )
+
+    def _test_file_selector(self, path_parts: List[str], names: List[str]) -> Optional[str]:
+        """
+        The selector of a test within the test file (`test_x` or `TestX::test_x`, as returned by
+        `get_test_names`), or None if the test belongs to another file.
+
+        Args:
+            path_parts: Components of the reported test file path, relative to the pytest
+                rootdir and without extension.
+            names: The test's classes and function name.
+        """
+        file_parts = os.path.splitext(os.path.abspath(self.test_file_path))[0].split(os.sep)
+        if not path_parts or file_parts[-len(path_parts):] != path_parts:
+            return None
+        return "::".join(names)
+
+    def _parse_junit_results(self, junit_path: str) -> Dict[str, Tuple[str, str]]:
+        """
+        Read the outcomes of the test file's tests from a JUnit XML report.
+
+        Returns:
+            Dict mapping test selectors (without parametrization ids) to (outcome, message),
+            where outcome is one of 'passed', 'failed', 'error' or 'skipped'. A test is
+            only 'passed' if all of its cases passed. Tests of other files are left out.
+        """
+        results: Dict[str, Tuple[str, str]] = {}
+        for testcase in ET.parse(junit_path).getroot().iter('testcase'):
+            # The classname is the dotted file path, followed by the enclosing classes
+            classname = testcase.get('classname', '').split('.')
+            name = testcase.get('name', '').split('[', 1)[0]
+            selector = None
+            for i in range(1, len(classname) + 1):
+                selector = self._test_file_selector(classname[:i], classname[i:] + [name])
+                if selector is not None:
+                    break
+            if selector is None:
+                continue
+            outcome, message = 'passed', ''
+            for tag in ('failure', 'error', 'skipped'):
+                element = testcase.find(tag)
+                if element is not None:
+                    outcome = 'failed' if tag == 'failure' else tag
+                    message = element.get('message', '') + "\n" + (element.text or '')
+                    break
+            if results.get(selector, ('passed', ''))[0] == 'passed':
+                results[selector] = (outcome, message)
+        return results
+
+    def _coverage_data_file(self) -> str:
+        """
+        Path of the coverage.py data file written by the test command.
+
+        A `COVERAGE_FILE=...` assignment in the command itself (e.g. one data file per
+        pipeline in repository mode) takes precedence over the environment.
+        """
+        data_file = os.environ.get("COVERAGE_FILE", ".coverage")
+        match = re.search(r"(?<![\w$])COVERAGE_FILE=(\"[^\"]*\"|'[^']*'|[^\s;&|]+)", self.test_command)
+        if match:
+            data_file = match.group(1).strip("\"'")
+        return os.path.join(self.test_command_dir, data_file)
+
+    def _attribute_new_lines(
+        self, batch: List[int], names: List[List[str]], baseline: CoverageBaseline
+    ) -> Optional[Dict[int, LineSet]]:
+        """
+        Credit each candidate of a batch run with the source lines only it added.
+
+        Candidates are credited in order, each with the lines its tests executed that
+        neither the baseline nor an earlier candidate covered.
+
+        Returns:
+            Dict mapping candidate index to its new lines, or None if the run did not
+            record coverage contexts for every candidate.
+        """
+        test_lines: Dict[str, LineSet] = {}
+        for context, lines in self.coverage_processor.parse_test_contexts(self._coverage_data_file()).items():
+            # Contexts are pytest node ids, e.g. "tests/test_x.py::TestX::test_y[param]"
+            path, *node_names = context.split("[", 1)[0].split("::")
+            selector = self._test_file_selector(os.path.splitext(path)[0].split("/"), node_names) if node_names else None
+            if selector is not None:
+                test_lines[selector] = test_lines.get(selector, LineSet()) | lines
+        if any(name not in test_lines for i in batch for name in names[i]):
+            self.logger.info("Coverage contexts not recorded for every test, judging the batch as a whole")
+            return None
+
+        claimed = baseline.lines_covered
+        new_lines = {}
+        for i in batch:
+            executed = LineSet()
+            for name in names[i]:
+                executed = executed | test_lines[name]
+            new_lines[i] = executed - claimed
+            claimed = claimed | new_lines[i]
+        return new_lines
+
+    def _validate_batch(self, tests: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Validate all candidates with a single suite run.
+
+        All candidates are appended to the test file together and the suite is run once
+        with a JUnit XML report, so passing and failing candidates are told apart without
+        one run per candidate. Failing candidates are removed and, if any were, the suite is
+        re-run once to measure coverage without them. Bisection with `--collect-only` runs
+        only happens when the batch breaks test collection.
+
+        When the command uses pytest-cov, the run records per-test coverage contexts
+        (`--cov-context=test`), so the new lines of each candidate are known from that one
+        run: candidates are credited in order with the lines not covered by the baseline or
+        by an earlier candidate, and redundant ones are dropped without another execution.
+        Otherwise the passing candidates are kept if together they improve coverage and
+        each reports the combined improvement.
+
+        Candidates that cannot be told apart in the report (missing or duplicate names),
+        and commands that do not run pytest exactly once (so the report arguments cannot be
+        placed), fall back to `validate_test` one by one.
+        """
+        results: List[Optional[Dict[str, Any]]] = [None] * len(tests)
+        if not self._is_pytest_command():
+            self.logger.info("Batch validation needs a command with a single pytest run, validating sequentially")
+            return [self.validate_test(test_data) for test_data in tests]
+
+        baseline = self.get_baseline()
+        original_content = self._read_test_file()
+
+        test_codes = [test_data.get('test_code', '') for test_data in tests]
+        names = [get_test_names(code) for code in test_codes]
+        all_names = [name for candidate_names in names for name in candidate_names]
+        batch, sequential = [], []
+        for i, code in enumerate(test_codes):
+            if not code:
+                results[i] = {'status': 'FAIL', 'reason': 'No test code provided', 'coverage_improvement': 0.0}
+            elif not names[i] or any(
+                all_names.count(name) > 1
+                or any(re.search(rf"\b{re.escape(part)}\b", original_content) for part in name.split("::"))
+                for name in names[i]
+            ):
+                sequential.append(i)
+            else:
+                try:
+                    if self.test_file_path.endswith('.py'):
+                        compile(code, self.test_file_path, 'exec')
+                    batch.append(i)
+                except SyntaxError as e:
+                    results[i] = {
+                        'status': 'FAIL',
+                        'reason': 'Test collection failed',
+                        'coverage_improvement': 0.0,
+                        'error_output': str(e)
+                    }
+
+        fd, junit_path = tempfile.mkstemp(prefix="cover_agent_junit_", suffix=".xml")
+        os.close(fd)
+        junit_arg = f'"{junit_path}"' if " " in junit_path else junit_path
+        arguments = f"--junitxml={junit_arg}"
+        record_contexts = "--cov" in self.test_command and "--cov-context" not in self.test_command
+        if record_contexts:
+            arguments += " --cov-context=test"
+        batch_command = add_pytest_arguments(self.test_command, arguments)
+        try:
+            self.logger.info(f"Validating {len(batch)} tests in a single batch run")
+            run_result, outcomes = None, {}
+            while batch:
+                self._write_candidates(original_content, [test_codes[i] for i in batch])
+                run_result = self.run_test_command(test_command=batch_command)
+                try:
+                    outcomes = self._parse_junit_results(junit_path)
+                except (ET.ParseError, OSError):
+                    outcomes = {}
+
+                if any(name not in outcomes for i in batch for name in names[i]):
+                    # The batch did not run as a whole: find the candidates that break collection
+                    broken = self._find_uncollectable(original_content, test_codes, batch)
+                    if not broken:
+                        self.logger.warning("Batch run did not report every test, validating sequentially")
+                        sequential.extend(batch)
+                        batch = []
+                        break
+                    for i in broken:
+                        results[i] = {
+                            'status': 'FAIL',
+                            'reason': 'Test collection failed',
+                            'coverage_improvement': 0.0,
+                            'error_output': run_result['stderr'] or run_result['stdout']
+                        }
+                    batch = [i for i in batch if i not in broken]
+                    continue
+
+                failed = [i for i in batch if any(outcomes[name][0] != 'passed' for name in names[i])]
+                for i in failed:
+                    name = next(name for name in names[i] if outcomes[name][0] != 'passed')
+                    self.logger.info(f"Test {name} {outcomes[name][0]} in batch run")
+                    results[i] = {
+                        'status': 'FAIL',
+                        'reason': 'Test execution failed',
+                        'coverage_improvement': 0.0,
+                        'error_output': outcomes[name][1]
+                    }
+                batch = [i for i in batch if i not in failed]
+                if not failed:
+                    break
+        finally:
+            if os.path.exists(junit_path):
+                os.remove(junit_path)
+
+        new_lines = self._attribute_new_lines(batch, names, baseline) if batch and record_contexts else None
+        if batch and new_lines is not None:
+            new_baseline = self._record_baseline(run_result)
+            kept = [i for i in batch if new_lines[i]]
+            total_lines = len(new_baseline.lines_covered | new_baseline.lines_missed) or 1
+            for i in batch:
+                self.logger.info(f"Test {', '.join(names[i])} covers {len(new_lines[i])} new lines")
+                results[i] = {
+                    'status': 'PASS' if new_lines[i] else 'FAIL',
+                    'reason': 'Test passed and improved coverage' if new_lines[i] else 'Test did not improve coverage',
+                    'coverage_improvement': len(new_lines[i]) / total_lines,
+                    'baseline_coverage': baseline.coverage,
+                    'new_coverage': new_baseline.coverage if new_lines[i] else baseline.coverage
+                }
+            if not kept:
+                self._restore_test_file(original_content)
+                self.baseline = baseline
+            elif len(kept) < len(batch):
+                # Redundant tests added no lines, so the measured coverage still holds without them
+                self._write_candidates(original_content, [test_codes[i] for i in kept])
+                self.baseline = replace(new_baseline, test_file_hash=self._content_hash(self.test_file_path))
+        elif batch:
+            new_baseline = self._record_baseline(run_result)
+            coverage_improvement = new_baseline.coverage - baseline.coverage
+            status, reason = 'PASS', 'Test passed and improved coverage'
+            if coverage_improvement <= 0:
+                status, reason = 'FAIL', 'Test did not improve coverage'
+                self._restore_test_file(original_content)
+                self.baseline = baseline
+            self.logger.info(f"Batch of {len(batch)} passing tests: {reason.lower()} ({coverage_improvement:.2%})")
+            for i in batch:
+                results[i] = {
+                    'status': status,
+                    'reason': reason,
+                    'coverage_improvement': coverage_improvement,
+                    'baseline_coverage': baseline.coverage,
+                    'new_coverage': new_baseline.coverage
+                }
+        else:
+            self._restore_test_file(original_content)
+
+        for i in sequential:
+            results[i] = self.validate_test(tests[i])
+        return results
+
+    def close(self) -> None:
+        """Release long-lived resources such as the warm test worker."""
+        if self.warm_worker:
+            self.warm_worker.stop()
+
     def process_failed_test_runs(self) -> None:
         """Process any failed test runs (simplified version)."""
         if self.failed_test_runs:
@@ -320,14 +1144,14 @@ class UnitTestValidator:
         """Get coverage percentages for individual files."""
         try:
             coverage_data = self.coverage_processor.process_coverage_report(
-                self.code_coverage_report_path
+                self.last_test_command_time
             )
             
-            if isinstance(coverage_data, dict):
+            if isinstance(coverage_data, Mapping):
                 result = {}
                 for file_path, file_data in coverage_data.items():
-                    if isinstance(file_data, (list, tuple)) and len(file_data) >= 2:
-                        covered, missed = file_data[0], file_data[1]
+                    if isinstance(file_data, (list, tuple, FileCoverage)) and len(file_data) >= 2:
+                        covered, missed = len(file_data[0]), len(file_data[1])
                         total = covered + missed
                         if total > 0:
                             result[file_path] = covered / total
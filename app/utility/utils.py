@@ -4,17 +4,15 @@ import logging
 import os
 import re
 
-from typing import List
+from typing import TYPE_CHECKING, List, Optional
 
 import yaml
 
-from dynaconf import Dynaconf
-from grep_ast import filename_to_lang
-
-from lsp.utils.utils import is_forbidden_directory
 from config.config_loader import get_settings
-from config.token_handling import TokenEncoder, clip_tokens
-from version import __version__
+from config.token_handling import clip_tokens, count_tokens
+
+if TYPE_CHECKING:
+    from dynaconf import Dynaconf
 
 
 def load_yaml(response_text: str, keys_fix_yaml: List[str] = []) -> dict:
@@ -140,6 +138,107 @@ def try_fix_yaml(response_text: str, keys_fix_yaml: List[str] = []) -> dict:
         pass
 
 
+class NewTestsStreamParser:
+    """
+    Incrementally extract the `new_tests` entries of a YAML response while it streams in.
+
+    Each entry is parsed as soon as it is complete, i.e. when the next line at the
+    indentation of the list arrives: the next `- ` item, another top-level key or
+    the closing code fence. With the field order of the test generation prompt,
+    that is right after the entry's `test_code` block and its short trailing fields.
+
+    Example:
+        parser = NewTestsStreamParser(keys_fix_yaml=['test_code'])
+        for fragment in response:
+            for test in parser.feed(fragment):
+                ...
+        tests = parser.close()
+    """
+
+    def __init__(self, keys_fix_yaml: List[str] = [], logger: Optional[logging.Logger] = None):
+        self.keys_fix_yaml = keys_fix_yaml
+        self.logger = logger or logging.getLogger(__name__)
+        self.tests_parsed = 0
+        self._partial_line = ""
+        self._in_list = False
+        self._finished = False
+        self._list_indent: Optional[int] = None
+        self._entry: List[str] = []
+
+    def feed(self, text: str) -> List[dict]:
+        """Consume the next fragment of the response and return the entries it completed."""
+        self._partial_line += text
+        *lines, self._partial_line = self._partial_line.split("\n")
+        tests = []
+        for line in lines:
+            test = self._feed_line(line)
+            if test:
+                tests.append(test)
+        return tests
+
+    def close(self) -> List[dict]:
+        """Signal the end of the response and return the entries still pending."""
+        tests = self.feed("\n") if self._partial_line else []
+        test = self._finish_entry()
+        if test:
+            tests.append(test)
+        self._finished = True
+        return tests
+
+    def _feed_line(self, line: str) -> Optional[dict]:
+        if self._finished:
+            return None
+        stripped = line.strip()
+        if not self._in_list:
+            self._in_list = re.match(r"new_tests:\s*$", stripped) is not None
+            return None
+        if stripped.startswith("```"):
+            self._finished = True
+            return self._finish_entry()
+        if not stripped:
+            # Blank lines may be part of a block scalar
+            if self._entry:
+                self._entry.append(line)
+            return None
+
+        indent = len(line) - len(line.lstrip())
+        is_item = stripped == "-" or stripped.startswith("- ")
+        if self._list_indent is None:
+            if not is_item:
+                self._finished = True
+                return None
+            self._list_indent = indent
+        if indent < self._list_indent or (indent == self._list_indent and not is_item):
+            # A dedent ends the list
+            self._finished = True
+            return self._finish_entry()
+        if indent == self._list_indent:
+            test = self._finish_entry()
+            self._entry = [line]
+            return test
+        self._entry.append(line)
+        return None
+
+    def _finish_entry(self) -> Optional[dict]:
+        if not self._entry:
+            return None
+        # Dedent by slicing: textwrap.dedent would also empty whitespace-only lines inside block scalars
+        entry_text = "\n".join(line[self._list_indent:] for line in self._entry) + "\n"
+        self._entry = []
+        try:
+            # Parse the text as is: load_yaml strips it, which would drop the final newline of block scalars
+            data = yaml.safe_load(entry_text)
+        except yaml.YAMLError:
+            data = load_yaml(entry_text, keys_fix_yaml=self.keys_fix_yaml)
+        if isinstance(data, list) and data:
+            data = data[0]
+        if not isinstance(data, dict):
+            self.logger.info("Failed to parse a streamed test entry")
+            return None
+        self.tests_parsed += 1
+        return data
+
+
 def get_included_files(included_files: list, project_root: str = "", disable_tokens=False) -> str:
     if included_files:
         included_files_content = []
@@ -159,8 +258,7 @@ def get_included_files(included_files: list, project_root: str = "", disable_tok
 
         out_str = out_str.strip()
         if not disable_tokens and get_settings().get("include_files.limit_tokens", False):
-            encoder = TokenEncoder.get_token_encoder()
-            num_input_tokens = len(encoder.encode(out_str))
+            num_input_tokens = count_tokens(out_str)
             if num_input_tokens > get_settings().get("include_files.max_tokens"):
                 print(
                     f"Clipping included files content from {num_input_tokens} to {get_settings().get('include_files.max_tokens')} tokens"
@@ -174,10 +272,12 @@ def get_included_files(included_files: list, project_root: str = "", disable_tok
     return ""
 
 
-def parse_args_full_repo(settings: Dynaconf) -> argparse.Namespace:
+def parse_args_full_repo(settings: "Dynaconf") -> argparse.Namespace:
     """
     Parse command line arguments.
     """
+    from version import __version__
+
     parser = argparse.ArgumentParser(description=f"Cover Agent v{__version__}")
 
     # Accepts from environment variables first
@@ -370,24 +470,20 @@ def find_test_files(args) -> list:
             print(f"Test folder not found: `{full_path}`, exiting.\n")
             exit(-1)
 
+    from repo_scanner import RepoScanner, language_for_file
+
     MAX_TEST_FILES = args.max_test_files_allowed_to_analyze
     test_files = []
-    for root, dirs, files in os.walk(project_dir):
-        # Check if the current directory is a 'test' directory
-        if not is_forbidden_directory(root.__add__(os.sep), language):
-            if hasattr(args, "test_folder") and args.test_folder:
-                if args.test_folder not in root:
-                    continue
-            if "test" in root.split(os.sep):
-                for file in files:
-                    if filename_to_lang(file) == language:
-                        test_files.append(os.path.join(root, file))
-            else:
-                # Check if any file contains 'test' in its name
-                for file in files:
-                    if "test" in file:
-                        if filename_to_lang(file) == language:
-                            test_files.append(os.path.join(root, file))
+    # The scanner prunes the language's build and dependency directories before descending
+    for relative_path in RepoScanner(project_dir, language=language).iter_files():
+        root, file = os.path.split(os.path.join(project_dir, relative_path))
+        if hasattr(args, "test_folder") and args.test_folder:
+            if args.test_folder not in root:
+                continue
+        # Files in a 'test' directory, or with 'test' in their name
+        if "test" in root.split(os.sep) or "test" in file:
+            if language_for_file(file) == language:
+                test_files.append(os.path.join(root, file))
         if len(test_files) >= MAX_TEST_FILES and args.look_for_oldest_unchanged_test_file:
             print(f"Found {len(test_files)} test files. Stopping at {MAX_TEST_FILES} test files.")
             break
@@ -0,0 +1,122 @@
+import os
+import re
+import shutil
+import tempfile
+from typing import Dict, Optional
+
+from single_test_command import replace_path_in_command
+
+
+class ValidationSandbox:
+    """
+    A private, per-worker copy of the test file and its coverage report.
+
+    Each sandbox lives in its own directory next to the real test file, so the
+    project's pytest/jest configuration, conftest files and sibling imports are
+    still discovered, while the rewritten test command writes the candidate test
+    file and coverage report into the sandbox instead of the shared locations.
+    """
+
+    def __init__(
+        self,
+        worker_id: int,
+        test_file_path: str,
+        code_coverage_report_path: str,
+        test_command: str,
+        test_command_dir: str,
+        coverage_type: str = "cobertura",
+    ):
+        """
+        Create the sandbox directory and rewrite the test command to target it.
+
+        Args:
+            worker_id: Index of the worker owning this sandbox.
+            test_file_path: Path to the real test file.
+            code_coverage_report_path: Path to the real coverage report.
+            test_command: The original test command.
+            test_command_dir: The directory the test command runs in.
+            coverage_type: Coverage report format ("cobertura" or "lcov").
+
+        Raises:
+            ValueError: If the test command does not reference the test file or the
+                coverage report in a way that can be redirected into the sandbox.
+        """
+        self.worker_id = worker_id
+        test_dir = os.path.dirname(os.path.abspath(test_file_path))
+        self.root = tempfile.mkdtemp(prefix=f".cover_agent_w{worker_id}_", dir=test_dir)
+        self.test_file_path = os.path.join(self.root, os.path.basename(test_file_path))
+        self.code_coverage_report_path = os.path.join(self.root, os.path.basename(code_coverage_report_path))
+
+        test_command = self.build_command(
+            test_command=test_command,
+            test_command_dir=test_command_dir,
+            original_paths=(test_file_path, code_coverage_report_path),
+            sandbox_paths=(self.test_file_path, self.code_coverage_report_path),
+            coverage_type=coverage_type,
+        )
+        if test_command is None:
+            self.cleanup()
+            raise ValueError(
+                "Test command must reference the test file and the coverage report path to run in a sandbox"
+            )
+        self.test_command = test_command
+
+        # Keep the original test directory importable and give every worker its own coverage data file
+        python_path = [test_dir, os.path.abspath(test_command_dir)]
+        if os.environ.get("PYTHONPATH"):
+            python_path.append(os.environ["PYTHONPATH"])
+        self.env: Dict[str, str] = {
+            "COVERAGE_FILE": os.path.join(self.root, ".coverage"),
+            "PYTHONPATH": os.pathsep.join(python_path),
+        }
+
+    @staticmethod
+    def build_command(
+        test_command: str,
+        test_command_dir: str,
+        original_paths: tuple,
+        sandbox_paths: tuple,
+        coverage_type: str = "cobertura",
+    ) -> Optional[str]:
+        """
+        Rewrite a test command so that it runs the sandbox test file and writes the sandbox report.
+
+        Args:
+            test_command: The original test command.
+            test_command_dir: The directory the test command runs in.
+            original_paths: (test file path, coverage report path) as used by the real run.
+            sandbox_paths: (test file path, coverage report path) inside the sandbox.
+            coverage_type: Coverage report format, used to redirect bare `--cov-report=<type>` flags.
+
+        Returns:
+            The rewritten command, or None if the command cannot be redirected.
+        """
+        original_test, original_report = original_paths
+        sandbox_test, sandbox_report = (f'"{p}"' if " " in p else p for p in sandbox_paths)
+
+        command = replace_path_in_command(test_command, original_test, test_command_dir, sandbox_test)
+        if command is None:
+            return None
+
+        with_report = replace_path_in_command(command, original_report, test_command_dir, sandbox_report)
+        if with_report is not None:
+            return with_report
+
+        # pytest-cov writes "<type>" reports to a default location unless a path is given
+        report_flag = {"cobertura": "xml", "lcov": "lcov"}.get(coverage_type)
+        if report_flag:
+            pattern = re.compile(rf"--cov-report[= ]{report_flag}(?![:\w-])")
+            with_report, count = pattern.subn(lambda _: f"--cov-report={report_flag}:{sandbox_report}", command)
+            if count:
+                return with_report
+
+        return None
+
+    def write_test_file(self, content: str) -> None:
+        """Overwrite the sandbox test file with `content`."""
+        with open(self.test_file_path, "w", encoding="utf-8") as f:
+            f.write(content)
+
+    def cleanup(self) -> None:
+        """Remove the sandbox directory."""
+        shutil.rmtree(self.root, ignore_errors=True)
@@ -1,7 +1,9 @@
 import os
 import sys
+from functools import lru_cache
 
 
+@lru_cache(maxsize=None)
 def get_version():
     """
     Get the version of the application.
@@ -28,4 +30,8 @@ def get_version():
     return version
 
 
-__version__ = get_version()
+def __getattr__(name):
+    # __version__ is read from version.txt on first access rather than at import
+    if name == "__version__":
+        return get_version()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
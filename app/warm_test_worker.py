@@ -0,0 +1,227 @@
+"""
+A long-lived pytest worker for validating Python candidate tests.
+
+The client side, `WarmTestWorker`, spawns this file as a child process and talks
+to it over its stdin/stdout pipes, one JSON object per line. The child imports
+the source module once, keeps a `coverage.Coverage` session running and runs
+each requested test node in-process with `pytest.main`, recording the lines it
+executes under a dedicated coverage context. Interpreter startup, plugin
+discovery and the imports of the code under test are therefore paid once per
+source file instead of once per candidate.
+
+The child only needs the standard library, `pytest` and `coverage`, so it can be
+started with the interpreter of the project under test.
+"""
+
+import hashlib
+import importlib.util
+import json
+import logging
+import os
+import subprocess
+import sys
+import threading
+from queue import Empty, Queue
+from typing import Any, Dict, List, Optional
+
+
+_BOOTSTRAP = "import runpy, sys; sys.argv = sys.argv[1:]; runpy.run_path(sys.argv[0], run_name='__main__')"
+
+
+class WarmTestWorker:
+    """Client for a warm pytest worker process bound to one source file."""
+
+    def __init__(
+        self,
+        source_file_path: str,
+        test_command_dir: str,
+        python_executable: Optional[str] = None,
+        logger: Optional[logging.Logger] = None,
+    ):
+        """
+        Args:
+            source_file_path: The source file whose coverage is measured.
+            test_command_dir: Working directory of the worker, as for the test command.
+            python_executable: Interpreter to run the worker with. Defaults to the current one.
+            logger: Optional logger instance.
+        """
+        self.source_file_path = os.path.abspath(source_file_path)
+        self.test_command_dir = os.path.abspath(test_command_dir)
+        self.python_executable = python_executable or sys.executable
+        self.logger = logger or logging.getLogger(__name__)
+
+        self._process: Optional[subprocess.Popen] = None
+        self._responses: Queue = Queue()
+        self._source_hash = ""
+        self._request_id = 0
+
+    def _hash_source(self) -> str:
+        with open(self.source_file_path, "rb") as f:
+            return hashlib.sha256(f.read()).hexdigest()
+
+    def _read_responses(self, process: subprocess.Popen) -> None:
+        """Forward every response line of `process` to the response queue until it exits."""
+        for line in process.stdout:
+            self._responses.put(line)
+        self._responses.put(None)
+
+    def start(self) -> None:
+        """Start the worker process, importing the source module under coverage."""
+        self.stop()
+        self._source_hash = self._hash_source()
+        self._responses = Queue()
+        self._process = subprocess.Popen(
+            # run_path keeps this file's directory off sys.path, where app/logging would shadow the stdlib
+            [self.python_executable, "-u", "-c", _BOOTSTRAP, os.path.abspath(__file__), self.source_file_path],
+            cwd=self.test_command_dir,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            text=True,
+            encoding="utf-8",
+        )
+        threading.Thread(target=self._read_responses, args=(self._process,), daemon=True).start()
+        self.logger.info(f"Started warm test worker (pid {self._process.pid}) for {self.source_file_path}")
+
+    def stop(self) -> None:
+        """Stop the worker process if it is running."""
+        if self._process is None:
+            return
+        try:
+            self._process.stdin.close()
+            self._process.wait(timeout=5)
+        except Exception:
+            self._process.kill()
+        self._process = None
+
+    def run_test(self, test_file_path: str, node_ids: List[str], timeout: float) -> Dict[str, Any]:
+        """
+        Run pytest nodes in the worker.
+
+        The worker is (re)started when it is not running or when the source file
+        changed since it was started, since the imported module would be stale.
+
+        Args:
+            test_file_path: The test file containing the nodes; dropped from the worker's
+                module cache so the current content is collected.
+            node_ids: The pytest node ids to run.
+            timeout: Seconds to wait for the result before killing the worker.
+
+        Returns:
+            A dict with the same keys as `UnitTestValidator.run_test_command`, plus
+            'lines_covered': the source lines executed by these nodes.
+        """
+        if self._process is None or self._process.poll() is not None or self._hash_source() != self._source_hash:
+            self.start()
+
+        self._request_id += 1
+        request = {
+            "context": f"candidate-{self._request_id}",
+            "test_file": os.path.abspath(test_file_path),
+            "node_ids": node_ids,
+        }
+        self._process.stdin.write(json.dumps(request) + "\n")
+        self._process.stdin.flush()
+
+        try:
+            line = self._responses.get(timeout=timeout)
+        except Empty:
+            line = None
+            self.logger.error(f"Warm test worker timed out after {timeout} seconds")
+            self._process.kill()
+        if line is None:
+            self.stop()
+            return {
+                'exit_code': -1,
+                'stdout': '',
+                'stderr': 'Warm test worker did not respond',
+                'success': False,
+                'lines_covered': [],
+            }
+
+        response = json.loads(line)
+        return {
+            'exit_code': response["exit_code"],
+            'stdout': response["output"],
+            'stderr': response["output"] if response["exit_code"] != 0 else '',
+            'success': response["exit_code"] == 0,
+            'lines_covered': response["lines_covered"],
+        }
+
+
+def _serve(source_file_path: str) -> None:
+    """Worker side: answer test requests read from stdin until it is closed."""
+    import coverage
+
+    # Keep a private handle on the response pipe and send everything else printed to stderr,
+    # so output from the code under test cannot corrupt the protocol
+    responses = os.fdopen(os.dup(sys.stdout.fileno()), "w", encoding="utf-8")
+    os.dup2(sys.stderr.fileno(), sys.stdout.fileno())
+
+    sys.path.insert(0, os.getcwd())
+    sys.path.insert(0, os.path.dirname(source_file_path))
+    cov = coverage.Coverage(data_file=None, include=[source_file_path])
+    cov.start()
+
+    # Warm up: import the source module, and with it the dependencies the tests will need
+    module_name = os.path.splitext(os.path.basename(source_file_path))[0]
+    try:
+        spec = importlib.util.spec_from_file_location(module_name, source_file_path)
+        module = importlib.util.module_from_spec(spec)
+        sys.modules[module_name] = module
+        spec.loader.exec_module(module)
+    except Exception:
+        sys.modules.pop(module_name, None)
+
+    import pytest
+
+    class _FailureCollector:
+        def __init__(self):
+            self.failures: List[str] = []
+
+        def pytest_runtest_logreport(self, report):
+            if report.failed:
+                self.failures.append(f"{report.nodeid} ({report.when}):\n{report.longreprtext}")
+
+        def pytest_collectreport(self, report):
+            if report.failed:
+                self.failures.append(f"{report.nodeid} (collection):\n{report.longreprtext}")
+
+    for line in sys.stdin:
+        request = json.loads(line)
+        test_file = request["test_file"]
+        if os.path.dirname(test_file) not in sys.path:
+            sys.path.insert(0, os.path.dirname(test_file))
+
+        # Always collect the current content of the test file
+        for name, loaded in list(sys.modules.items()):
+            if os.path.abspath(getattr(loaded, "__file__", "") or "") == test_file:
+                del sys.modules[name]
+
+        collector = _FailureCollector()
+        cov.switch_context(request["context"])
+        try:
+            exit_code = int(pytest.main(["-q", "-p", "no:cacheprovider", *request["node_ids"]], plugins=[collector]))
+        except BaseException as e:
+            exit_code = 1
+            collector.failures.append(repr(e))
+        cov.switch_context("")
+        if exit_code != 0 and not collector.failures:
+            collector.failures.append(f"pytest exited with code {exit_code} for {' '.join(request['node_ids'])}")
+
+        data = cov.get_data()
+        data.set_query_contexts([request["context"]])
+        response = {
+            "exit_code": exit_code,
+            "output": "\n".join(collector.failures),
+            "lines_covered": sorted(data.lines(source_file_path) or []),
+        }
+        data.set_query_contexts(None)
+        responses.write(json.dumps(response) + "\n")
+        responses.flush()
+
+    cov.stop()
+
+
+if __name__ == "__main__":
+    _serve(os.path.abspath(sys.argv[1]))
@@ -32,28 +32,28 @@ def main():
         description="Simplified Cover Agent - Generate unit tests to improve code coverage"
     )
     
-    # Required arguments
+    # Required arguments (the file paths are discovered in --repo mode)
     parser.add_argument(
         "--source-file-path",
-        required=True,
         help="Path to the source file to generate tests for"
     )
     parser.add_argument(
         "--test-file-path", 
-        required=True,
         help="Path to the test file (will be created if doesn't exist)"
     )
     parser.add_argument(
         "--test-command",
         required=True,
-        help="Command to run tests and generate coverage report"
+        help="Command to run tests and generate coverage report. In --repo mode a template formatted "
+             "per file pair with {source_file}, {test_file}, {coverage_report} and {pair}"
     )
     
     # Optional arguments with defaults
     parser.add_argument(
         "--code-coverage-report-path",
         default="coverage.xml",
-        help="Path to coverage report file (default: coverage.xml)"
+        help="Path to coverage report file (default: coverage.xml). In --repo mode, a whole-repository "
+             "report used to rank the files by missed lines"
     )
     parser.add_argument(
         "--model",
@@ -91,6 +91,52 @@ def main():
         "--project-root",
         help="Project root directory (default: current directory)"
     )
+    parser.add_argument(
+        "--validation-workers",
+        type=int,
+        help="Number of candidate tests to validate in parallel (default: from configuration.toml)"
+    )
+    parser.add_argument(
+        "--run-each-test-separately",
+        action="store_true",
+        default=None,
+        help="Validate each generated test by running only that test (default: from configuration.toml)"
+    )
+    parser.add_argument(
+        "--warm-worker",
+        action="store_true",
+        default=None,
+        help="Validate Python tests one at a time in a persistent pytest worker (default: from configuration.toml)"
+    )
+    parser.add_argument(
+        "--batch-validation",
+        action="store_true",
+        default=None,
+        help="Validate all generated tests of an iteration in one test run (default: from configuration.toml)"
+    )
+    parser.add_argument(
+        "--concurrent-generations",
+        type=int,
+        help="Number of concurrent test generation requests per iteration (default: from configuration.toml)"
+    )
+    parser.add_argument(
+        "--pipeline",
+        action="store_true",
+        default=None,
+        help="Generate the next iteration's tests while the current ones are validated (default: from configuration.toml)"
+    )
+    parser.add_argument(
+        "--stream",
+        action="store_true",
+        default=None,
+        help="Stream the model's response and validate each test as soon as it is written (default: from configuration.toml)"
+    )
+    parser.add_argument(
+        "--source-window",
+        action="store_true",
+        default=None,
+        help="Show the model only the functions and classes containing uncovered lines (default: from configuration.toml)"
+    )
     parser.add_argument(
         "--log-level",
         choices=["DEBUG", "INFO", "WARNING", "ERROR"],
@@ -98,11 +144,47 @@ def main():
         help="Logging level (default: INFO)"
     )
     
+    parser.add_argument(
+        "--repo",
+        action="store_true",
+        help="Process every (source file, test file) pair found under --project-root"
+    )
+    parser.add_argument(
+        "--language",
+        choices=["python", "javascript"],
+        default="python",
+        help="Language of the files paired up in --repo mode (default: python)"
+    )
+    parser.add_argument(
+        "--pipelines",
+        type=int,
+        help="File pairs processed at once in --repo mode (default: from configuration.toml)"
+    )
+    parser.add_argument(
+        "--llm-concurrency",
+        type=int,
+        help="Model requests in flight at once across --repo pipelines (default: from configuration.toml)"
+    )
+    parser.add_argument(
+        "--test-concurrency",
+        type=int,
+        help="Test runs at once across --repo pipelines (default: from configuration.toml)"
+    )
+    parser.add_argument(
+        "--junit-report-path",
+        help="JUnit XML report of a whole-suite run, whose test durations weight the --repo ranking"
+    )
+    
     args = parser.parse_args()
+    if not args.repo and not (args.source_file_path and args.test_file_path):
+        parser.error("--source-file-path and --test-file-path are required unless --repo is given")
     
     # Setup logging
     logger = CustomLogger.get_logger(__name__)
     
+    if args.repo:
+        return run_repository(args, logger)
+    
     print("🚀 Simplified Cover Agent")
     print("=" * 50)
     
@@ -142,7 +224,15 @@ def main():
             max_run_time_sec=args.max_run_time_sec,
             test_command_dir=args.test_command_dir,
             project_root=args.project_root or os.getcwd(),
-            logger=logger
+            logger=logger,
+            validation_workers=args.validation_workers,
+            run_each_test_separately=args.run_each_test_separately,
+            use_warm_worker=args.warm_worker,
+            batch_validation=args.batch_validation,
+            concurrent_generations=args.concurrent_generations,
+            pipeline_generation=args.pipeline,
+            stream_generation=args.stream,
+            source_windowing=args.source_window,
         )
         
         # Run the agent
@@ -172,5 +262,62 @@ def main():
         return 1
 
 
+def run_repository(args, logger):
+    """Run one agent pipeline per (source file, test file) pair of the project."""
+    from app.repo_cover_agent import RepoCoverAgent
+
+    print("🚀 Simplified Cover Agent - repository mode")
+    print("=" * 50)
+    
+    try:
+        repo_agent = RepoCoverAgent(
+            project_root=args.project_root or os.getcwd(),
+            test_command=args.test_command,
+            language=args.language,
+            pipelines=args.pipelines,
+            llm_concurrency=args.llm_concurrency,
+            test_concurrency=args.test_concurrency,
+            coverage_report_path=args.code_coverage_report_path,
+            junit_report_path=args.junit_report_path,
+            logger=logger,
+            model=args.model,
+            api_base=args.api_base,
+            desired_coverage=args.desired_coverage,
+            max_iterations=args.max_iterations,
+            max_run_time_sec=args.max_run_time_sec,
+            validation_workers=args.validation_workers,
+            run_each_test_separately=args.run_each_test_separately,
+            use_warm_worker=args.warm_worker,
+            batch_validation=args.batch_validation,
+            concurrent_generations=args.concurrent_generations,
+            pipeline_generation=args.pipeline,
+            stream_generation=args.stream,
+            source_windowing=args.source_window,
+        )
+        
+        def report(result):
+            coverage = f"{result['coverage'] * 100:.2f}%" if result['coverage'] is not None else "n/a"
+            status = "✅" if result['success'] else "❌"
+            print(f"{status} {result['source_file']}: {coverage} coverage, "
+                  f"{result['tests_passed']}/{result['tests_generated']} tests passed "
+                  f"in {result['elapsed_sec']:.1f}s")
+        
+        results = repo_agent.run(on_result=report)
+        
+        print("\n" + "=" * 50)
+        print("📊 FINAL RESULTS")
+        print("=" * 50)
+        print(f"📁 File pairs: {len(results)}")
+        print(f"🎯 Target coverage reached: {sum(1 for r in results if r['success'])}")
+        print(f"✔️  Tests passed: {sum(r['tests_passed'] for r in results)}")
+        
+        return 0
+        
+    except Exception as e:
+        print(f"💥 Error: {e}")
+        logger.error(f"Repository mode error: {e}", exc_info=True)
+        return 1
+
+
 if __name__ == "__main__":
     sys.exit(main())
@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+Import-time benchmark of the Cover Agent startup path.
+
+Each measurement runs in a fresh interpreter: it imports the modules CoverAgent
+loads for a run and reads the settings. The "eager" variant imports the heavy
+third-party packages up front and loads the settings through Dynaconf, as the
+code did before imports were deferred; the "lazy" variant is the current startup.
+
+Usage: python startup_benchmark.py [--runs N]
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+APP_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'app')
+
+STARTUP = """
+import sys, time
+sys.path.insert(0, {root!r})
+sys.path.append({app!r})
+start = time.perf_counter()
+{preload}
+from app.ai_caller import AICaller
+from app.prompt_builder import PromptBuilder
+from app.unit_test_generator import UnitTestGenerator
+from app.unit_test_validator import UnitTestValidator
+from config.config_loader import get_settings
+get_settings().get("default.model")
+print(time.perf_counter() - start)
+"""
+
+EAGER_PRELOAD = "import asyncio, dynaconf, grep_ast, jinja2, tiktoken"
+
+
+def measure(preload: str, runs: int, env: dict) -> float:
+    """Median startup time in milliseconds over `runs` fresh interpreters."""
+    code = STARTUP.format(root=os.path.dirname(APP_DIR), app=APP_DIR, preload=preload)
+    times = []
+    for _ in range(runs):
+        output = subprocess.run(
+            [sys.executable, '-c', code], env=env, capture_output=True, text=True, check=True
+        ).stdout
+        times.append(float(output.strip().splitlines()[-1]) * 1000)
+    return statistics.median(times)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure the import time of the Cover Agent startup path")
+    parser.add_argument("--runs", type=int, default=5, help="Fresh interpreters per variant (default: 5)")
+    args = parser.parse_args()
+
+    eager_env = dict(os.environ, COVER_AGENT_SETTINGS_SNAPSHOT='0')
+    lazy_env = dict(os.environ)
+    # Builds the settings snapshot, so the lazy runs measure the warm path
+    measure('', 1, lazy_env)
+
+    eager = measure(EAGER_PRELOAD, args.runs, eager_env)
+    lazy = measure('', args.runs, lazy_env)
+    print(f"eager imports, Dynaconf settings: {eager:7.1f} ms")
+    print(f"lazy imports, settings snapshot:  {lazy:7.1f} ms")
+    print(f"improvement:                      {eager - lazy:7.1f} ms ({(eager - lazy) / eager:.0%})")
+
+
+if __name__ == "__main__":
+    main()